@@ -0,0 +1,145 @@
+import os
+import time
+from datetime import datetime
+
+from common import metrics, runtime, signed_token
+from common.revocations import STAMP_TOKEN, revocation_stamp
+from common.token_cache import token_cache
+
+# Obtener el stage desde las variables de entorno
+stage = os.environ.get("STAGE", "dev")  # Default a "dev" si no se define
+
+# Atributo TTL de t_access_tokens: epoch (segundos) en que vence el token
+EXPIRES_AT = 'expires_at'
+# Formato de `expires` en los tokens emitidos antes de EXPIRES_AT (hora local)
+LEGACY_EXPIRES_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+class AuthError(Exception):
+    # Error de autenticación con el statusCode que debe devolver el handler
+    def __init__(self, status_code, message):
+        super().__init__(message)
+        self.status_code = status_code
+        self.message = message
+
+    def response(self):
+        return {
+            'statusCode': self.status_code,
+            'body': self.message
+        }
+
+
+def get_tokens_table():
+    # La tabla se crea una sola vez por contenedor
+    return runtime.table(f"{stage}_t_access_tokens")
+
+
+def validate_token(token):
+    # Revocaciones hechas en otros contenedores (una lectura cada
+    # REVOCATION_SYNC_SECONDS, no por request)
+    revocation_stamp.sync(get_tokens_table, token_cache)
+
+    # Los tokens firmados se validan sin I/O contra el sello ya leído
+    if signed_token.is_signed_token(token):
+        try:
+            identity, claims = signed_token.verify_token(token)
+        except signed_token.InvalidSignedToken as e:
+            raise AuthError(403, str(e))
+        if revocation_stamp.is_revoked(identity['tenant_id'], identity['student_id'], claims.get('i'),
+                                       claims.get('n')):
+            raise AuthError(403, 'Token revocado')
+        return identity
+
+    # Primero se consulta el cache del contenedor
+    cached = token_cache.get(token)
+    if isinstance(cached, AuthError):
+        raise cached
+    if cached is not None:
+        return cached
+
+    try:
+        identity, expires_at = _read_token(token)
+    except AuthError as e:
+        if e.status_code == 403:
+            token_cache.put_negative(token, e)
+        raise
+
+    token_cache.put(token, identity, expires_at)
+    return identity
+
+
+def _read_token(token):
+    # Un solo GetItem: valida existencia y expiración y devuelve la identidad
+    if token == STAMP_TOKEN:
+        raise AuthError(403, 'Token no existe')
+    response = get_tokens_table().get_item(
+        Key={
+            'token': token
+        }
+    )
+    if 'Item' not in response:
+        raise AuthError(403, 'Token no existe')
+
+    item = response['Item']
+    expires_at = token_expiry(item)
+    if expires_at is None or int(time.time()) > expires_at:
+        raise AuthError(403, 'Token expirado')
+
+    tenant_id = item.get('tenant_id')
+    student_id = item.get('student_id')
+    if not tenant_id or not student_id:
+        raise AuthError(500, 'Error: Falta tenant_id o student_id en el token almacenado')
+
+    identity = {
+        'tenant_id': tenant_id,
+        'student_id': student_id
+    }
+    return identity, expires_at
+
+
+def token_expiry(item):
+    # Epoch de expiración de un item de t_access_tokens; los tokens anteriores
+    # solo tienen `expires` como texto. None si no se puede determinar
+    expires_at = item.get(EXPIRES_AT)
+    if expires_at is not None:
+        return int(expires_at)
+    try:
+        return int(datetime.strptime(item['expires'], LEGACY_EXPIRES_FORMAT).timestamp())
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
+def invalidate(token=None, tenant_id=None, student_id=None):
+    # Hook para los handlers que eliminan datos: descarta entradas del cache
+    if token:
+        token_cache.invalidate(token)
+    if tenant_id and student_id:
+        token_cache.invalidate_student(tenant_id, student_id)
+
+
+def identity_from_authorizer(event):
+    # Identidad resuelta por el authorizer de API Gateway. Con integración
+    # `lambda` llega por la plantilla en event['authorizer']; con proxy, en
+    # event['requestContext']['authorizer'].
+    authorizer = event.get('authorizer') or (event.get('requestContext') or {}).get('authorizer') or {}
+    tenant_id = authorizer.get('tenant_id')
+    student_id = authorizer.get('student_id')
+    if tenant_id and student_id:
+        return {
+            'tenant_id': tenant_id,
+            'student_id': student_id
+        }
+    return None
+
+
+def authenticate(event):
+    # Si el authorizer ya validó el token no se hace ninguna llamada
+    identity = identity_from_authorizer(event)
+    if not identity:
+        # Obtener el token de autorización desde los headers
+        token = (event.get('headers') or {}).get('Authorization')
+        if not token:
+            raise AuthError(400, 'Falta el token de autorización')
+        identity = validate_token(token)
+
+    metrics.set_tenant(identity['tenant_id'])
+    return identity
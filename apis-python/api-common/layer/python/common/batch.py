@@ -0,0 +1,115 @@
+import random
+import threading
+import time
+
+from botocore.exceptions import ClientError
+
+# Helpers para BatchWriteItem: divide en bloques de 25 y reintenta los
+# UnprocessedItems (y los errores de throttling) con backoff exponencial.
+
+BATCH_SIZE = 25
+
+THROTTLING_ERRORS = ('ProvisionedThroughputExceededException', 'ThrottlingException',
+                     'RequestLimitExceeded')
+
+
+class AdaptiveThrottle:
+    # Pausa compartida entre los hilos que escriben: crece al recibir
+    # throttling/UnprocessedItems y se reduce con cada escritura completa
+    def __init__(self, base_delay=0.05, max_delay=2.0, sleep=time.sleep):
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.delay = 0.0
+        self.sleep = sleep
+        self.throttled = 0
+        self._lock = threading.Lock()
+
+    def wait(self):
+        if self.delay:
+            self.sleep(random.uniform(0, self.delay))
+
+    def on_throttle(self):
+        with self._lock:
+            self.throttled += 1
+            self.delay = min(self.max_delay, max(self.base_delay, self.delay * 2))
+
+    def on_success(self):
+        if self.delay:
+            with self._lock:
+                self.delay = self.delay / 2 if self.delay > self.base_delay else 0.0
+
+
+def write_request_items(client, request_items, max_retries=8, base_delay=0.05, max_delay=2.0,
+                        sleep=time.sleep, throttle=None):
+    # request_items: {'tabla': [{'PutRequest': ...} | {'DeleteRequest': ...}], ...}
+    # con un máximo de 25 requests en total. Devuelve lo que quedó sin procesar.
+    pending = request_items
+    attempt = 0
+    while pending:
+        if throttle:
+            throttle.wait()
+        try:
+            response = client.batch_write_item(RequestItems=pending)
+            pending = response.get('UnprocessedItems') or {}
+        except ClientError as e:
+            if e.response['Error']['Code'] not in THROTTLING_ERRORS:
+                raise
+        if not pending:
+            if throttle:
+                throttle.on_success()
+            break
+        if throttle:
+            throttle.on_throttle()
+        if attempt >= max_retries:
+            return pending
+        sleep(backoff_delay(attempt, base_delay, max_delay))
+        attempt += 1
+    return {}
+
+
+def batch_write(client, table_name, requests, max_retries=8, base_delay=0.05, max_delay=2.0, sleep=time.sleep):
+    # requests: lista de {'PutRequest': ...} o {'DeleteRequest': ...}
+    # Devuelve los requests que no se pudieron procesar tras los reintentos
+    failed = []
+    for start in range(0, len(requests), BATCH_SIZE):
+        failed.extend(write_chunk(client, table_name, requests[start:start + BATCH_SIZE],
+                                  max_retries=max_retries, base_delay=base_delay,
+                                  max_delay=max_delay, sleep=sleep))
+    return failed
+
+
+def write_chunk(client, table_name, chunk, **kwargs):
+    return write_request_items(client, {table_name: chunk}, **kwargs).get(table_name, [])
+
+
+def batch_delete(client, table_name, keys, **kwargs):
+    return batch_write(client, table_name, [{'DeleteRequest': {'Key': key}} for key in keys], **kwargs)
+
+
+def batch_get(client, request_items, max_retries=8, base_delay=0.05, max_delay=2.0, sleep=time.sleep):
+    # request_items: {'tabla': {'Keys': [...], 'ProjectionExpression': ...}}
+    # Devuelve {'tabla': [items]} reintentando las UnprocessedKeys
+    responses = {}
+    pending = request_items
+    attempt = 0
+    while pending:
+        try:
+            response = client.batch_get_item(RequestItems=pending)
+            for table, items in response.get('Responses', {}).items():
+                responses.setdefault(table, []).extend(items)
+            pending = response.get('UnprocessedKeys') or {}
+        except ClientError as e:
+            if e.response['Error']['Code'] not in THROTTLING_ERRORS:
+                raise
+        if not pending:
+            break
+        if attempt >= max_retries:
+            raise RuntimeError('BatchGetItem: quedaron claves sin procesar tras los reintentos')
+        sleep(backoff_delay(attempt, base_delay, max_delay))
+        attempt += 1
+    return responses
+
+
+def backoff_delay(attempt, base_delay=0.05, max_delay=2.0):
+    # "Full jitter": espera aleatoria entre 0 y base * 2^intento
+    return random.uniform(0, min(max_delay, base_delay * (2 ** attempt)))
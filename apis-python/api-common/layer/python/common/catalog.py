@@ -0,0 +1,105 @@
+import os
+import threading
+import time
+from decimal import Decimal
+
+# Catálogo de productos comprables (`{stage}_t_purchasable`, PK tenant_id,
+# SK product_id; lo administra api-purchasables en nodejs). Se cachea por
+# contenedor: la primera compra de un tenant carga todo su catálogo con una
+# query y las siguientes no leen la tabla. El precio cacheado nunca se cobra
+# a ciegas: la compra lo verifica dentro de la transacción y, si cambió,
+# refresca la entrada (ver common.purchases).
+
+CATALOG_TTL_SECONDS = float(os.environ.get("CATALOG_TTL_SECONDS", "60"))
+CATALOG_NEGATIVE_TTL_SECONDS = float(os.environ.get("CATALOG_NEGATIVE_TTL_SECONDS", "5"))
+DEFAULT_CURRENCY = 'rockie_gems'
+
+
+def whole_price(price):
+    # Solo precios numéricos enteros y no negativos: el saldo es entero y la
+    # compra compara el precio tal como está guardado (price = :price)
+    return (isinstance(price, (int, Decimal)) and not isinstance(price, bool)
+            and price >= 0 and price % 1 == 0)
+
+
+def describe(item):
+    # Lo que necesita una compra; None si el producto no tiene un precio válido
+    if not item or not whole_price(item.get('price')):
+        return None
+    product_info = item.get('product_info') or {}
+    stock = item.get('stock')
+    return {
+        'product_id': item['product_id'],
+        'price': item['price'],
+        'currency': item.get('currency') or product_info.get('currency') or DEFAULT_CURRENCY,
+        'stock': int(stock) if stock is not None else None,
+        'accessory_id': product_info.get('accessory_id') or item['product_id']
+    }
+
+
+class Catalog:
+
+    def __init__(self, ttl=CATALOG_TTL_SECONDS, negative_ttl=CATALOG_NEGATIVE_TTL_SECONDS, clock=time.monotonic):
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.clock = clock
+        self.hits = 0
+        self.loads = 0
+        self._products = {}
+        self._tenants = {}
+        self._lock = threading.Lock()
+
+    def product(self, table, tenant_id, product_id):
+        # Devuelve describe(item) o None si el producto no existe
+        now = self.clock()
+        with self._lock:
+            entry = self._products.get((tenant_id, product_id))
+            if entry is not None and entry[0] > now:
+                self.hits += 1
+                return entry[1]
+            tenant_loaded = self._tenants.get(tenant_id, 0) > now
+
+        if not tenant_loaded:
+            self.load_tenant(table, tenant_id)
+            with self._lock:
+                entry = self._products.get((tenant_id, product_id))
+                if entry is not None and entry[0] > now:
+                    return entry[1]
+
+        # Producto creado después de cargar el catálogo del tenant (o que no existe)
+        item = table.get_item(Key={'tenant_id': tenant_id, 'product_id': product_id}, ConsistentRead=True).get('Item')
+        return self.refresh(tenant_id, product_id, item)
+
+    def load_tenant(self, table, tenant_id):
+        params = {'KeyConditionExpression': 'tenant_id = :t', 'ExpressionAttributeValues': {':t': tenant_id}}
+        items = []
+        while True:
+            response = table.query(**params)
+            items.extend(response.get('Items', []))
+            if 'LastEvaluatedKey' not in response:
+                break
+            params['ExclusiveStartKey'] = response['LastEvaluatedKey']
+        deadline = self.clock() + self.ttl
+        with self._lock:
+            self.loads += 1
+            for item in items:
+                self._products[(tenant_id, item['product_id'])] = (deadline, describe(item))
+            self._tenants[tenant_id] = deadline
+
+    def refresh(self, tenant_id, product_id, item):
+        # Guarda el item actual (p.ej. el que devolvió una transacción
+        # cancelada); sin item queda cacheado como inexistente por poco tiempo
+        product = describe(item)
+        ttl = self.ttl if product is not None else self.negative_ttl
+        with self._lock:
+            self._products[(tenant_id, product_id)] = (self.clock() + ttl, product)
+        return product
+
+    def clear(self):
+        with self._lock:
+            self._products.clear()
+            self._tenants.clear()
+
+
+# Instancia a nivel de módulo: vive mientras el contenedor esté caliente
+catalog = Catalog()
@@ -0,0 +1,378 @@
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from botocore.exceptions import ClientError
+
+from common.batch import backoff_delay
+from common.progression import MAX_ATTEMPTS, MAX_AWARD, RockieNotFound, award_update, current_experience, experience_of
+
+# Ingesta de eventos de actividades completadas (experiencia y monedas). Los
+# eventos llegan por una cola con la forma de SQS y se agrupan por
+# (tenant_id, student_id) durante una ventana de tiempo/tamaño; al vaciar la
+# ventana se escribe una sola actualización por estudiante con la suma de
+# sus eventos, en paralelo con un pool acotado. La entrega es "al menos una
+# vez": cada escritura es una TransactWriteItems que además crea un item por
+# event_id en `{stage}_t_activity_events` con attribute_not_exists, así que
+# un evento ya aplicado (por este u otro contenedor) cancela la transacción
+# y se descarta; los items vencen por TTL. El LRU de cada contenedor solo
+# evita esa escritura para los repetidos recientes. Un mensaje solo se
+# confirma (se borra de la cola) cuando su estudiante quedó escrito.
+
+INGEST_MAX_EVENTS = int(os.environ.get("INGEST_MAX_EVENTS", "1000"))
+INGEST_WINDOW_SECONDS = float(os.environ.get("INGEST_WINDOW_SECONDS", "5"))
+INGEST_WORKERS = int(os.environ.get("INGEST_WORKERS", "8"))
+# event_id ya aplicados que recuerda cada contenedor
+INGEST_DEDUPE_SIZE = int(os.environ.get("INGEST_DEDUPE_SIZE", "50000"))
+# Cuánto se guarda cada event_id en t_activity_events: más que la retención
+# de la cola (4 días), para que ninguna reentrega lo encuentre vencido
+INGEST_DEDUPE_TTL_SECONDS = int(os.environ.get("INGEST_DEDUPE_TTL_SECONDS", "604800"))
+MAX_COINS = int(os.environ.get("MAX_COINS_AWARD", "100000"))
+
+# SQS acepta hasta 10 mensajes por SendMessageBatch/DeleteMessageBatch
+SQS_BATCH_SIZE = 10
+# TransactWriteItems admite 100 items: los eventos más el rockie y el estudiante
+EVENTS_PER_TRANSACTION = 98
+# Atributo TTL de t_activity_events: epoch (segundos) en que vence el item
+EXPIRES_AT = 'expires_at'
+
+logger = logging.getLogger()
+
+
+class InvalidEvent(Exception):
+    pass
+
+
+class StudentNotFound(Exception):
+    pass
+
+
+def parse_event(body):
+    # {"event_id", "tenant_id", "student_id", "experience", "coins"}
+    try:
+        event = json.loads(body) if isinstance(body, (str, bytes)) else body
+    except json.JSONDecodeError:
+        raise InvalidEvent('El mensaje no es un JSON válido')
+    if not isinstance(event, dict):
+        raise InvalidEvent('El mensaje debe ser un objeto')
+    for field in ('event_id', 'tenant_id', 'student_id'):
+        if not event.get(field) or not isinstance(event[field], str):
+            raise InvalidEvent(f"Falta {field}")
+    parsed = {field: event[field] for field in ('event_id', 'tenant_id', 'student_id')}
+    for field, limit in (('experience', MAX_AWARD), ('coins', MAX_COINS)):
+        value = event.get(field, 0)
+        if isinstance(value, bool) or not isinstance(value, int) or not 0 <= value <= limit:
+            raise InvalidEvent(f"{field} debe ser un entero entre 0 y {limit}")
+        parsed[field] = value
+    if not parsed['experience'] and not parsed['coins']:
+        raise InvalidEvent('El evento no otorga experiencia ni monedas')
+    return parsed
+
+
+class RecentEvents:
+    # LRU de event_id ya aplicados: vive mientras el contenedor esté caliente
+
+    def __init__(self, max_size=INGEST_DEDUPE_SIZE):
+        self.max_size = max_size
+        self._ids = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __contains__(self, event_id):
+        with self._lock:
+            return event_id in self._ids
+
+    def add_all(self, event_ids):
+        with self._lock:
+            for event_id in event_ids:
+                self._ids[event_id] = None
+                self._ids.move_to_end(event_id)
+            while len(self._ids) > self.max_size:
+                self._ids.popitem(last=False)
+
+
+# Instancia a nivel de módulo: compartida entre invocaciones
+recent_events = RecentEvents()
+
+
+class EventBuffer:
+    # Acumula los eventos por estudiante hasta que llegan `max_events` mensajes o
+    # pasan `window_seconds` desde el primero. `receipt` identifica el
+    # mensaje de la cola (ReceiptHandle o messageId)
+
+    def __init__(self, max_events=INGEST_MAX_EVENTS, window_seconds=INGEST_WINDOW_SECONDS, recent=None,
+                 clock=time.monotonic):
+        self.max_events = max_events
+        self.window_seconds = window_seconds
+        self.recent = recent if recent is not None else recent_events
+        self.clock = clock
+        self.received = 0
+        self.duplicates = 0
+        self.invalid = 0
+        self._reset()
+
+    def _reset(self):
+        self._groups = {}
+        self._pending = {}
+        self._settled = []
+        self._messages = 0
+        self._first_at = None
+
+    @property
+    def pending(self):
+        # Mensajes en la ventana actual (incluye repetidos e inválidos)
+        return self._messages
+
+    def add(self, body, receipt=None):
+        # Devuelve 'added', 'duplicate' o 'invalid'
+        self.received += 1
+        self._messages += 1
+        if self._first_at is None:
+            self._first_at = self.clock()
+        try:
+            event = parse_event(body)
+        except InvalidEvent as e:
+            # No se va a poder procesar nunca: se confirma para que no vuelva
+            logger.warning(f"Evento descartado: {e}")
+            self.invalid += 1
+            self._settled.append(receipt)
+            return 'invalid'
+
+        event_id = event['event_id']
+        if event_id in self._pending:
+            # Repetido dentro de la ventana: se confirma junto con el original
+            self.duplicates += 1
+            self._groups[self._pending[event_id]]['receipts'].append(receipt)
+            return 'duplicate'
+        if event_id in self.recent:
+            self.duplicates += 1
+            self._settled.append(receipt)
+            return 'duplicate'
+
+        key = (event['tenant_id'], event['student_id'])
+        group = self._groups.get(key)
+        if group is None:
+            group = self._groups[key] = {'tenant_id': key[0], 'student_id': key[1], 'experience': 0, 'coins': 0,
+                                         'events': [], 'receipts': []}
+        group['experience'] += event['experience']
+        group['coins'] += event['coins']
+        group['events'].append((event_id, event['experience'], event['coins']))
+        group['receipts'].append(receipt)
+        self._pending[event_id] = key
+        return 'added'
+
+    def ready(self):
+        if self._messages >= self.max_events:
+            return True
+        return self._first_at is not None and self.clock() - self._first_at >= self.window_seconds
+
+    def drain(self):
+        # Devuelve (deltas por estudiante, mensajes que ya se pueden confirmar)
+        deltas, settled = list(self._groups.values()), [r for r in self._settled if r is not None]
+        self._reset()
+        return deltas, settled
+
+
+def _apply_events(t_rockies, t_students, t_events, tenant_id, student_id, events, experience, curve, sleep):
+    # Una TransactWriteItems con un item por evento (attribute_not_exists),
+    # la experiencia en t_rockies y las monedas en t_students. Los eventos que
+    # ya estaban aplicados se quitan y se reintenta con el resto.
+    # Devuelve (resultado, experiencia estimada después de escribir)
+    key = {'tenant_id': tenant_id, 'student_id': student_id}
+    expires_at = int(time.time()) + INGEST_DEDUPE_TTL_SECONDS
+    duplicates = 0
+    for attempt in range(1, MAX_ATTEMPTS + 1):
+        level = evolution = None
+        gained = sum(event[1] for event in events)
+        coins = sum(event[2] for event in events)
+        transact_items = [
+            {'Put': {
+                'TableName': t_events.name,
+                'Item': {'tenant_id': tenant_id, 'event_id': event_id, 'student_id': student_id,
+                         EXPIRES_AT: expires_at},
+                'ConditionExpression': 'attribute_not_exists(event_id)'
+            }}
+            for event_id, _, _ in events
+        ]
+        if gained:
+            if experience is None:
+                item = t_rockies.get_item(Key=key, ProjectionExpression='experience',
+                                          ConsistentRead=True).get('Item')
+                if item is None:
+                    raise RockieNotFound(student_id)
+                experience = experience_of(item)
+            award, level, evolution = award_update(tenant_id, student_id, gained, experience, curve)
+            transact_items.append({'Update': {'TableName': t_rockies.name, **award}})
+        if coins:
+            transact_items.append({'Update': {
+                'TableName': t_students.name,
+                'Key': key,
+                'UpdateExpression': 'ADD student_data.rockie_coins :coins',
+                'ConditionExpression': 'attribute_exists(student_id)',
+                'ExpressionAttributeValues': {':coins': coins}
+            }})
+        try:
+            t_rockies.meta.client.transact_write_items(TransactItems=transact_items)
+        except ClientError as e:
+            if e.response['Error']['Code'] != 'TransactionCanceledException':
+                raise
+            reasons = (e.response.get('CancellationReasons') or []) + [{}] * len(transact_items)
+            applied = {event_id for (event_id, _, _), reason in zip(events, reasons)
+                       if reason.get('Code') == 'ConditionalCheckFailed'}
+            if applied:
+                # Reentregas de eventos ya escritos: se descartan y se reintenta con el resto
+                duplicates += len(applied)
+                events = [event for event in events if event[0] not in applied]
+                if not events:
+                    return ({'events': 0, 'duplicates': duplicates, 'level': None, 'evolution': None, 'coins': 0,
+                             'attempts': attempt}, experience)
+                continue
+            rockie = reasons[len(events)] if gained else {}
+            student = reasons[len(events) + (1 if gained else 0)] if coins else {}
+            if student.get('Code') == 'ConditionalCheckFailed':
+                raise StudentNotFound(student_id)
+            if rockie.get('Code') == 'ConditionalCheckFailed':
+                if 'Item' not in rockie:
+                    raise RockieNotFound(student_id)
+                # Otro premio cambió el nivel entretanto: se reintenta con el valor actual
+                experience = experience_of(rockie['Item'])
+                continue
+            if not any(reason.get('Code') == 'TransactionConflict' for reason in reasons):
+                raise
+            # Otra escritura en curso sobre los mismos items
+            sleep(backoff_delay(attempt))
+            continue
+        return ({'events': len(events), 'duplicates': duplicates, 'level': level, 'evolution': evolution,
+                 'coins': coins, 'attempts': attempt}, experience + gained if gained else experience)
+    raise RuntimeError(f"No se pudo aplicar el evento a {student_id} tras {MAX_ATTEMPTS} intentos")
+
+
+def apply_delta(t_rockies, t_students, t_events, delta, experience=None, curve=None, sleep=time.sleep):
+    # Escribe los eventos de un estudiante: experiencia y monedas van en la
+    # misma transacción que los items de t_activity_events, así que un
+    # reintento de la cola nunca encuentra la mitad aplicada ni aplica dos
+    # veces un evento. Con más de EVENTS_PER_TRANSACTION eventos se escribe
+    # en varias transacciones
+    tenant_id, student_id = delta['tenant_id'], delta['student_id']
+    events = delta['events']
+    if not delta['experience']:
+        # Sin experiencia (p.ej. rockie no encontrado) solo se acreditan las monedas
+        events = [(event_id, 0, coins) for event_id, _, coins in events if coins]
+    total = {'events': 0, 'duplicates': 0, 'level': None, 'evolution': None, 'coins': 0, 'attempts': 0}
+    for start in range(0, len(events), EVENTS_PER_TRANSACTION):
+        result, experience = _apply_events(t_rockies, t_students, t_events, tenant_id, student_id,
+                                           events[start:start + EVENTS_PER_TRANSACTION], experience, curve, sleep)
+        for field in ('events', 'duplicates', 'coins', 'attempts'):
+            total[field] += result[field]
+        if result['level'] is not None:
+            total.update(level=result['level'], evolution=result['evolution'])
+    return total
+
+
+def flush(deltas, t_rockies, t_students, t_events, workers=INGEST_WORKERS, curve=None, recent=None):
+    # Aplica las sumas por estudiante en paralelo. Devuelve los mensajes
+    # confirmados (`acked`) y los que deben volver a la cola (`retry`)
+    recent = recent if recent is not None else recent_events
+    start = time.perf_counter()
+
+    # Experiencia actual de todos los rockies con BatchGetItem, por tenant
+    current = {}
+    by_tenant = {}
+    for delta in deltas:
+        if delta['experience']:
+            by_tenant.setdefault(delta['tenant_id'], []).append(delta['student_id'])
+    for tenant_id, student_ids in by_tenant.items():
+        current.update(((tenant_id, student_id), experience)
+                       for student_id, experience in current_experience(t_rockies, tenant_id, student_ids).items())
+
+    report = {'events': 0, 'students': len(deltas), 'written': 0, 'dropped': 0, 'failed': 0, 'duplicates': 0,
+              'acked': [], 'retry': []}
+    lock = threading.Lock()
+
+    def write(delta):
+        key = (delta['tenant_id'], delta['student_id'])
+        try:
+            if delta['experience'] and key not in current:
+                raise RockieNotFound(delta['student_id'])
+            return apply_delta(t_rockies, t_students, t_events, delta, experience=current.get(key), curve=curve)
+        except RockieNotFound:
+            if not delta['coins']:
+                raise
+            # Sin rockie no hay experiencia que sumar, pero las monedas sí se acreditan
+            logger.warning(f"Rockie no encontrado, solo se acreditan monedas: {key[0]}/{key[1]}")
+            return apply_delta(t_rockies, t_students, t_events, dict(delta, experience=0), curve=curve)
+
+    def apply(delta):
+        outcome = 'written'
+        duplicates = 0
+        try:
+            duplicates = write(delta)['duplicates']
+        except (RockieNotFound, StudentNotFound) as e:
+            # Reintentar no lo va a arreglar: se descartan los eventos
+            logger.warning(f"Eventos descartados, {type(e).__name__}: {delta['tenant_id']}/{delta['student_id']}")
+            outcome = 'dropped'
+        except (ClientError, RuntimeError) as e:
+            logger.error(f"Error al aplicar los eventos de {delta['student_id']}: {e}")
+            outcome = 'failed'
+        if outcome != 'failed':
+            recent.add_all(event_id for event_id, _, _ in delta['events'])
+        receipts = [receipt for receipt in delta['receipts'] if receipt is not None]
+        with lock:
+            report['events'] += len(delta['events'])
+            report['duplicates'] += duplicates
+            report[outcome] += 1
+            report['retry' if outcome == 'failed' else 'acked'].extend(receipts)
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        list(executor.map(apply, deltas))
+    report['elapsed_seconds'] = round(time.perf_counter() - start, 3)
+    return report
+
+
+def send_events(sqs, queue_url, events):
+    # Publica eventos en bloques de 10 (SendMessageBatch). Devuelve los que fallaron
+    failed = []
+    for start in range(0, len(events), SQS_BATCH_SIZE):
+        chunk = events[start:start + SQS_BATCH_SIZE]
+        response = sqs.send_message_batch(QueueUrl=queue_url, Entries=[
+            {'Id': str(position), 'MessageBody': json.dumps(event)} for position, event in enumerate(chunk)
+        ])
+        failed.extend(chunk[int(entry['Id'])] for entry in response.get('Failed', []))
+    return failed
+
+
+def consume(sqs, queue_url, t_rockies, t_students, t_events, buffer=None, workers=INGEST_WORKERS, wait_seconds=0,
+            curve=None):
+    # Lee la cola hasta vaciarla: acumula en el buffer, escribe cuando se
+    # llena o vence la ventana y borra de la cola los mensajes confirmados.
+    # Funciona con el cliente de SQS de boto3 o con una cola local
+    buffer = buffer or EventBuffer()
+    totals = {'received': 0, 'events': 0, 'students': 0, 'written': 0, 'dropped': 0, 'failed': 0, 'duplicates': 0,
+              'flushes': 0}
+    while True:
+        messages = sqs.receive_message(QueueUrl=queue_url, MaxNumberOfMessages=SQS_BATCH_SIZE,
+                                       WaitTimeSeconds=wait_seconds).get('Messages', [])
+        for message in messages:
+            buffer.add(message['Body'], message['ReceiptHandle'])
+        if buffer.pending and (buffer.ready() or not messages):
+            deltas, settled = buffer.drain()
+            report = flush(deltas, t_rockies, t_students, t_events, workers=workers, curve=curve,
+                           recent=buffer.recent)
+            acked = settled + report['acked']
+            for start in range(0, len(acked), SQS_BATCH_SIZE):
+                sqs.delete_message_batch(QueueUrl=queue_url, Entries=[
+                    {'Id': str(position), 'ReceiptHandle': receipt}
+                    for position, receipt in enumerate(acked[start:start + SQS_BATCH_SIZE])
+                ])
+            totals['flushes'] += 1
+            for field in ('events', 'students', 'written', 'dropped', 'failed', 'duplicates'):
+                totals[field] += report[field]
+        if not messages and not buffer.pending:
+            break
+    # Repetidos descartados en memoria más los que ya estaban en t_activity_events
+    totals.update(received=buffer.received, duplicates=buffer.duplicates + totals['duplicates'],
+                  invalid=buffer.invalid)
+    return totals
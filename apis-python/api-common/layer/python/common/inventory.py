@@ -0,0 +1,100 @@
+from botocore.exceptions import ClientError
+
+from common.progression import RockieNotFound
+from common.rockie import DEFAULT_ADORNED
+
+# Inventario de accesorios del rockie: rockie_data.rockie_all_accessories_ids
+# es un string set. Una compra agrega el accesorio con un ADD sobre el set
+# (no se reescribe la lista entera, ver common.purchases) y equipar es un SET
+# de un slot de rockie_adorned con la condición de que el accesorio esté en
+# el set, en un solo UpdateItem. DynamoDB no guarda sets vacíos: un rockie
+# sin accesorios no tiene el atributo. Los rockies con la lista anterior los
+# convierte MigrateAccessories; mientras tanto, una compra que encuentra la
+# lista la convierte con migrate_rockie y reintenta.
+
+ACCESSORIES = 'rockie_all_accessories_ids'
+ADORNED = 'rockie_adorned'
+SLOTS = tuple(DEFAULT_ADORNED)
+
+
+class InventoryError(Exception):
+    pass
+
+
+class UnknownSlot(InventoryError):
+    pass
+
+
+class NotOwned(InventoryError):
+    pass
+
+
+def accessory_set(accessory_ids):
+    # Solo ids de texto no vacíos; DynamoDB rechaza strings vacíos en un set
+    return {accessory_id for accessory_id in accessory_ids or () if isinstance(accessory_id, str) and accessory_id}
+
+
+def convert_accessories(client, table_name, key, accessories, adorned=None):
+    # Reemplaza la lista por un set con los mismos ids más los accesorios
+    # equipados (el rockie ya los tiene puestos). La condición sobre la lista
+    # completa evita pisar un cambio concurrente. Devuelve False si el item
+    # ya no tiene esa lista
+    owned = accessory_set(accessories) | accessory_set((adorned or {}).values())
+    params = {
+        'TableName': table_name,
+        'Key': key,
+        'ConditionExpression': 'rockie_data.#a = :old',
+        'ExpressionAttributeNames': {'#a': ACCESSORIES},
+        'ExpressionAttributeValues': {':old': accessories}
+    }
+    if owned:
+        params['UpdateExpression'] = 'SET rockie_data.#a = :owned'
+        params['ExpressionAttributeValues'][':owned'] = owned
+    else:
+        params['UpdateExpression'] = 'REMOVE rockie_data.#a'
+    try:
+        client.update_item(**params)
+    except ClientError as e:
+        if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+            raise
+        return False
+    return True
+
+
+def migrate_rockie(table, tenant_id, student_id):
+    # Convierte un solo rockie si todavía tiene la lista
+    key = {'tenant_id': tenant_id, 'student_id': student_id}
+    item = table.get_item(
+        Key=key,
+        ConsistentRead=True,
+        ProjectionExpression='rockie_data.#a, rockie_data.#d',
+        ExpressionAttributeNames={'#a': ACCESSORIES, '#d': ADORNED}
+    ).get('Item')
+    rockie_data = (item or {}).get('rockie_data') or {}
+    if not isinstance(rockie_data.get(ACCESSORIES), list):
+        return False
+    return convert_accessories(table.meta.client, table.name, key, rockie_data[ACCESSORIES], rockie_data.get(ADORNED))
+
+
+def equip(table, tenant_id, student_id, slot, accessory_id):
+    # Pone el accesorio en el slot solo si está en el inventario (contains
+    # funciona igual sobre la lista anterior). Devuelve rockie_adorned
+    if slot not in SLOTS:
+        raise UnknownSlot(slot)
+    try:
+        response = table.update_item(
+            Key={'tenant_id': tenant_id, 'student_id': student_id},
+            UpdateExpression='SET rockie_data.#d.#s = :id',
+            ConditionExpression='attribute_exists(student_id) AND contains(rockie_data.#a, :id)',
+            ExpressionAttributeNames={'#a': ACCESSORIES, '#d': ADORNED, '#s': slot},
+            ExpressionAttributeValues={':id': accessory_id},
+            ReturnValues='ALL_NEW',
+            ReturnValuesOnConditionCheckFailure='ALL_OLD'
+        )
+    except ClientError as e:
+        if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+            raise
+        if e.response.get('Item') is None:
+            raise RockieNotFound(student_id)
+        raise NotOwned(accessory_id)
+    return response['Attributes']['rockie_data'][ADORNED]
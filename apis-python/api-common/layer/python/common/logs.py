@@ -0,0 +1,109 @@
+import logging
+import os
+import random
+
+from common.serializer import dumps
+
+# Logging estructurado (una línea JSON por registro) para los handlers.
+# Los payloads (items de DynamoDB, cuerpos de request) solo se registran en
+# una fracción de las invocaciones (LOG_PAYLOAD_SAMPLE_RATE) o cuando el
+# request trae el header de debug, y siempre con los campos sensibles
+# redactados. Los campos costosos se pasan como `Lazy` y solo se calculan si
+# el registro se llega a escribir.
+
+LOG_LEVEL = os.environ.get("LOG_LEVEL", "INFO").upper()
+LOG_PAYLOAD_SAMPLE_RATE = float(os.environ.get("LOG_PAYLOAD_SAMPLE_RATE", "0"))
+# Vacío para ignorar el header (p.ej. en producción)
+LOG_DEBUG_HEADER = os.environ.get("LOG_DEBUG_HEADER", "X-Debug-Log")
+
+REDACTED = '***'
+REDACTED_FIELDS = frozenset(
+    {'password', 'token', 'authorization', 'authorizationtoken', 'access_token', 'refresh_token'} |
+    {f.strip().lower() for f in os.environ.get("LOG_REDACT_FIELDS", "").split(',') if f.strip()}
+)
+
+_context = {}
+_payloads = False
+_configured = False
+
+
+class Lazy:
+    # Valor que se calcula al formatear el registro, no al llamar al logger
+    __slots__ = ('fn',)
+
+    def __init__(self, fn):
+        self.fn = fn
+
+
+def redact(value):
+    if isinstance(value, dict):
+        return {k: REDACTED if isinstance(k, str) and k.lower() in REDACTED_FIELDS else redact(v)
+                for k, v in value.items()}
+    if isinstance(value, list):
+        return [redact(v) for v in value]
+    return value
+
+
+class JsonFormatter(logging.Formatter):
+
+    def format(self, record):
+        entry = {
+            'timestamp': round(record.created, 3),
+            'level': record.levelname,
+            'message': record.getMessage(),
+            'logger': record.name
+        }
+        entry.update(_context)
+        fields = getattr(record, 'fields', None)
+        if fields:
+            for key, value in fields.items():
+                entry[key] = value.fn() if isinstance(value, Lazy) else value
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        return dumps(entry).decode()
+
+
+def configure(level=LOG_LEVEL):
+    # El runtime de Lambda ya instala un handler en el logger raíz: solo se
+    # le cambia el formato
+    global _configured
+    root = logging.getLogger()
+    if not root.handlers:
+        root.addHandler(logging.StreamHandler())
+    for handler in root.handlers:
+        handler.setFormatter(JsonFormatter())
+    root.setLevel(level)
+    _configured = True
+
+
+def start_invocation(endpoint, event, context):
+    # Lo llama metrics.instrumented al empezar cada invocación
+    global _payloads
+    if not _configured:
+        configure()
+    _context.clear()
+    _context['endpoint'] = endpoint
+    request_id = getattr(context, 'aws_request_id', None)
+    if request_id:
+        _context['request_id'] = request_id
+
+    headers = event.get('headers') if isinstance(event, dict) else None
+    debug = bool(LOG_DEBUG_HEADER and headers and (headers.get(LOG_DEBUG_HEADER) or
+                                                   headers.get(LOG_DEBUG_HEADER.lower())))
+    _payloads = debug or (LOG_PAYLOAD_SAMPLE_RATE > 0 and random.random() < LOG_PAYLOAD_SAMPLE_RATE)
+
+
+def log(logger, level, message, **fields):
+    # Registro con campos estructurados; no hace nada si el nivel está apagado
+    if logger.isEnabledFor(level):
+        logger.log(level, message, extra={'fields': fields})
+
+
+def payload(logger, message, value, **fields):
+    # Payload completo, solo en invocaciones muestreadas o con el header de
+    # debug. La redacción y la serialización ocurren al escribir el registro
+    if _payloads and logger.isEnabledFor(logging.INFO):
+        fields['payload'] = Lazy(lambda: redact(value))
+        logger.info(message, extra={'fields': fields})
+
+
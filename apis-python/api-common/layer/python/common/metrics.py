@@ -0,0 +1,189 @@
+import functools
+import json
+import os
+import threading
+import time
+
+from common import logs
+
+# Métricas por invocación: cada llamada a DynamoDB/Lambda hecha con los
+# clientes de common.runtime se cronometra y pide ReturnConsumedCapacity
+# (hooks de botocore, sin envolver los clientes). Al terminar el handler se
+# escribe una línea en CloudWatch Embedded Metric Format (EMF) con el
+# endpoint, el tenant, las llamadas, RCU/WCU, el cold start y la latencia.
+
+METRICS_ENABLED = os.environ.get("METRICS_ENABLED", "true").lower() != "false"
+METRICS_NAMESPACE = os.environ.get("METRICS_NAMESPACE", "RockieApi")
+
+READ_OPERATIONS = {'GetItem', 'Query', 'Scan', 'BatchGetItem', 'TransactGetItems'}
+WRITE_OPERATIONS = {'PutItem', 'UpdateItem', 'DeleteItem', 'BatchWriteItem', 'TransactWriteItems'}
+
+METRIC_DEFINITIONS = [
+    {'Name': 'Latency', 'Unit': 'Milliseconds'},
+    {'Name': 'IOLatency', 'Unit': 'Milliseconds'},
+    {'Name': 'DynamoDBCalls', 'Unit': 'Count'},
+    {'Name': 'LambdaCalls', 'Unit': 'Count'},
+    {'Name': 'RCU', 'Unit': 'Count'},
+    {'Name': 'WCU', 'Unit': 'Count'},
+    {'Name': 'ColdStart', 'Unit': 'Count'}
+]
+
+_cold_start = True
+_current = None
+
+
+class InvocationMetrics:
+    # Acumulador de una invocación. Lambda ejecuta una invocación por
+    # contenedor a la vez; el lock cubre los handlers que usan hilos
+    __slots__ = ('endpoint', 'tenant_id', 'dynamodb_calls', 'lambda_calls', 'rcu', 'wcu',
+                 'io_seconds', 'operations', 'errors', '_lock')
+
+    def __init__(self, endpoint):
+        self.endpoint = endpoint
+        self.tenant_id = None
+        self.dynamodb_calls = 0
+        self.lambda_calls = 0
+        self.rcu = 0.0
+        self.wcu = 0.0
+        self.io_seconds = 0.0
+        self.operations = {}
+        self.errors = 0
+        self._lock = threading.Lock()
+
+    def record(self, service, operation, elapsed, consumed=None, error=False):
+        with self._lock:
+            if service == 'dynamodb':
+                self.dynamodb_calls += 1
+            elif service == 'lambda':
+                self.lambda_calls += 1
+            self.io_seconds += elapsed
+            self.operations[operation] = self.operations.get(operation, 0) + 1
+            if error:
+                self.errors += 1
+            if consumed:
+                # Batch y transacciones devuelven una lista (una entrada por tabla)
+                for capacity in consumed if isinstance(consumed, list) else (consumed,):
+                    read = capacity.get('ReadCapacityUnits')
+                    write = capacity.get('WriteCapacityUnits')
+                    if read is None and write is None:
+                        units = capacity.get('CapacityUnits', 0)
+                        if operation in WRITE_OPERATIONS:
+                            write = units
+                        else:
+                            read = units
+                    self.rcu += read or 0
+                    self.wcu += write or 0
+
+
+def set_tenant(tenant_id):
+    # Lo llama common.auth al resolver la identidad
+    if _current is not None:
+        _current.tenant_id = tenant_id
+
+
+def _after_call(parsed, context, **kwargs):
+    started = context.get('metrics')
+    if _current is None or started is None:
+        return
+    service, operation, start = started
+    _current.record(service, operation, time.perf_counter() - start,
+                    parsed.get('ConsumedCapacity'), error='Error' in parsed)
+
+
+def _after_call_error(context, **kwargs):
+    # Errores de red/timeout: no hay respuesta que parsear
+    started = context.get('metrics')
+    if _current is None or started is None:
+        return
+    service, operation, start = started
+    _current.record(service, operation, time.perf_counter() - start, error=True)
+
+
+def instrument(client, service):
+    # Registra los hooks en un cliente de botocore (o en el meta.client de un resource)
+    events = getattr(getattr(client, 'meta', None), 'events', None)
+    if not METRICS_ENABLED or events is None:
+        return client
+
+    def before_parameter_build(params, model, context, **kwargs):
+        if _current is None:
+            return
+        if service == 'dynamodb' and (model.name in READ_OPERATIONS or model.name in WRITE_OPERATIONS):
+            params.setdefault('ReturnConsumedCapacity', 'TOTAL')
+        context['metrics'] = (service, model.name, time.perf_counter())
+
+    # before-parameter-build y no provide-client-params: boto3 copia los
+    # parámetros de DynamoDB en este último y el cambio se perdería
+    events.register('before-parameter-build', before_parameter_build, unique_id='metrics-params')
+    events.register('after-call', _after_call, unique_id='metrics-after-call')
+    events.register('after-call-error', _after_call_error, unique_id='metrics-after-call-error')
+    return client
+
+
+def _status_code(response):
+    if isinstance(response, dict):
+        return response.get('statusCode')
+    if isinstance(response, bytes) and response.startswith(b'{"statusCode":'):
+        # json_response: el código está al inicio, sin parsear todo el cuerpo
+        return int(response[14:17])
+    return None
+
+
+# La parte fija del bloque `_aws` se serializa una sola vez
+_CLOUDWATCH_METRICS = json.dumps([{
+    'Namespace': METRICS_NAMESPACE,
+    'Dimensions': [['endpoint']],
+    'Metrics': METRIC_DEFINITIONS
+}], separators=(',', ':'))
+
+
+def emit(metrics, latency, cold_start, status):
+    fields = json.dumps({
+        'endpoint': metrics.endpoint,
+        'tenant_id': metrics.tenant_id,
+        'status': status,
+        'Latency': round(latency * 1000, 3),
+        'IOLatency': round(metrics.io_seconds * 1000, 3),
+        'DynamoDBCalls': metrics.dynamodb_calls,
+        'LambdaCalls': metrics.lambda_calls,
+        'RCU': metrics.rcu,
+        'WCU': metrics.wcu,
+        'ColdStart': int(cold_start),
+        'operations': metrics.operations,
+        'errors': metrics.errors
+    }, separators=(',', ':'))
+    print(f'{{"_aws":{{"Timestamp":{int(time.time() * 1000)},"CloudWatchMetrics":{_CLOUDWATCH_METRICS}}},{fields[1:]}')
+
+
+def instrumented(endpoint):
+    # Decorador para lambda_handler: una línea EMF por invocación (y el
+    # contexto de logging de la invocación)
+    def decorator(handler):
+        if not METRICS_ENABLED:
+            @functools.wraps(handler)
+            def logged(event, context):
+                logs.start_invocation(endpoint, event, context)
+                return handler(event, context)
+            return logged
+
+        @functools.wraps(handler)
+        def wrapper(event, context):
+            global _cold_start, _current
+            logs.start_invocation(endpoint, event, context)
+            cold_start, _cold_start = _cold_start, False
+            metrics = _current = InvocationMetrics(endpoint)
+            body = event.get('body') if isinstance(event, dict) else None
+            if isinstance(body, dict):
+                metrics.tenant_id = body.get('tenant_id')
+            start = time.perf_counter()
+            status = None
+            try:
+                response = handler(event, context)
+                status = _status_code(response)
+                return response
+            finally:
+                _current = None
+                emit(metrics, time.perf_counter() - start, cold_start, status)
+
+        return wrapper
+    return decorator
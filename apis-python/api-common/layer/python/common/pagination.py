@@ -0,0 +1,41 @@
+import base64
+import binascii
+import json
+from decimal import Decimal
+
+# Cursores opacos para la paginación: el LastEvaluatedKey de DynamoDB en JSON
+# compacto codificado en base64url (se puede usar tal cual en una URL)
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def _default(value):
+    if isinstance(value, Decimal):
+        return int(value) if value % 1 == 0 else str(value)
+    raise TypeError(f"Tipo no soportado en el cursor: {type(value).__name__}")
+
+
+def encode_cursor(last_evaluated_key):
+    if not last_evaluated_key:
+        return None
+    raw = json.dumps(last_evaluated_key, separators=(',', ':'), sort_keys=True, default=_default)
+    return base64.urlsafe_b64encode(raw.encode()).rstrip(b'=').decode()
+
+
+def decode_cursor(cursor, expected=None):
+    # `expected` fija atributos que el cursor debe tener (p.ej. el tenant_id
+    # del que consulta), para que no se pueda paginar otra partición
+    if not cursor:
+        return None
+    try:
+        key = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+    except (binascii.Error, ValueError, UnicodeDecodeError):
+        raise InvalidCursor('Cursor inválido')
+    if not isinstance(key, dict):
+        raise InvalidCursor('Cursor inválido')
+    for attribute, value in (expected or {}).items():
+        if key.get(attribute) != value:
+            raise InvalidCursor('Cursor inválido')
+    return key
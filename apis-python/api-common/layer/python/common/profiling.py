@@ -0,0 +1,153 @@
+import cProfile
+import functools
+import json
+import logging
+import os
+import pstats
+import random
+import time
+import tracemalloc
+from collections import defaultdict
+
+# Profiling bajo demanda de una invocación: cProfile + tracemalloc solo en
+# una fracción de las invocaciones (PROFILE_SAMPLE_RATE) o cuando el request
+# trae el header PROFILE_HEADER. El resultado (stacks colapsados, funciones
+# más costosas y principales asignaciones de memoria) se escribe en
+# PROFILE_DIR o, si no está definido, en una línea JSON por stdout.
+# Sin muestreo ni header el costo es una comparación y un get de diccionario.
+
+PROFILE_SAMPLE_RATE = float(os.environ.get("PROFILE_SAMPLE_RATE", "0"))
+# Vacío para ignorar el header (p.ej. en producción)
+PROFILE_HEADER = os.environ.get("PROFILE_HEADER", "X-Debug-Profile")
+PROFILE_DIR = os.environ.get("PROFILE_DIR", "")
+PROFILE_TOP = int(os.environ.get("PROFILE_TOP", "15"))
+PROFILE_MEMORY = os.environ.get("PROFILE_MEMORY", "true").lower() != "false"
+PROFILE_FRAMES = int(os.environ.get("PROFILE_FRAMES", "10"))
+
+# Ramas de menos de 1us no se expanden al colapsar los stacks
+_MIN_WEIGHT = 1e-6
+_MAX_DEPTH = 48
+
+
+def _requested(event):
+    if PROFILE_SAMPLE_RATE and random.random() < PROFILE_SAMPLE_RATE:
+        return True
+    if PROFILE_HEADER and isinstance(event, dict):
+        headers = event.get('headers')
+        if headers:
+            return bool(headers.get(PROFILE_HEADER) or headers.get(PROFILE_HEADER.lower()))
+    return False
+
+
+def _label(func):
+    filename, line, name = func
+    if filename == '~':
+        return name
+    return f"{os.path.basename(filename)}:{name}"
+
+
+def collapsed_stacks(stats):
+    # cProfile guarda el grafo caller -> callee, no los stacks completos: el
+    # tiempo propio de cada función se reparte entre sus callers en
+    # proporción al tiempo acumulado por cada uno. Devuelve {stack: segundos}
+    entries = stats.stats
+    stacks = defaultdict(float)
+
+    def walk(func, weight, stack, seen):
+        callers = entries.get(func, (0, 0, 0, 0, {}))[4]
+        total = sum(edge[3] or edge[2] for edge in callers.values())
+        if not callers or total <= 0 or len(stack) >= _MAX_DEPTH:
+            stacks[';'.join(reversed(stack))] += weight
+            return
+        for caller, edge in callers.items():
+            share = weight * (edge[3] or edge[2]) / total
+            if caller in seen or share < _MIN_WEIGHT:
+                stacks[';'.join(reversed(stack))] += share
+                continue
+            walk(caller, share, stack + [_label(caller)], seen | {caller})
+
+    for func, (_, _, own, _, _) in entries.items():
+        if own > 0:
+            walk(func, own, [_label(func)], {func})
+    return stacks
+
+
+def top_functions(stats, top):
+    rows = sorted(stats.stats.items(), key=lambda item: item[1][3], reverse=True)[:top]
+    return [[_label(func), calls, round(own * 1000, 3), round(cumulative * 1000, 3)]
+            for func, (_, calls, own, cumulative, _) in rows]
+
+
+def top_allocations(snapshot, top):
+    snapshot = snapshot.filter_traces((
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, __file__)
+    ))
+    return [[f"{os.path.basename(stat.traceback[0].filename)}:{stat.traceback[0].lineno}",
+             round(stat.size / 1024, 1), stat.count]
+            for stat in snapshot.statistics('lineno')[:top]]
+
+
+def report(name, request_id, elapsed, profiler, snapshot):
+    stats = pstats.Stats(profiler)
+    stacks = collapsed_stacks(stats)
+    allocations = top_allocations(snapshot, PROFILE_TOP) if snapshot else []
+
+    if PROFILE_DIR:
+        os.makedirs(PROFILE_DIR, exist_ok=True)
+        base = os.path.join(PROFILE_DIR, f"{name}-{request_id}")
+        # Formato de flamegraph.pl / speedscope: "a;b;c microsegundos"
+        with open(f"{base}.collapsed", 'w') as f:
+            for stack, seconds in sorted(stacks.items()):
+                if seconds >= _MIN_WEIGHT:
+                    f.write(f"{stack} {int(seconds * 1e6)}\n")
+        stats.dump_stats(f"{base}.pstats")
+        with open(f"{base}.alloc.txt", 'w') as f:
+            for where, kb, count in allocations:
+                f.write(f"{kb:>10.1f} KiB {count:>8} {where}\n")
+        return base
+
+    heaviest = sorted(stacks.items(), key=lambda item: item[1], reverse=True)[:PROFILE_TOP]
+    print(json.dumps({
+        'profile': name,
+        'request_id': request_id,
+        'wall_ms': round(elapsed * 1000, 3),
+        'functions': top_functions(stats, PROFILE_TOP),
+        'stacks': [[stack, int(seconds * 1e6)] for stack, seconds in heaviest],
+        'allocations': allocations
+    }, separators=(',', ':')))
+    return None
+
+
+def profiled(handler):
+    # Decorador para lambda_handler (va debajo de @metrics.instrumented)
+    name = handler.__module__.replace('Lambda_', '')
+
+    @functools.wraps(handler)
+    def wrapper(event, context):
+        if not _requested(event):
+            return handler(event, context)
+
+        request_id = getattr(context, 'aws_request_id', None) or f"{time.time_ns()}"
+        tracing = PROFILE_MEMORY and not tracemalloc.is_tracing()
+        if tracing:
+            tracemalloc.start(PROFILE_FRAMES)
+        profiler = cProfile.Profile()
+        start = time.perf_counter()
+        profiler.enable()
+        try:
+            return handler(event, context)
+        finally:
+            profiler.disable()
+            elapsed = time.perf_counter() - start
+            snapshot = None
+            if tracing:
+                snapshot = tracemalloc.take_snapshot()
+                tracemalloc.stop()
+            try:
+                report(name, request_id, elapsed, profiler, snapshot)
+            except Exception as e:
+                # El profiling nunca debe romper la respuesta
+                logging.getLogger().warning(f"No se pudo escribir el profile de {name}: {e}")
+
+    return wrapper
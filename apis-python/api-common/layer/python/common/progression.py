@@ -0,0 +1,208 @@
+import json
+import os
+import threading
+import time
+from bisect import bisect_right
+from concurrent.futures import ThreadPoolExecutor
+
+from botocore.exceptions import ClientError
+
+from common.batch import batch_get
+
+# Progresión de los rockies: la experiencia se suma con ADD y el nivel y la
+# etapa de evolución se calculan en el servidor a partir de la curva de
+# niveles, en el mismo UpdateItem condicional. La condición acota la
+# experiencia previa al rango con el que el nivel calculado sigue siendo
+# correcto, así que dos premios concurrentes dentro del mismo nivel no
+# chocan; si la condición falla se reintenta con el item que devuelve
+# DynamoDB (ReturnValuesOnConditionCheckFailure), sin lecturas extra.
+
+# Experiencia máxima por premio
+MAX_AWARD = int(os.environ.get("MAX_EXPERIENCE_AWARD", "100000"))
+MAX_ATTEMPTS = 5
+
+
+class RockieNotFound(Exception):
+    pass
+
+
+class LevelCurve:
+
+    def __init__(self, thresholds, stages):
+        # thresholds[i]: experiencia acumulada para llegar al nivel i + 1
+        # stages: [(nivel mínimo, etapa de evolución)]
+        if not thresholds or thresholds[0] != 0 or sorted(thresholds) != list(thresholds):
+            raise ValueError('La curva de niveles debe empezar en 0 y ser creciente')
+        self.thresholds = list(thresholds)
+        self.stages = sorted((int(level), name) for level, name in stages)
+        self._stage_levels = [level for level, _ in self.stages]
+
+    @property
+    def max_level(self):
+        return len(self.thresholds)
+
+    def level(self, experience):
+        return max(1, bisect_right(self.thresholds, experience))
+
+    def evolution(self, level):
+        position = bisect_right(self._stage_levels, level) - 1
+        return self.stages[max(0, position)][1]
+
+    def bracket(self, level):
+        # Rango [desde, hasta] de experiencia del nivel (hasta=None en el máximo)
+        upper = self.thresholds[level] - 1 if level < self.max_level else None
+        return self.thresholds[level - 1], upper
+
+    @classmethod
+    def default(cls, max_level=50, base=100):
+        # Nivel n + 1 cuesta base * n de experiencia: 0, 100, 300, 600, ...
+        return cls([base * n * (n - 1) // 2 for n in range(1, max_level + 1)],
+                   [(1, 'Stage 1'), (10, 'Stage 2'), (25, 'Stage 3')])
+
+    @classmethod
+    def from_environment(cls):
+        # LEVEL_CURVE='[0, 100, 250, ...]' y EVOLUTION_STAGES='[[1, "Stage 1"], [10, "Stage 2"]]'
+        default = cls.default()
+        thresholds = json.loads(os.environ["LEVEL_CURVE"]) if os.environ.get("LEVEL_CURVE") else default.thresholds
+        stages = json.loads(os.environ["EVOLUTION_STAGES"]) if os.environ.get("EVOLUTION_STAGES") else default.stages
+        return cls(thresholds, stages)
+
+
+# Cargada una sola vez por contenedor
+level_curve = LevelCurve.from_environment()
+
+
+def experience_of(item):
+    # El item de ReturnValuesOnConditionCheckFailure llega en el formato de
+    # bajo nivel ({'N': '150'}) porque boto3 no deserializa los errores
+    value = (item or {}).get('experience', 0)
+    if isinstance(value, dict):
+        value = value.get('N', 0)
+    return int(value)
+
+
+def award_update(tenant_id, student_id, delta, experience, curve=None):
+    # Parámetros del UpdateItem que suma `delta` partiendo de `experience`.
+    # Devuelve (parámetros, nivel, evolución); sirve también dentro de una
+    # transacción (TransactWriteItems)
+    curve = curve or level_curve
+    level = curve.level(experience + delta)
+    evolution = curve.evolution(level)
+    lower, upper = curve.bracket(level)
+    # Experiencia previa con la que experiencia + delta cae en `level`
+    lower = max(0, lower - delta)
+    values = {':delta': delta, ':level': level, ':evolution': evolution, ':lower': lower}
+    if upper is None:
+        guard = 'experience >= :lower'
+    else:
+        guard = 'experience BETWEEN :lower AND :upper'
+        values[':upper'] = upper - delta
+    if lower == 0:
+        guard = f"(attribute_not_exists(experience) OR {guard})"
+    params = {
+        'Key': {'tenant_id': tenant_id, 'student_id': student_id},
+        'UpdateExpression': 'ADD experience :delta SET #level = :level, rockie_data.evolution = :evolution',
+        'ConditionExpression': f"attribute_exists(student_id) AND {guard}",
+        'ExpressionAttributeNames': {'#level': 'level'},
+        'ExpressionAttributeValues': values,
+        'ReturnValuesOnConditionCheckFailure': 'ALL_OLD'
+    }
+    return params, level, evolution
+
+
+def award_experience(table, tenant_id, student_id, delta, experience=None, curve=None):
+    # Suma `delta` de experiencia y recalcula nivel y evolución. `experience`
+    # es la experiencia actual si el llamador ya la conoce (evita la lectura).
+    # Devuelve {'experience', 'level', 'evolution', 'leveled_up', 'attempts'}
+    curve = curve or level_curve
+    for attempt in range(1, MAX_ATTEMPTS + 1):
+        if experience is None:
+            item = table.get_item(
+                Key={'tenant_id': tenant_id, 'student_id': student_id},
+                ProjectionExpression='experience',
+                ConsistentRead=True
+            ).get('Item')
+            if item is None:
+                raise RockieNotFound(student_id)
+            experience = experience_of(item)
+
+        params, level, evolution = award_update(tenant_id, student_id, delta, experience, curve)
+        try:
+            response = table.update_item(ReturnValues='UPDATED_NEW', **params)
+        except ClientError as e:
+            if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+                raise
+            current = e.response.get('Item')
+            if current is None:
+                raise RockieNotFound(student_id)
+            # Otro premio cambió el nivel entretanto: se reintenta con el valor actual
+            experience = experience_of(current)
+            continue
+
+        attributes = response['Attributes']
+        return {
+            'experience': int(attributes['experience']),
+            'level': level,
+            'evolution': evolution,
+            'leveled_up': level > curve.level(experience),
+            'attempts': attempt
+        }
+    raise RuntimeError(f"No se pudo aplicar la experiencia a {student_id} tras {MAX_ATTEMPTS} intentos")
+
+
+def current_experience(table, tenant_id, student_ids):
+    # Experiencia actual de varios rockies con BatchGetItem (100 por llamada).
+    # Los que no existen no aparecen en el resultado
+    current = {}
+    student_ids = list(student_ids)
+    for position in range(0, len(student_ids), 100):
+        items = batch_get(table.meta.client, {table.name: {
+            'Keys': [{'tenant_id': tenant_id, 'student_id': student_id}
+                     for student_id in student_ids[position:position + 100]],
+            'ProjectionExpression': 'student_id, experience'
+        }}).get(table.name, [])
+        current.update((item['student_id'], experience_of(item)) for item in items)
+    return current
+
+
+def award_many(table, tenant_id, awards, workers=8, curve=None):
+    # awards: [(student_id, delta)]. La experiencia actual se lee con
+    # BatchGetItem (100 por llamada) y luego se aplica un UpdateItem
+    # condicional por estudiante en paralelo. Devuelve el resultado de cada
+    # uno y el throughput
+    totals = {}
+    for student_id, delta in awards:
+        # Varios premios al mismo estudiante se suman en uno solo
+        totals[student_id] = totals.get(student_id, 0) + delta
+
+    start = time.perf_counter()
+    current = current_experience(table, tenant_id, totals)
+
+    results = {}
+    lock = threading.Lock()
+
+    def award(entry):
+        student_id, delta = entry
+        try:
+            if student_id not in current:
+                raise RockieNotFound(student_id)
+            result = award_experience(table, tenant_id, student_id, delta, experience=current[student_id],
+                                      curve=curve)
+        except RockieNotFound:
+            result = {'error': 'Rockie no encontrado'}
+        except (ClientError, RuntimeError) as e:
+            result = {'error': str(e)}
+        with lock:
+            results[student_id] = result
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        list(executor.map(award, totals.items()))
+    elapsed = time.perf_counter() - start
+    return {
+        'awarded': sum(1 for result in results.values() if 'error' not in result),
+        'failed': sum(1 for result in results.values() if 'error' in result),
+        'leveled_up': sum(1 for result in results.values() if result.get('leveled_up')),
+        'elapsed_seconds': round(elapsed, 3),
+        'awards_per_second': round(len(awards) / elapsed, 1) if elapsed else None,
+        'results': results
+    }
@@ -0,0 +1,138 @@
+import os
+import time
+
+from botocore.exceptions import ClientError
+
+from common.batch import backoff_delay
+from common.catalog import catalog as default_catalog
+from common.inventory import ACCESSORIES, migrate_rockie
+from common.progression import RockieNotFound
+from common.serializer import plain_item
+from common.wallet import CURRENCIES, InsufficientFunds, StudentNotFound
+
+# Compra de un accesorio en una sola TransactWriteItems:
+#   0. t_purchasable: el precio sigue siendo el cacheado y, si el producto
+#      tiene `stock`, queda al menos una unidad (se descuenta)
+#   1. t_students: ADD negativo al saldo con la condición de que alcance
+#   2. t_rockies: ADD del accesorio al set del inventario si el rockie
+#      todavía no lo tiene (ver common.inventory)
+# Si la transacción se cancela, los CancellationReasons (con el item actual
+# gracias a ReturnValuesOnConditionCheckFailure) dicen qué falló; un precio
+# desactualizado refresca el catálogo, un ValidationError del rockie (la
+# lista anterior) lo migra y un TransactionConflict se reintenta, todos hasta
+# PURCHASE_MAX_ATTEMPTS veces; cualquier otro motivo se propaga.
+
+PURCHASE_MAX_ATTEMPTS = int(os.environ.get("PURCHASE_MAX_ATTEMPTS", "3"))
+
+
+class PurchaseError(Exception):
+    pass
+
+
+class ProductNotFound(PurchaseError):
+    pass
+
+
+class OutOfStock(PurchaseError):
+    pass
+
+
+class AlreadyOwned(PurchaseError):
+    pass
+
+
+def _transact_items(tables, tenant_id, student_id, product):
+    t_purchasables, t_students, t_rockies = tables
+    if product['stock'] is None:
+        check = {'ConditionCheck': {
+            'TableName': t_purchasables.name,
+            'Key': {'tenant_id': tenant_id, 'product_id': product['product_id']},
+            'ConditionExpression': 'price = :price AND attribute_not_exists(stock)',
+            'ExpressionAttributeValues': {':price': product['price']},
+            'ReturnValuesOnConditionCheckFailure': 'ALL_OLD'
+        }}
+    else:
+        check = {'Update': {
+            'TableName': t_purchasables.name,
+            'Key': {'tenant_id': tenant_id, 'product_id': product['product_id']},
+            'UpdateExpression': 'ADD stock :minus',
+            'ConditionExpression': 'price = :price AND stock > :zero',
+            'ExpressionAttributeValues': {':price': product['price'], ':minus': -1, ':zero': 0},
+            'ReturnValuesOnConditionCheckFailure': 'ALL_OLD'
+        }}
+    key = {'tenant_id': tenant_id, 'student_id': student_id}
+    return [
+        check,
+        {'Update': {
+            'TableName': t_students.name,
+            'Key': key,
+            'UpdateExpression': 'ADD student_data.#c :debit',
+            'ConditionExpression': 'attribute_exists(student_id) AND student_data.#c >= :price',
+            'ExpressionAttributeNames': {'#c': product['currency']},
+            'ExpressionAttributeValues': {':debit': -product['price'], ':price': product['price']},
+            'ReturnValuesOnConditionCheckFailure': 'ALL_OLD'
+        }},
+        {'Update': {
+            'TableName': t_rockies.name,
+            'Key': key,
+            'UpdateExpression': 'ADD rockie_data.#a :accessory',
+            'ConditionExpression': 'attribute_exists(student_id) AND NOT contains(rockie_data.#a, :id)',
+            'ExpressionAttributeNames': {'#a': ACCESSORIES},
+            'ExpressionAttributeValues': {':accessory': {product['accessory_id']}, ':id': product['accessory_id']},
+            'ReturnValuesOnConditionCheckFailure': 'ALL_OLD'
+        }}
+    ]
+
+
+def purchase_accessory(t_purchasables, t_students, t_rockies, tenant_id, student_id, product_id, catalog=None,
+                       max_attempts=PURCHASE_MAX_ATTEMPTS, sleep=time.sleep):
+    # Devuelve {'product_id', 'accessory_id', 'price', 'currency', 'attempts'}
+    catalog = catalog or default_catalog
+    product = catalog.product(t_purchasables, tenant_id, product_id)
+    client = t_students.meta.client
+    for attempt in range(1, max_attempts + 1):
+        if product is None or product['currency'] not in CURRENCIES:
+            raise ProductNotFound(product_id)
+        try:
+            client.transact_write_items(TransactItems=_transact_items(
+                (t_purchasables, t_students, t_rockies), tenant_id, student_id, product))
+        except ClientError as e:
+            if e.response['Error']['Code'] != 'TransactionCanceledException':
+                raise
+            reasons = e.response.get('CancellationReasons') or []
+            listing, student, rockie = (reasons + [{}, {}, {}])[:3]
+            if listing.get('Code') == 'ConditionalCheckFailed':
+                current = plain_item(listing.get('Item'))
+                product = catalog.refresh(tenant_id, product_id, current)
+                if product is None:
+                    raise ProductNotFound(product_id)
+                if product['stock'] is not None and product['stock'] <= 0:
+                    raise OutOfStock(product_id)
+                # El precio o el stock cambiaron: se reintenta con el catálogo al día
+                continue
+            if student.get('Code') == 'ConditionalCheckFailed':
+                current = plain_item(student.get('Item'))
+                if current is None:
+                    raise StudentNotFound(student_id)
+                raise InsufficientFunds(int((current.get('student_data') or {}).get(product['currency'], 0)))
+            if rockie.get('Code') == 'ConditionalCheckFailed':
+                if rockie.get('Item') is None:
+                    raise RockieNotFound(student_id)
+                raise AlreadyOwned(product['accessory_id'])
+            if rockie.get('Code') == 'ValidationError' and migrate_rockie(t_rockies, tenant_id, student_id):
+                # ADD de un set sobre la lista anterior: convertida, se reintenta
+                continue
+            if not any(reason.get('Code') == 'TransactionConflict' for reason in reasons):
+                raise
+            # Otra escritura en curso sobre alguno de los items
+            if attempt < max_attempts:
+                sleep(backoff_delay(attempt))
+            continue
+        return {
+            'product_id': product_id,
+            'accessory_id': product['accessory_id'],
+            'price': int(product['price']),
+            'currency': product['currency'],
+            'attempts': attempt
+        }
+    raise RuntimeError(f"No se pudo completar la compra de {product_id} tras {max_attempts} intentos")
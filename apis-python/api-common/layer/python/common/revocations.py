@@ -0,0 +1,150 @@
+import logging
+import os
+import threading
+import time
+from decimal import Decimal
+
+from botocore.exceptions import ClientError
+
+from common.signed_token import MAX_TTL_SECONDS
+from common.token_cache import TOKEN_CACHE_TTL
+
+# Sello de versión de las revocaciones de sesiones. Revocar las sesiones de un
+# estudiante actualiza un item reservado de t_access_tokens (STAMP_TOKEN) con
+# una versión creciente y la hora de la revocación de cada estudiante. Cada
+# contenedor relee ese item como máximo cada REVOCATION_SYNC_SECONDS y, si la
+# versión cambió, descarta de su cache los tokens de esos estudiantes: la
+# validación de un token no agrega ninguna lectura. Los tokens firmados no
+# están en la tabla: se rechazan si se emitieron antes de la última
+# revocación del estudiante (salvo el que se pidió conservar).
+
+STAMP_TOKEN = '#revocations'
+REVOCATION_SYNC_SECONDS = float(os.environ.get("REVOCATION_SYNC_SECONDS", "10"))
+# Pasado este tiempo ningún cache conserva tokens anteriores a la revocación
+REVOCATION_WINDOW_SECONDS = TOKEN_CACHE_TTL + REVOCATION_SYNC_SECONDS
+# Las revocaciones se guardan hasta que venza el último token firmado anterior
+REVOCATION_RETENTION_SECONDS = max(REVOCATION_WINDOW_SECONDS, MAX_TTL_SECONDS + REVOCATION_SYNC_SECONDS)
+# Tope de revocaciones en el item (límite de 400 KB de DynamoDB)
+REVOCATION_MAX_ENTRIES = int(os.environ.get("REVOCATION_MAX_ENTRIES", "1000"))
+
+# Cada revocación es un atributo "revoked:<tenant_id>/<student_id>"
+ENTRY_PREFIX = 'revoked:'
+
+logger = logging.getLogger()
+
+
+def publish(table, tenant_id, student_id, keep_nonce=None):
+    # Registra la revocación y sube la versión del sello en un solo UpdateItem.
+    # `keep_nonce` es el token firmado que sigue vigente (p.ej. el del request)
+    now = time.time()
+    entry = {'tenant_id': tenant_id, 'student_id': student_id, 'revoked_at': Decimal(f"{now:.3f}")}
+    if keep_nonce:
+        entry['kept'] = keep_nonce
+    attributes = table.update_item(
+        Key={'token': STAMP_TOKEN},
+        UpdateExpression='ADD #v :one SET #k = :entry',
+        ExpressionAttributeNames={'#v': 'version', '#k': f"{ENTRY_PREFIX}{tenant_id}/{student_id}"},
+        ExpressionAttributeValues={':one': 1, ':entry': entry},
+        ReturnValues='ALL_NEW'
+    )['Attributes']
+    _prune(table, attributes, now)
+    return int(attributes['version'])
+
+
+def _prune(table, stamp, now):
+    # Quita las revocaciones que ya no afectan a ningún cache y, si aun así
+    # se supera REVOCATION_MAX_ENTRIES, las más antiguas; en ese caso
+    # `pruned_version` avisa a los contenedores que deben vaciar su cache
+    entries = sorted((entry['revoked_at'], key) for key, entry in stamp.items() if key.startswith(ENTRY_PREFIX))
+    cutoff = int(now - REVOCATION_RETENTION_SECONDS)
+    stale = [key for revoked_at, key in entries if revoked_at < cutoff]
+    overflow = max(0, len(entries) - len(stale) - REVOCATION_MAX_ENTRIES)
+    stale.extend(key for _, key in entries[len(stale):len(stale) + overflow])
+    if not stale:
+        return
+
+    names = {f"#k{i}": key for i, key in enumerate(stale[:100])}
+    values = {}
+    update = 'REMOVE ' + ', '.join(names)
+    if overflow:
+        names['#p'] = 'pruned_version'
+        values[':p'] = stamp['version']
+        update = f"SET #p = :p {update}"
+    names['#at'] = 'revoked_at'
+    values[':cutoff'] = cutoff if not overflow else int(now) + 1
+    try:
+        # La condición evita borrar una revocación que se repitió entretanto
+        table.update_item(
+            Key={'token': STAMP_TOKEN},
+            UpdateExpression=update,
+            ConditionExpression=' AND '.join(f"{name}.#at < :cutoff" for name in names if name.startswith('#k')),
+            ExpressionAttributeNames=names,
+            ExpressionAttributeValues=values
+        )
+    except ClientError as e:
+        if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+            raise
+
+
+class RevocationStamp:
+    # Versión del sello vista por este contenedor
+
+    def __init__(self, sync_seconds=REVOCATION_SYNC_SECONDS, clock=time.time):
+        self.sync_seconds = sync_seconds
+        self.clock = clock
+        self.version = None
+        # (tenant_id, student_id) -> (revoked_at, nonce conservado)
+        self.revoked = {}
+        self.next_sync = 0.0
+        self.syncs = 0
+        self._lock = threading.Lock()
+
+    def sync(self, get_table, cache):
+        # Lo llama auth.validate_token antes de consultar el cache: solo hace
+        # I/O una vez cada sync_seconds por contenedor
+        now = self.clock()
+        if now < self.next_sync:
+            return
+        with self._lock:
+            if now < self.next_sync:
+                return
+            self.next_sync = now + self.sync_seconds
+
+        try:
+            item = get_table().get_item(Key={'token': STAMP_TOKEN}).get('Item')
+        except ClientError as e:
+            # Se sigue con el cache y se reintenta en el próximo ciclo
+            logger.warning(f"No se pudo leer el sello de revocaciones: {e}")
+            return
+        self.syncs += 1
+
+        item = item or {}
+        version = int(item.get('version', 0))
+        if version == self.version:
+            return
+        if self.version is not None and int(item.get('pruned_version', 0)) > self.version:
+            # Se descartaron revocaciones que este contenedor no llegó a ver
+            cache.clear()
+        self.version = version
+        cutoff = now - REVOCATION_WINDOW_SECONDS
+        revoked = {}
+        for key, entry in item.items():
+            if not key.startswith(ENTRY_PREFIX):
+                continue
+            revoked[(entry['tenant_id'], entry['student_id'])] = (float(entry['revoked_at']), entry.get('kept'))
+            if entry['revoked_at'] >= cutoff:
+                cache.invalidate_student(entry['tenant_id'], entry['student_id'])
+        self.revoked = revoked
+
+    def is_revoked(self, tenant_id, student_id, issued_at, nonce=None):
+        # Token firmado emitido antes de la última revocación del estudiante
+        # (sin `i`, los emitidos antes de este cambio, cuenta como antiguo)
+        entry = self.revoked.get((tenant_id, student_id))
+        if entry is None:
+            return False
+        revoked_at, kept = entry
+        return float(issued_at or 0) <= revoked_at and not (kept and nonce == kept)
+
+
+# Instancia a nivel de módulo: vive mientras el contenedor esté caliente
+revocation_stamp = RevocationStamp()
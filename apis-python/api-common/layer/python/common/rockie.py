@@ -0,0 +1,36 @@
+from datetime import datetime
+
+from common.progression import level_curve
+
+# Accesorios con los que nace todo rockie
+DEFAULT_ADORNED = {
+    "head_accessory": "head_acc001",
+    "arms_accessory": "arms_acc002",
+    "body_accessory": "body_acc003",
+    "face_accessory": "face_acc004",
+    "background_accessory": "bg_acc005"
+}
+
+
+def build_rockie_item(tenant_id, student_id, rockie_name, experience=0, accessories_ids=None,
+                      creation_date=None, curve=None):
+    # Nivel y evolución salen de la curva de progresión (nunca del cliente).
+    # El inventario es un string set que incluye los accesorios equipados
+    # (ver common.inventory); nunca queda vacío
+    curve = curve or level_curve
+    level = curve.level(experience)
+    owned = set(DEFAULT_ADORNED.values())
+    owned.update(a for a in accessories_ids or () if isinstance(a, str) and a)
+    return {
+        'tenant_id': tenant_id,
+        'student_id': student_id,
+        'level': level,
+        'experience': experience,
+        'rockie_data': {
+            'rockie_name': rockie_name,
+            'rockie_adorned': dict(DEFAULT_ADORNED),
+            'rockie_all_accessories_ids': owned,
+            'evolution': curve.evolution(level)
+        },
+        'creation_date': creation_date or datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    }
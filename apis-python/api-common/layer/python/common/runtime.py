@@ -0,0 +1,89 @@
+import os
+import threading
+
+import boto3
+from botocore.config import Config
+
+from common import metrics
+
+# Clientes de AWS creados una sola vez por contenedor. Los handlers los piden
+# aquí en lugar de llamar a boto3.client/boto3.resource en cada invocación,
+# así que las invocaciones en caliente reutilizan la sesión, los modelos de
+# servicio ya cargados y el pool de conexiones HTTP (con keep-alive).
+
+CLIENT_CONFIG = Config(
+    connect_timeout=float(os.environ.get("AWS_CONNECT_TIMEOUT", "2")),
+    read_timeout=float(os.environ.get("AWS_READ_TIMEOUT", "5")),
+    max_pool_connections=int(os.environ.get("AWS_MAX_POOL_CONNECTIONS", "32")),
+    tcp_keepalive=True,
+    retries={
+        'mode': os.environ.get("AWS_RETRY_MODE", "standard"),
+        'max_attempts': int(os.environ.get("AWS_MAX_ATTEMPTS", "3"))
+    }
+)
+
+_clients = {}
+_tables = {}
+_dynamodb = None
+_lock = threading.Lock()
+
+
+def client(service):
+    # Cliente de bajo nivel (thread-safe) para cualquier servicio
+    found = _clients.get(service)
+    if found is None:
+        with _lock:
+            found = _clients.get(service)
+            if found is None:
+                found = _clients[service] = metrics.instrument(
+                    boto3.client(service, config=CLIENT_CONFIG), service)
+    return found
+
+
+def dynamodb():
+    # La capa de resources es la parte más pesada de boto3 (carga el modelo
+    # de resources además del de servicio): se crea solo cuando se pide
+    global _dynamodb
+    if _dynamodb is None:
+        with _lock:
+            if _dynamodb is None:
+                resource = boto3.resource('dynamodb', config=CLIENT_CONFIG)
+                metrics.instrument(resource.meta.client, 'dynamodb')
+                _dynamodb = resource
+    return _dynamodb
+
+
+def table(name):
+    found = _tables.get(name)
+    if found is None:
+        found = _tables[name] = dynamodb().Table(name)
+    return found
+
+
+def warm(*services):
+    # Hook de pre-inicialización: se llama a nivel de módulo en los handlers
+    # para que la creación de clientes ocurra en la fase Init de Lambda
+    dynamodb()
+    for service in services:
+        client(service)
+
+
+def reset():
+    # Descarta los clientes cacheados (usado por los benchmarks)
+    global _dynamodb
+    with _lock:
+        _clients.clear()
+        _tables.clear()
+        _dynamodb = None
+
+
+def override(dynamodb=None, **clients):
+    # Reemplaza los clientes por dobles locales (benchmarks sin AWS)
+    global _dynamodb
+    with _lock:
+        if dynamodb is not None:
+            _dynamodb = dynamodb
+            _tables.clear()
+            metrics.instrument(dynamodb.meta.client, 'dynamodb')
+        for service, found in clients.items():
+            _clients[service] = metrics.instrument(found, service)
@@ -0,0 +1,65 @@
+import base64
+import json
+import os
+from decimal import Decimal
+
+from boto3.dynamodb.types import Binary, TypeDeserializer
+
+# Serializa items de DynamoDB (Decimal, sets, Binary) a JSON en una sola
+# pasada, sin copiar la estructura antes. Si orjson está instalado (p.ej.
+# incluido en el layer) se usa como backend; SERIALIZER_BACKEND=json fuerza
+# el de la librería estándar.
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - depende del entorno
+    orjson = None
+
+if os.environ.get("SERIALIZER_BACKEND") == "json":
+    orjson = None
+
+BACKEND = 'orjson' if orjson else 'json'
+
+
+def _default(obj):
+    # Solo se llama para los tipos que el encoder no conoce
+    if isinstance(obj, Decimal):
+        return int(obj) if obj % 1 == 0 else float(obj)
+    if isinstance(obj, (set, frozenset)):
+        return sorted(obj) if all(isinstance(v, str) for v in obj) else list(obj)
+    if isinstance(obj, Binary):
+        return base64.b64encode(obj.value).decode()
+    if isinstance(obj, (bytes, bytearray)):
+        return base64.b64encode(obj).decode()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+_encoder = json.JSONEncoder(default=_default, ensure_ascii=False, separators=(',', ':'))
+
+if orjson:
+    def dumps(obj):
+        return orjson.dumps(obj, default=_default)
+else:
+    def dumps(obj):
+        return _encoder.encode(obj).encode()
+
+
+def json_response(status_code, body):
+    # Respuesta completa ya codificada: el runtime de Lambda devuelve los
+    # bytes tal cual, sin volver a serializar
+    return dumps({'statusCode': status_code, 'body': body})
+
+
+_deserializer = TypeDeserializer()
+
+
+def plain_item(item):
+    # Los items de ReturnValuesOnConditionCheckFailure (en el error o en los
+    # CancellationReasons de una transacción) llegan en el formato de bajo
+    # nivel ({'N': '150'}) porque boto3 no deserializa los errores
+    if item and all(isinstance(value, dict) and len(value) == 1 for value in item.values()):
+        try:
+            return {name: _deserializer.deserialize(value) for name, value in item.items()}
+        except (TypeError, KeyError):
+            pass
+    return item
@@ -0,0 +1,127 @@
+import hashlib
+import os
+import time
+import uuid
+
+from boto3.dynamodb.conditions import Key
+from botocore.exceptions import ClientError
+
+from common import signed_token
+from common.auth import EXPIRES_AT, get_tokens_table, invalidate, token_expiry
+from common.batch import batch_delete
+from common.revocations import publish
+
+# Índice de t_access_tokens por estudiante (PK tenant_id, SK student_id)
+STUDENT_TOKENS_INDEX = 'student_tokens_index'
+
+# Sesiones vigentes por estudiante; al abrir una más se borran las que vencen antes
+MAX_SESSIONS = int(os.environ.get("MAX_SESSIONS", "5"))
+
+
+def _query_student(tenant_id, student_id, attributes):
+    # Query paginada sobre el índice proyectando solo `attributes`
+    table = get_tokens_table()
+    names = {f"#a{i}": attribute for i, attribute in enumerate(attributes)}
+    items = []
+    kwargs = {
+        'IndexName': STUDENT_TOKENS_INDEX,
+        'KeyConditionExpression': Key('tenant_id').eq(tenant_id) & Key('student_id').eq(student_id),
+        'ProjectionExpression': ', '.join(names),
+        'ExpressionAttributeNames': names
+    }
+    while True:
+        response = table.query(**kwargs)
+        items.extend(response['Items'])
+        if 'LastEvaluatedKey' not in response:
+            return items
+        kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+
+def list_tokens(tenant_id, student_id):
+    return [item['token'] for item in _query_student(tenant_id, student_id, ('token',))]
+
+
+def list_sessions(tenant_id, student_id):
+    # Sesiones con token, dispositivo y vencimiento (el índice debe proyectar
+    # device_id y expires_at)
+    return _query_student(tenant_id, student_id, ('token', 'device_id', EXPIRES_AT, 'expires'))
+
+
+def delete_tokens(tokens):
+    # Borrado en lotes de 25; devuelve los tokens que no se pudieron borrar
+    table = get_tokens_table()
+    failed = batch_delete(table.meta.client, table.name, [{'token': token} for token in tokens])
+    return [request['DeleteRequest']['Key']['token'] for request in failed]
+
+
+def session_id(token):
+    # Identificador público de una sesión: nunca se devuelve el token de otra sesión
+    return hashlib.sha256(token.encode()).hexdigest()[:16]
+
+
+def revoke_sessions(tenant_id, student_id, keep=None):
+    # Borra en lotes las sesiones del estudiante (menos `keep`) y publica la
+    # revocación para los caches de los demás contenedores y para los tokens
+    # firmados, que no están en la tabla. Devuelve (sesiones revocadas,
+    # tokens que no se pudieron borrar)
+    tokens = [token for token in list_tokens(tenant_id, student_id) if token != keep]
+    invalidate(tenant_id=tenant_id, student_id=student_id)
+    failed = delete_tokens(tokens) if tokens else []
+    publish(get_tokens_table(), tenant_id, student_id, keep_nonce=signed_token.nonce_of(keep) if keep else None)
+    return len(tokens) - len(failed), failed
+
+
+def slide_session(token, device_id, expires_at):
+    # Extiende una sesión vigente del mismo dispositivo. La condición evita
+    # revivir un token revocado o vencido entre la query y el update
+    try:
+        get_tokens_table().update_item(
+            Key={'token': token},
+            UpdateExpression='SET #e = :e',
+            ConditionExpression='#d = :d AND #e > :now',
+            ExpressionAttributeNames={'#e': EXPIRES_AT, '#d': 'device_id'},
+            ExpressionAttributeValues={':e': expires_at, ':d': device_id, ':now': int(time.time())}
+        )
+    except ClientError as e:
+        if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+            raise
+        return False
+    return True
+
+
+def open_session(tenant_id, student_id, device_id=None, ttl_seconds=3600):
+    # Reutiliza la sesión vigente del dispositivo (un UpdateItem condicional)
+    # o crea una nueva respetando MAX_SESSIONS. Devuelve (token, reutilizada)
+    now = int(time.time())
+    expires_at = now + ttl_seconds
+    live = []
+    for session in list_sessions(tenant_id, student_id):
+        session_expires = token_expiry(session)
+        if session_expires is not None and session_expires > now:
+            live.append((session_expires, session))
+    live.sort(key=lambda entry: entry[0])
+
+    if device_id:
+        for _, session in reversed(live):
+            if session.get('device_id') == device_id and slide_session(session['token'], device_id, expires_at):
+                return session['token'], True
+
+    token = str(uuid.uuid4())
+    item = {
+        'token': token,
+        'tenant_id': tenant_id,
+        'student_id': student_id,
+        # Epoch en segundos: atributo TTL de la tabla
+        EXPIRES_AT: expires_at
+    }
+    if device_id:
+        item['device_id'] = device_id
+    get_tokens_table().put_item(Item=item)
+
+    # Se borran las sesiones que vencen antes hasta quedar en MAX_SESSIONS
+    surplus = [session['token'] for _, session in live[:max(0, len(live) + 1 - MAX_SESSIONS)]]
+    if surplus:
+        delete_tokens(surplus)
+        for old_token in surplus:
+            invalidate(token=old_token)
+    return token, False
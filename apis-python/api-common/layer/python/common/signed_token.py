@@ -0,0 +1,112 @@
+import base64
+import hashlib
+import hmac
+import json
+import os
+import secrets
+import time
+
+# Formato del token firmado: <kid>.<payload>.<firma>
+#   kid     -> id de la llave usada (permite rotarlas)
+#   payload -> JSON compacto en base64url con t (tenant_id), s (student_id),
+#              e (expiración en epoch), i (emisión en epoch, con ms) y n
+#              (nonce, id del token)
+#   firma   -> HMAC-SHA256 de "<kid>.<payload>" en base64url
+# Validarlo no requiere ninguna lectura a DynamoDB. Como no está en
+# t_access_tokens, revocarlo es rechazar los tokens emitidos antes de la
+# última revocación del estudiante (ver common.revocations).
+
+# Modo de los tokens emitidos por el login: "stored" (uuid en t_access_tokens) o "signed"
+TOKEN_MODE = os.environ.get("TOKEN_MODE", "stored")
+# Vida máxima de un token firmado: las revocaciones se recuerdan al menos este tiempo
+MAX_TTL_SECONDS = int(os.environ.get("SIGNED_TOKEN_MAX_TTL_SECONDS", "3600"))
+
+
+def _parse_keys(raw):
+    # TOKEN_SIGNING_KEYS="kid1:secreto1,kid2:secreto2"
+    keys = {}
+    for pair in raw.split(','):
+        if ':' in pair:
+            kid, secret = pair.split(':', 1)
+            keys[kid.strip()] = secret.strip().encode()
+    return keys
+
+
+# Llaves cargadas una sola vez por contenedor. La llave activa firma los
+# tokens nuevos; las demás solo se usan para validar durante la rotación.
+signing_keys = _parse_keys(os.environ.get("TOKEN_SIGNING_KEYS", ""))
+active_kid = os.environ.get("TOKEN_SIGNING_KID") or next(iter(signing_keys), None)
+
+# Lista de revocación fija por despliegue (nonces). Solo se consulta cuando no
+# está vacía; las revocaciones en caliente usan el sello de common.revocations
+denylist = {n for n in os.environ.get("TOKEN_DENYLIST", "").split(',') if n}
+
+
+class InvalidSignedToken(Exception):
+    pass
+
+
+def _b64encode(raw):
+    return base64.urlsafe_b64encode(raw).rstrip(b'=').decode()
+
+
+def _b64decode(text):
+    return base64.urlsafe_b64decode(text + '=' * (-len(text) % 4))
+
+
+def _sign(secret, signing_input):
+    return _b64encode(hmac.new(secret, signing_input.encode(), hashlib.sha256).digest())
+
+
+def is_signed_token(token):
+    # Los tokens almacenados son uuid4, que no contienen puntos
+    return token.count('.') == 2
+
+
+def issue_token(tenant_id, student_id, ttl_seconds=3600, now=None):
+    if active_kid is None or active_kid not in signing_keys:
+        raise InvalidSignedToken('No hay llave activa para firmar tokens')
+    issued = round(now or time.time(), 3)
+    expires = int(issued + min(ttl_seconds, MAX_TTL_SECONDS))
+    payload = _b64encode(json.dumps(
+        {'t': tenant_id, 's': student_id, 'e': expires, 'i': issued, 'n': secrets.token_urlsafe(8)},
+        separators=(',', ':')
+    ).encode())
+    signing_input = f"{active_kid}.{payload}"
+    return f"{signing_input}.{_sign(signing_keys[active_kid], signing_input)}", expires
+
+
+def verify_token(token, now=None):
+    # Verificación pura de CPU: firma, expiración y (si hay) lista de revocación.
+    # Devuelve (identidad, claims)
+    try:
+        kid, payload, signature = token.split('.')
+    except ValueError:
+        raise InvalidSignedToken('Token no existe')
+
+    secret = signing_keys.get(kid)
+    if secret is None:
+        raise InvalidSignedToken('Token no existe')
+    if not hmac.compare_digest(signature, _sign(secret, f"{kid}.{payload}")):
+        raise InvalidSignedToken('Token no existe')
+
+    claims = json.loads(_b64decode(payload))
+    if (now or time.time()) > claims['e']:
+        raise InvalidSignedToken('Token expirado')
+    if denylist and claims.get('n') in denylist:
+        raise InvalidSignedToken('Token revocado')
+
+    return {
+        'tenant_id': claims['t'],
+        'student_id': claims['s']
+    }, claims
+
+
+def nonce_of(token):
+    # Nonce de un token firmado (sin verificarlo) o None
+    if not is_signed_token(token):
+        return None
+    try:
+        return json.loads(_b64decode(token.split('.')[1])).get('n')
+    except (ValueError, TypeError):
+        return None
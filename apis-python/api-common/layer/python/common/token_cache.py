@@ -0,0 +1,94 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+
+# Tamaño y tiempos configurables desde las variables de entorno
+TOKEN_CACHE_SIZE = int(os.environ.get("TOKEN_CACHE_SIZE", "1024"))
+TOKEN_CACHE_TTL = float(os.environ.get("TOKEN_CACHE_TTL", "300"))
+TOKEN_CACHE_NEGATIVE_TTL = float(os.environ.get("TOKEN_CACHE_NEGATIVE_TTL", "5"))
+
+
+class TokenCache:
+    # Cache LRU en memoria que sobrevive entre invocaciones del mismo contenedor.
+    # Cada entrada guarda (deadline, identidad o error) y nunca vive más allá
+    # del `expires` del token.
+
+    def __init__(self, max_size=TOKEN_CACHE_SIZE, ttl=TOKEN_CACHE_TTL,
+                 negative_ttl=TOKEN_CACHE_NEGATIVE_TTL, clock=time.time):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, token):
+        # Devuelve la entrada (identidad o AuthError) o None si no está o venció
+        with self._lock:
+            entry = self._entries.get(token)
+            if entry is not None:
+                deadline, value = entry
+                if deadline > self.clock():
+                    self._entries.move_to_end(token)
+                    self.hits += 1
+                    return value
+                del self._entries[token]
+            self.misses += 1
+            return None
+
+    def put(self, token, identity, expires_at):
+        # `expires_at` es el epoch en que vence el token
+        deadline = min(self.clock() + self.ttl, expires_at)
+        self._store(token, deadline, identity)
+
+    def put_negative(self, token, error):
+        self._store(token, self.clock() + self.negative_ttl, error)
+
+    def _store(self, token, deadline, value):
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            self._entries[token] = (deadline, value)
+            self._entries.move_to_end(token)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, token):
+        with self._lock:
+            self._entries.pop(token, None)
+
+    def invalidate_student(self, tenant_id, student_id):
+        # Elimina todos los tokens cacheados de un estudiante
+        with self._lock:
+            stale = [
+                token for token, (_, value) in self._entries.items()
+                if isinstance(value, dict)
+                and value.get('tenant_id') == tenant_id
+                and value.get('student_id') == student_id
+            ]
+            for token in stale:
+                del self._entries[token]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
+
+    def stats(self):
+        return {
+            'size': len(self._entries),
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions
+        }
+
+
+# Instancia a nivel de módulo: vive mientras el contenedor esté caliente
+token_cache = TokenCache()
@@ -0,0 +1,189 @@
+import functools
+import re
+from decimal import Decimal
+
+# Construye UpdateExpression a partir de un "patch":
+#
+#   {
+#     "level": 3,                              -> SET (atajo)
+#     "rockie_data": {"evolution": "Stage 2"}, -> SET rockie_data.evolution (se aplana)
+#     "$set":    {"rockie_data.rockie_name": "Rocky"},
+#     "$remove": ["student_data.telephone"],
+#     "$add":    {"experience": 10, "rockie_data.ids": ["acc1"]},
+#     "$delete": {"rockie_data.ids": ["acc2"]}
+#   }
+#
+# Todos los nombres van como placeholders (#n0, #n1...) así que las palabras
+# reservadas y los nombres con guiones funcionan. Solo se aceptan paths dentro
+# de la whitelist de la entidad. La expresión compilada se cachea por "forma"
+# del patch (acciones + paths), así que los patches repetidos solo arman el
+# diccionario de valores.
+
+ACTIONS = ('$set', '$remove', '$add', '$delete')
+
+_PATH_RE = re.compile(r"^[^.\[\]]+(\[\d+\])*(\.[^.\[\]]+(\[\d+\])*)*$")
+
+
+class InvalidPatch(ValueError):
+    pass
+
+
+def parse_path(path):
+    # "rockie_data.rockie_adorned.head" -> ('rockie_data', 'rockie_adorned', 'head')
+    # "a.list[2]" -> ('a', 'list', 2)
+    if not isinstance(path, str) or not _PATH_RE.match(path):
+        raise InvalidPatch(f"Path inválido: {path}")
+    segments = []
+    for part in path.split('.'):
+        name, *indexes = part.split('[')
+        segments.append(name)
+        segments.extend(int(i[:-1]) for i in indexes)
+    return tuple(segments)
+
+
+class UpdateBuilder:
+
+    def __init__(self, allowed_paths, cache_size=256):
+        # allowed_paths: paths actualizables; '*' acepta cualquier segmento
+        self.allowed = tuple(parse_path(p) if p != '*' else ('*',) for p in allowed_paths)
+        self._compile = functools.lru_cache(maxsize=cache_size)(self._compile_shape)
+
+    def is_allowed(self, segments):
+        # Un path es válido si coincide con un patrón permitido o está debajo de él
+        for pattern in self.allowed:
+            if len(segments) >= len(pattern) and all(
+                    p == '*' or p == s for p, s in zip(pattern, segments)):
+                return True
+        return False
+
+    def _is_parent_of_allowed(self, segments):
+        return any(len(pattern) > len(segments) and all(
+            p == '*' or p == s for p, s in zip(pattern, segments)) for pattern in self.allowed)
+
+    def _flatten(self, segments, value, out):
+        # Atajo SET: los mapas que no son actualizables completos se aplanan
+        if isinstance(value, dict) and value and not self.is_allowed(segments) \
+                and self._is_parent_of_allowed(segments):
+            for key, child in value.items():
+                self._flatten(segments + (key,), child, out)
+        else:
+            out.append(('SET', segments, value))
+
+    def operations(self, patch):
+        if not isinstance(patch, dict):
+            raise InvalidPatch('El patch debe ser un objeto JSON')
+
+        operations = []
+        for key, value in patch.items():
+            if key == '$set':
+                for path, v in _as_mapping(key, value).items():
+                    operations.append(('SET', parse_path(path), v))
+            elif key == '$remove':
+                if isinstance(value, str) or not isinstance(value, (list, tuple)):
+                    raise InvalidPatch('$remove debe ser una lista de paths')
+                for path in value:
+                    operations.append(('REMOVE', parse_path(path), None))
+            elif key == '$add':
+                for path, v in _as_mapping(key, value).items():
+                    operations.append(('ADD', parse_path(path), _add_value(path, v)))
+            elif key == '$delete':
+                for path, v in _as_mapping(key, value).items():
+                    operations.append(('DELETE', parse_path(path), _set_value(path, v)))
+            elif key.startswith('$'):
+                raise InvalidPatch(f"Operación desconocida: {key}")
+            else:
+                self._flatten(parse_path(key), value, operations)
+
+        if not operations:
+            raise InvalidPatch('No se encontraron datos válidos para actualizar')
+
+        for _, segments, _ in operations:
+            if not self.is_allowed(segments):
+                raise InvalidPatch(f"No se permite actualizar: {_format(segments)}")
+        _check_overlaps([segments for _, segments, _ in operations])
+        return operations
+
+    def build(self, patch):
+        # Devuelve los kwargs para update_item
+        operations = self.operations(patch)
+        shape = tuple((action, segments) for action, segments, _ in operations)
+        expression, names, placeholders = self._compile(shape)
+        values = {
+            placeholder: value
+            for placeholder, (action, _, value) in zip(placeholders, operations)
+            if placeholder is not None
+        }
+        kwargs = {
+            'UpdateExpression': expression,
+            'ExpressionAttributeNames': dict(names)
+        }
+        if values:
+            kwargs['ExpressionAttributeValues'] = values
+        return kwargs
+
+    def _compile_shape(self, shape):
+        names = {}
+        clauses = {'SET': [], 'REMOVE': [], 'ADD': [], 'DELETE': []}
+        placeholders = []
+
+        for i, (action, segments) in enumerate(shape):
+            path = ''
+            for segment in segments:
+                if isinstance(segment, int):
+                    path += f"[{segment}]"
+                    continue
+                alias = names.get(segment)
+                if alias is None:
+                    alias = names[segment] = f"#n{len(names)}"
+                path += f".{alias}" if path else alias
+
+            if action == 'REMOVE':
+                clauses['REMOVE'].append(path)
+                placeholders.append(None)
+            else:
+                clauses[action].append(f"{path} = :v{i}" if action == 'SET' else f"{path} :v{i}")
+                placeholders.append(f":v{i}")
+
+        expression = ' '.join(f"{action} {', '.join(parts)}" for action, parts in clauses.items() if parts)
+        return expression, tuple((alias, name) for name, alias in names.items()), tuple(placeholders)
+
+    def cache_info(self):
+        return self._compile.cache_info()
+
+
+def _as_mapping(action, value):
+    if not isinstance(value, dict):
+        raise InvalidPatch(f"{action} debe ser un objeto path -> valor")
+    return value
+
+
+def _add_value(path, value):
+    if isinstance(value, bool):
+        raise InvalidPatch(f"$add en {path} requiere un número o una lista")
+    if isinstance(value, (int, Decimal)):
+        return value
+    if isinstance(value, float):
+        return Decimal(str(value))
+    return _set_value(path, value)
+
+
+def _set_value(path, value):
+    if isinstance(value, (list, tuple, set)) and value and all(isinstance(v, str) for v in value):
+        return set(value)
+    raise InvalidPatch(f"{path} requiere una lista no vacía de strings")
+
+
+def _check_overlaps(paths):
+    # DynamoDB rechaza dos paths donde uno es prefijo del otro
+    ordered = sorted(paths, key=len)
+    for i, shorter in enumerate(ordered):
+        for longer in ordered[i + 1:]:
+            if longer[:len(shorter)] == shorter:
+                raise InvalidPatch(f"Los paths se superponen: {_format(shorter)} y {_format(longer)}")
+
+
+def _format(segments):
+    text = ''
+    for segment in segments:
+        text += f"[{segment}]" if isinstance(segment, int) else (f".{segment}" if text else segment)
+    return text
@@ -0,0 +1,203 @@
+import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from botocore.exceptions import ClientError
+
+from common.batch import THROTTLING_ERRORS, AdaptiveThrottle, backoff_delay
+from common.serializer import plain_item
+
+# Saldo de monedas y gemas del estudiante (student_data.rockie_coins y
+# student_data.rockie_gems). Cada operación es un solo UpdateItem con ADD: un
+# débito lleva la condición de que el saldo alcance, así que dos gastos
+# concurrentes no pueden dejarlo negativo ni pisarse. Con una clave de
+# idempotencia el mismo UpdateItem guarda el saldo resultante en el atributo
+# "wallet_op:<clave>"; si la operación se repite, la condición falla y se
+# devuelve ese saldo sin volver a aplicarla. Cada estudiante recuerda al
+# menos sus últimas WALLET_IDEMPOTENCY_KEYS claves (lista "wallet_ops"); se
+# podan de a varias para no sumar una escritura a cada operación.
+
+CURRENCIES = ('rockie_coins', 'rockie_gems')
+MAX_AMOUNT = int(os.environ.get("MAX_WALLET_AMOUNT", "1000000"))
+IDEMPOTENCY_KEYS = int(os.environ.get("WALLET_IDEMPOTENCY_KEYS", "20"))
+
+OP_PREFIX = 'wallet_op:'
+OPS_LIST = 'wallet_ops'
+KEY_PATTERN = re.compile(r'^[A-Za-z0-9_.:\-]{1,64}$')
+
+class WalletError(Exception):
+    pass
+
+
+class StudentNotFound(WalletError):
+    pass
+
+
+class InsufficientFunds(WalletError):
+
+    def __init__(self, balance):
+        super().__init__(f"Saldo insuficiente: {balance}")
+        self.balance = balance
+
+
+class IdempotencyConflict(WalletError):
+    pass
+
+
+def validate(currency, amount, idempotency_key=None):
+    # Devuelve un mensaje de error o None
+    if currency not in CURRENCIES:
+        return f"currency debe ser uno de {', '.join(CURRENCIES)}"
+    if isinstance(amount, bool) or not isinstance(amount, int) or not 0 < amount <= MAX_AMOUNT:
+        return f"amount debe ser un entero entre 1 y {MAX_AMOUNT}"
+    if idempotency_key is not None and (not isinstance(idempotency_key, str)
+                                        or not KEY_PATTERN.match(idempotency_key)):
+        return 'idempotency_key debe tener entre 1 y 64 caracteres (letras, números, _ . : -)'
+    return None
+
+
+def change_balance(table, tenant_id, student_id, currency, delta, idempotency_key=None):
+    # Suma `delta` (negativo para un débito) al saldo. Devuelve
+    # {'currency', 'balance', 'replayed'}
+    names = {'#c': currency}
+    values = {':delta': delta}
+    update = 'ADD student_data.#c :delta'
+    condition = 'attribute_exists(student_id)'
+    if delta < 0:
+        condition += ' AND student_data.#c >= :debit'
+        values[':debit'] = -delta
+    if idempotency_key:
+        entry = f"{idempotency_key}|{currency}|{delta}"
+        names.update({'#op': OP_PREFIX + idempotency_key, '#ops': OPS_LIST})
+        values.update({':zero': 0, ':entry': [entry], ':empty': []})
+        # Los dos SET leen el item anterior: #op queda con el saldo nuevo
+        update = ('SET #op = if_not_exists(student_data.#c, :zero) + :delta, '
+                  '#ops = list_append(if_not_exists(#ops, :empty), :entry) ' + update)
+        condition += ' AND attribute_not_exists(#op)'
+
+    key = {'tenant_id': tenant_id, 'student_id': student_id}
+    try:
+        attributes = table.update_item(
+            Key=key,
+            UpdateExpression=update,
+            ConditionExpression=condition,
+            ExpressionAttributeNames=names,
+            ExpressionAttributeValues=values,
+            ReturnValues='UPDATED_NEW',
+            ReturnValuesOnConditionCheckFailure='ALL_OLD'
+        )['Attributes']
+    except ClientError as e:
+        if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+            raise
+        current = plain_item(e.response.get('Item'))
+        if current is None:
+            raise StudentNotFound(student_id)
+        if idempotency_key and OP_PREFIX + idempotency_key in current:
+            # Operación repetida: se devuelve el saldo que dejó la primera vez
+            if entry not in (current.get(OPS_LIST) or []):
+                raise IdempotencyConflict(idempotency_key)
+            return {'currency': currency, 'balance': int(current[OP_PREFIX + idempotency_key]), 'replayed': True}
+        raise InsufficientFunds(int((current.get('student_data') or {}).get(currency, 0)))
+
+    if idempotency_key and len(attributes.get(OPS_LIST) or []) > IDEMPOTENCY_KEYS + max(1, IDEMPOTENCY_KEYS // 2):
+        _prune(table, key, attributes[OPS_LIST])
+    return {'currency': currency, 'balance': int(attributes['student_data'][currency]), 'replayed': False}
+
+
+def _prune(table, key, entries):
+    # Olvida las claves más antiguas. La condición sobre el tamaño de la
+    # lista evita pisar una operación concurrente (la próxima poda la hará)
+    stale = entries[:len(entries) - IDEMPOTENCY_KEYS]
+    names = {f"#k{i}": OP_PREFIX + entry.split('|', 1)[0] for i, entry in enumerate(stale)}
+    names['#ops'] = OPS_LIST
+    try:
+        table.update_item(
+            Key=key,
+            UpdateExpression=f"SET #ops = :kept REMOVE {', '.join(name for name in names if name != '#ops')}",
+            ConditionExpression='size(#ops) = :size',
+            ExpressionAttributeNames=names,
+            ExpressionAttributeValues={':kept': entries[len(stale):], ':size': len(entries)}
+        )
+    except ClientError as e:
+        if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+            raise
+
+
+def strip_bookkeeping(item):
+    # Quita del item las claves de idempotencia antes de devolverlo
+    for name in [name for name in item if name == OPS_LIST or name.startswith(OP_PREFIX)]:
+        del item[name]
+    return item
+
+
+def credit(table, tenant_id, student_id, currency, amount, idempotency_key=None):
+    return change_balance(table, tenant_id, student_id, currency, amount, idempotency_key)
+
+
+def debit(table, tenant_id, student_id, currency, amount, idempotency_key=None):
+    return change_balance(table, tenant_id, student_id, currency, -amount, idempotency_key)
+
+
+def tenant_students(table, tenant_id, page_size=500):
+    # student_id de todos los estudiantes del tenant, página por página
+    params = {
+        'KeyConditionExpression': 'tenant_id = :t',
+        'ExpressionAttributeValues': {':t': tenant_id},
+        'ProjectionExpression': 'student_id',
+        'Limit': page_size
+    }
+    while True:
+        response = table.query(**params)
+        for item in response.get('Items', []):
+            yield item['student_id']
+        if 'LastEvaluatedKey' not in response:
+            return
+        params['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+
+def credit_many(table, tenant_id, currency, amount, student_ids=None, idempotency_key=None, workers=8,
+                max_retries=8, throttle=None, sleep=time.sleep):
+    # Premio para muchos estudiantes (todo el tenant si student_ids es None).
+    # Con la misma clave de idempotencia se puede relanzar sin acreditar dos
+    # veces a quien ya la recibió. Todos los estudiantes del tenant comparten
+    # partición: la pausa adaptativa baja el ritmo ante el throttling
+    throttle = throttle or AdaptiveThrottle(sleep=sleep)
+    students = tenant_students(table, tenant_id) if student_ids is None else student_ids
+    report = {'credited': 0, 'replayed': 0, 'failed': 0, 'errors': {}}
+    lock = threading.Lock()
+
+    def credit_one(student_id):
+        for attempt in range(max_retries + 1):
+            throttle.wait()
+            try:
+                result = credit(table, tenant_id, student_id, currency, amount, idempotency_key)
+                throttle.on_success()
+                outcome, error = 'replayed' if result['replayed'] else 'credited', None
+                break
+            except ClientError as e:
+                if e.response['Error']['Code'] not in THROTTLING_ERRORS or attempt == max_retries:
+                    outcome, error = 'failed', str(e)
+                    break
+                throttle.on_throttle()
+                sleep(backoff_delay(attempt))
+            except WalletError as e:
+                outcome, error = 'failed', type(e).__name__
+                break
+        with lock:
+            report[outcome] += 1
+            if error:
+                report['errors'][student_id] = error
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        list(executor.map(credit_one, students))
+    elapsed = time.perf_counter() - start
+    total = report['credited'] + report['replayed'] + report['failed']
+    report.update(
+        elapsed_seconds=round(elapsed, 3),
+        credits_per_second=round(total / elapsed, 1) if elapsed else None,
+        throttled=throttle.throttled
+    )
+    return report
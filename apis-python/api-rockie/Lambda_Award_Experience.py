@@ -0,0 +1,91 @@
+import logging
+import os
+
+from common import metrics, profiling, runtime
+from common.progression import MAX_AWARD, RockieNotFound, award_experience, award_many
+
+# Configurar el logger
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+# Inicializar los clientes de AWS (fase Init del contenedor)
+runtime.warm()
+
+# Obtener el stage desde las variables de entorno
+stage = os.environ.get("STAGE", "dev")  # Default a "dev" si no se define
+
+
+def parse_award(award):
+    # Devuelve (student_id, experiencia) o un mensaje de error
+    student_id = award.get('student_id') if isinstance(award, dict) else None
+    experience = award.get('experience') if isinstance(award, dict) else None
+    if not student_id:
+        return 'Falta student_id'
+    if isinstance(experience, bool) or not isinstance(experience, int) or not 0 < experience <= MAX_AWARD:
+        return f"experience debe ser un entero entre 1 y {MAX_AWARD}"
+    return student_id, experience
+
+
+@metrics.instrumented('Award_Experience')
+@profiling.profiled
+def lambda_handler(event, context):
+    # Invocación directa desde otros servicios (no se expone por API Gateway):
+    #   {"tenant_id": ..., "student_id": ..., "experience": 50}
+    #   {"tenant_id": ..., "awards": [{"student_id": ..., "experience": 50}, ...], "workers": 8}
+    tenant_id = event.get('tenant_id')
+    if not tenant_id:
+        return {
+            'statusCode': 400,
+            'body': 'Falta tenant_id'
+        }
+    metrics.set_tenant(tenant_id)
+    t_rockies = runtime.table(f"{stage}_t_rockies")
+
+    if 'awards' not in event:
+        award = parse_award(event)
+        if isinstance(award, str):
+            return {
+                'statusCode': 400,
+                'body': award
+            }
+        try:
+            result = award_experience(t_rockies, tenant_id, *award)
+        except RockieNotFound:
+            return {
+                'statusCode': 404,
+                'body': 'Rockie no encontrado'
+            }
+        except Exception as e:
+            logger.error(f"Error al otorgar experiencia: {e}")
+            return {
+                'statusCode': 500,
+                'body': 'Error interno del servidor'
+            }
+        return {
+            'statusCode': 200,
+            'body': result
+        }
+
+    # Modo batch: toda una clase en paralelo
+    awards, errors = [], {}
+    for position, entry in enumerate(event.get('awards') or []):
+        award = parse_award(entry)
+        if isinstance(award, str):
+            errors[str(position)] = {'error': award}
+        else:
+            awards.append(award)
+    if not awards:
+        return {
+            'statusCode': 400,
+            'body': {'error': 'No hay premios válidos', 'results': errors}
+        }
+
+    report = award_many(t_rockies, tenant_id, awards, workers=int(event.get('workers', 8)))
+    report['failed'] += len(errors)
+    report['results'].update(errors)
+    logger.info("Experiencia otorgada: %s estudiantes, %s con error, %s subieron de nivel, %.0f premios/s",
+                report['awarded'], report['failed'], report['leveled_up'], report['awards_per_second'] or 0)
+    return {
+        'statusCode': 200,
+        'body': report
+    }
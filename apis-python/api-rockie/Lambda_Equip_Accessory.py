@@ -0,0 +1,73 @@
+import json
+import logging
+import os
+
+from common import metrics, profiling, runtime
+from common.auth import AuthError, authenticate
+from common.inventory import SLOTS, NotOwned, UnknownSlot, equip
+from common.progression import RockieNotFound
+
+# Configurar el logger
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+# Inicializar los clientes de AWS (fase Init del contenedor)
+runtime.warm()
+
+# Obtener el stage desde las variables de entorno
+stage = os.environ.get("STAGE", "dev")  # Default a "dev" si no se define
+
+@metrics.instrumented('Equip_Accessory')
+@profiling.profiled
+def lambda_handler(event, context):
+    # Equipar un accesorio: {"slot": "head_accessory", "accessory_id": "..."}.
+    # Un solo UpdateItem condicionado a que el rockie tenga el accesorio
+    try:
+        identity = authenticate(event)
+    except AuthError as e:
+        return e.response()
+
+    body = event.get('body') or {}
+    try:
+        body = json.loads(body) if isinstance(body, str) else body
+    except json.JSONDecodeError:
+        return {
+            'statusCode': 400,
+            'body': 'El cuerpo de la solicitud no es un JSON válido'
+        }
+    slot, accessory_id = body.get('slot'), body.get('accessory_id')
+    if not accessory_id or not isinstance(accessory_id, str):
+        return {
+            'statusCode': 400,
+            'body': 'Falta accessory_id'
+        }
+
+    try:
+        adorned = equip(runtime.table(f"{stage}_t_rockies"), identity['tenant_id'], identity['student_id'],
+                        slot, accessory_id)
+    except UnknownSlot:
+        return {
+            'statusCode': 400,
+            'body': f"slot debe ser uno de {', '.join(SLOTS)}"
+        }
+    except RockieNotFound:
+        return {
+            'statusCode': 404,
+            'body': 'Rockie no encontrado'
+        }
+    except NotOwned:
+        return {
+            'statusCode': 409,
+            'body': 'El rockie no tiene este accesorio'
+        }
+    except Exception as e:
+        logger.error(f"Error al equipar el accesorio {accessory_id}: {e}")
+        return {
+            'statusCode': 500,
+            'body': 'Error interno del servidor'
+        }
+
+    return {
+        'statusCode': 200,
+        'body': {'rockie_adorned': adorned}
+    }
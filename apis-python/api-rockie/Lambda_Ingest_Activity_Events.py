@@ -0,0 +1,41 @@
+import logging
+import os
+
+from common import metrics, profiling, runtime
+from common.ingestion import EventBuffer, flush
+
+# Configurar el logger
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+# Inicializar los clientes de AWS (fase Init del contenedor)
+runtime.warm()
+
+# Obtener el stage desde las variables de entorno
+stage = os.environ.get("STAGE", "dev")  # Default a "dev" si no se define
+
+
+@metrics.instrumented('Ingest_Activity_Events')
+@profiling.profiled
+def lambda_handler(event, context):
+    # Disparado por la cola de eventos de actividades (SQS). La ventana de
+    # tiempo/tamaño la define el event source mapping (batchSize y
+    # maximumBatchingWindow): cada invocación es una ventana y escribe una
+    # actualización por estudiante. Responde con el formato de
+    # ReportBatchItemFailures para que solo vuelvan a la cola los mensajes
+    # de los estudiantes que no se pudieron escribir.
+    records = event.get('Records') or []
+    buffer = EventBuffer(max_events=len(records))
+    for record in records:
+        buffer.add(record['body'], record['messageId'])
+    deltas, _ = buffer.drain()
+
+    report = flush(deltas, runtime.table(f"{stage}_t_rockies"), runtime.table(f"{stage}_t_students"),
+                   runtime.table(f"{stage}_t_activity_events"))
+    logger.info("Eventos de actividades: %s recibidos, %s repetidos, %s inválidos, %s estudiantes escritos, "
+                "%s descartados, %s con error",
+                buffer.received, buffer.duplicates + report['duplicates'], buffer.invalid, report['written'],
+                report['dropped'], report['failed'])
+    return {
+        'batchItemFailures': [{'itemIdentifier': message_id} for message_id in report['retry']]
+    }
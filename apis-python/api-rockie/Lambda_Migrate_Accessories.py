@@ -0,0 +1,179 @@
+import argparse
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from botocore.exceptions import ClientError
+
+from common import metrics, profiling, runtime
+from common.batch import THROTTLING_ERRORS, AdaptiveThrottle, backoff_delay
+from common.inventory import ACCESSORIES, ADORNED, convert_accessories
+
+# Configurar el logger
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+# Inicializar los clientes de AWS (fase Init del contenedor)
+runtime.warm()
+
+# Obtener el stage desde las variables de entorno
+stage = os.environ.get("STAGE", "dev")  # Default a "dev" si no se define
+
+# Margen antes del timeout de la Lambda para cortar la migración
+DEADLINE_MARGIN_SECONDS = 30
+
+
+class AccessoryMigrator:
+    # Convierte rockie_data.rockie_all_accessories_ids de lista a string set
+    # en t_rockies con scans segmentados en paralelo. Cada página trae solo
+    # los rockies que todavía tienen la lista y se convierte con `workers`
+    # hilos por segmento (un UpdateItem condicional por rockie: BatchWriteItem
+    # no admite condiciones). Es idempotente: se puede cortar y volver a correr
+
+    def __init__(self, dynamodb, segments=8, page_size=500, workers=4, dry_run=False, deadline=None,
+                 throttle=None, max_retries=8):
+        # El cliente de boto3 es thread-safe; el resource no
+        self.client = dynamodb.meta.client
+        self.table_name = f"{stage}_t_rockies"
+        self.segments = segments
+        self.page_size = page_size
+        self.workers = workers
+        self.dry_run = dry_run
+        # time.monotonic() a partir del cual no se piden más páginas
+        self.deadline = deadline
+        self.throttle = throttle or AdaptiveThrottle()
+        self.max_retries = max_retries
+
+        self.scanned = 0
+        self.converted = 0
+        self.skipped = 0
+        self.failed = 0
+        self.complete = True
+        self._lock = threading.Lock()
+
+    def _count(self, **counts):
+        with self._lock:
+            for name, value in counts.items():
+                setattr(self, name, getattr(self, name) + value)
+
+    def _convert(self, item):
+        # 'converted', 'skipped' (cambió desde el scan) o 'failed'
+        if self.dry_run:
+            return 'converted'
+        key = {'tenant_id': item['tenant_id'], 'student_id': item['student_id']}
+        rockie_data = item['rockie_data']
+        for attempt in range(self.max_retries + 1):
+            self.throttle.wait()
+            try:
+                converted = convert_accessories(self.client, self.table_name, key, rockie_data[ACCESSORIES],
+                                                rockie_data.get(ADORNED))
+                self.throttle.on_success()
+                return 'converted' if converted else 'skipped'
+            except ClientError as e:
+                if e.response['Error']['Code'] not in THROTTLING_ERRORS or attempt == self.max_retries:
+                    logger.error(f"Error al migrar los accesorios de {item['student_id']}: {e}")
+                    return 'failed'
+                self.throttle.on_throttle()
+                time.sleep(backoff_delay(attempt))
+        return 'failed'
+
+    def _migrate_segment(self, segment, executor):
+        kwargs = {
+            'TableName': self.table_name,
+            'Segment': segment,
+            'TotalSegments': self.segments,
+            'Limit': self.page_size,
+            'ProjectionExpression': 'tenant_id, student_id, rockie_data.#a, rockie_data.#d',
+            'FilterExpression': 'attribute_type(rockie_data.#a, :list)',
+            'ExpressionAttributeNames': {'#a': ACCESSORIES, '#d': ADORNED},
+            'ExpressionAttributeValues': {':list': 'L'}
+        }
+        while True:
+            if self.deadline and time.monotonic() > self.deadline:
+                self.complete = False
+                return
+            response = self.client.scan(**kwargs)
+            outcomes = list(executor.map(self._convert, response.get('Items', [])))
+            self._count(scanned=response.get('ScannedCount', 0), converted=outcomes.count('converted'),
+                        skipped=outcomes.count('skipped'), failed=outcomes.count('failed'))
+            if 'LastEvaluatedKey' not in response:
+                return
+            kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+    def run(self):
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=max(1, self.segments * self.workers)) as converters, \
+                ThreadPoolExecutor(max_workers=self.segments) as executor:
+            # list() propaga las excepciones de los hilos
+            list(executor.map(lambda segment: self._migrate_segment(segment, converters), range(self.segments)))
+        elapsed = time.perf_counter() - start
+        return {
+            'segments': self.segments,
+            'scanned': self.scanned,
+            'converted': self.converted,
+            'skipped': self.skipped,
+            'failed': self.failed,
+            'complete': self.complete,
+            'dry_run': self.dry_run,
+            'elapsed_seconds': round(elapsed, 3),
+            'rows_per_second': round(self.scanned / elapsed, 1) if elapsed else None,
+            'throttled': self.throttle.throttled
+        }
+
+
+@metrics.instrumented('MigrateAccessories')
+@profiling.profiled
+def lambda_handler(event, context):
+    # Invocación manual (se puede repetir hasta que complete sea true):
+    # {"segments": 8, "page_size": 500, "workers": 4, "dry_run": false}
+    event = event if isinstance(event, dict) else {}
+    deadline = None
+    if context is not None and hasattr(context, 'get_remaining_time_in_millis'):
+        deadline = time.monotonic() + context.get_remaining_time_in_millis() / 1000 - DEADLINE_MARGIN_SECONDS
+    migrator = AccessoryMigrator(
+        runtime.dynamodb(),
+        segments=int(event.get('segments', 8)),
+        page_size=int(event.get('page_size', 500)),
+        workers=int(event.get('workers', 4)),
+        dry_run=bool(event.get('dry_run')),
+        deadline=deadline
+    )
+    try:
+        report = migrator.run()
+    except Exception as e:
+        logger.error(f"Error al migrar los accesorios: {e}")
+        return {
+            'statusCode': 500,
+            'body': {'error': str(e)}
+        }
+
+    logger.info("Migración de accesorios: %s revisados, %s convertidos, %s omitidos, %s con error, %.0f filas/s",
+                report['scanned'], report['converted'], report['skipped'], report['failed'],
+                report['rows_per_second'] or 0)
+    return {
+        'statusCode': 200,
+        'body': report
+    }
+
+
+def main(argv=None):
+    # Uso local: python Lambda_Migrate_Accessories.py --segments 16 --dry-run
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--segments', type=int, default=8)
+    parser.add_argument('--page-size', type=int, default=500)
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--dry-run', action='store_true')
+    args = parser.parse_args(argv)
+
+    migrator = AccessoryMigrator(runtime.dynamodb(), segments=args.segments, page_size=args.page_size,
+                                 workers=args.workers, dry_run=args.dry_run)
+    json.dump(migrator.run(), sys.stdout, indent=2)
+    print()
+
+
+if __name__ == '__main__':
+    main()
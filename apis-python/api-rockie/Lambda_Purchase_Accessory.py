@@ -0,0 +1,93 @@
+import json
+import logging
+import os
+
+from common import metrics, profiling, runtime
+from common.auth import AuthError, authenticate
+from common.progression import RockieNotFound
+from common.purchases import AlreadyOwned, OutOfStock, ProductNotFound, purchase_accessory
+from common.wallet import InsufficientFunds, StudentNotFound
+
+# Configurar el logger
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+# Inicializar los clientes de AWS (fase Init del contenedor)
+runtime.warm()
+
+# Obtener el stage desde las variables de entorno
+stage = os.environ.get("STAGE", "dev")  # Default a "dev" si no se define
+
+@metrics.instrumented('Purchase_Accessory')
+@profiling.profiled
+def lambda_handler(event, context):
+    # Compra de un accesorio: {"product_id": "..."}. Cobro, stock y
+    # accesorio nuevo van en una sola transacción
+    try:
+        identity = authenticate(event)
+    except AuthError as e:
+        return e.response()
+
+    body = event.get('body') or {}
+    try:
+        body = json.loads(body) if isinstance(body, str) else body
+    except json.JSONDecodeError:
+        return {
+            'statusCode': 400,
+            'body': 'El cuerpo de la solicitud no es un JSON válido'
+        }
+    product_id = body.get('product_id')
+    if not product_id or not isinstance(product_id, str):
+        return {
+            'statusCode': 400,
+            'body': 'Falta product_id'
+        }
+
+    try:
+        result = purchase_accessory(
+            runtime.table(f"{stage}_t_purchasable"),
+            runtime.table(f"{stage}_t_students"),
+            runtime.table(f"{stage}_t_rockies"),
+            identity['tenant_id'], identity['student_id'], product_id
+        )
+    except ProductNotFound:
+        return {
+            'statusCode': 404,
+            'body': 'Producto no encontrado'
+        }
+    except StudentNotFound:
+        return {
+            'statusCode': 404,
+            'body': 'Estudiante no encontrado'
+        }
+    except RockieNotFound:
+        return {
+            'statusCode': 404,
+            'body': 'Rockie no encontrado'
+        }
+    except InsufficientFunds as e:
+        return {
+            'statusCode': 409,
+            'body': {'message': 'Saldo insuficiente', 'balance': e.balance}
+        }
+    except OutOfStock:
+        return {
+            'statusCode': 409,
+            'body': 'Producto agotado'
+        }
+    except AlreadyOwned:
+        return {
+            'statusCode': 409,
+            'body': 'El rockie ya tiene este accesorio'
+        }
+    except Exception as e:
+        logger.error(f"Error al comprar el accesorio {product_id}: {e}")
+        return {
+            'statusCode': 500,
+            'body': 'Error interno del servidor'
+        }
+
+    return {
+        'statusCode': 200,
+        'body': result
+    }
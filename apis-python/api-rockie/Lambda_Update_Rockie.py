@@ -1,89 +1,44 @@
-import boto3
 import logging
 import os
 import json
 from datetime import datetime
-from decimal import Decimal
+from botocore.exceptions import ClientError
+
+from common import logs, metrics, profiling, runtime
+from common.auth import AuthError, authenticate
+from common.update_expression import InvalidPatch, UpdateBuilder
+from common.serializer import json_response
 
 # Configurar el logger
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
-# Helper para convertir Decimal a tipos JSON serializables
-def convert_decimal(obj):
-    if isinstance(obj, list):
-        return [convert_decimal(i) for i in obj]
-    elif isinstance(obj, dict):
-        return {k: convert_decimal(v) for k, v in obj.items()}
-    elif isinstance(obj, Decimal):
-        return int(obj) if obj % 1 == 0 else float(obj)
-    else:
-        return obj
+# Inicializar los clientes de AWS (fase Init del contenedor)
+runtime.warm()
+
+# Campos del rockie que se pueden modificar (nivel, experiencia y evolución
+# solo cambian con Award_Experience; los accesorios, con Purchase_Accessory y
+# Equip_Accessory)
+UPDATABLE_PATHS = [
+    'rockie_data.rockie_name'
+]
+update_builder = UpdateBuilder(UPDATABLE_PATHS)
 
+@metrics.instrumented('Update_Rockie')
+@profiling.profiled
 def lambda_handler(event, context):
 
     # Obtener el stage desde las variables de entorno
     stage = os.environ.get("STAGE", "dev")  # Default a "dev" si no se define
 
-    # Obtener el token de autorización desde los headers
-    token = event['headers'].get('Authorization')
-    if not token:
-        return {
-            'statusCode': 400,
-            'body': 'Falta el token de autorización'
-        }
-
-    # Obtener el nombre de la función de validación desde la variable de entorno
-    validate_function_name = os.environ.get('VALIDATE_FUNCTION_NAME')
-    if not validate_function_name:
-        return {
-            'statusCode': 500,
-            'body': 'Error interno del servidor: falta configuración de la función de validación'
-        }
-
-    # Invocar la función Lambda ValidateAccessToken para validar el token
-    lambda_client = boto3.client('lambda')
-    payload_string = {"token": token}
-    invoke_response = lambda_client.invoke(
-        FunctionName=validate_function_name,
-        InvocationType='RequestResponse',
-        Payload=json.dumps(payload_string)
-    )
-
-    # Leer y cargar la respuesta de la invocación
-    response_payload = json.loads(invoke_response['Payload'].read())
-    logger.info("Response from ValidateAccessToken: %s", response_payload)
-
-    # Verificar si el token es válido
-    if response_payload.get('statusCode') == 403:
-        return {
-            'statusCode': 403,
-            'body': response_payload.get('body', 'Acceso No Autorizado')
-        }
-
-    # Ahora que el token es válido, extraemos `tenant_id` y `student_id` desde la tabla `t_access_tokens`
-    dynamodb = boto3.resource('dynamodb')
-    tokens_table = dynamodb.Table(f"{stage}_t_access_tokens")
-    token_response = tokens_table.get_item(
-        Key={'token': token}
-    )
-
-    # Verificar si se obtuvieron los datos correctamente
-    if 'Item' not in token_response:
-        return {
-            'statusCode': 500,
-            'body': 'Error al obtener el tenant_id y student_id del token'
-        }
-
-    tenant_id = token_response['Item'].get('tenant_id')
-    student_id = token_response['Item'].get('student_id')
+    # Validar el token y obtener `tenant_id` y `student_id` con una sola lectura
+    try:
+        identity = authenticate(event)
+    except AuthError as e:
+        return e.response()
 
-    # Verificar que ambos valores estén presentes
-    if not tenant_id or not student_id:
-        return {
-            'statusCode': 500,
-            'body': 'Faltan tenant_id o student_id en el token almacenado'
-        }
+    tenant_id = identity['tenant_id']
+    student_id = identity['student_id']
 
     # Obtener los datos del cuerpo del evento (los datos que se deben actualizar)
     if 'body' in event:
@@ -99,60 +54,39 @@ def lambda_handler(event, context):
             'statusCode': 400,
             'body': 'Falta el cuerpo de la solicitud'
         }
+    logs.payload(logger, "Patch recibido para el rockie", body)
 
     # Conectar con DynamoDB y actualizar los datos del rockie en la tabla `t_rockies`
-    t_rockies = dynamodb.Table(f"{stage}_t_rockies")
+    t_rockies = runtime.table(f"{stage}_t_rockies")
 
     try:
-        # Construir expresión de actualización
-        update_expression = "SET "
-        expression_attribute_values = {}
-
-        # Actualizar los campos dentro de `rockie_data` correctamente
-        for key, value in body.items():
-            if key.startswith('rockie_data.'):  # Si la clave está en el objeto `rockie_data`
-                key_for_update = key.replace('.', '_')  # Reemplazar los puntos por guiones bajos
-                update_expression += f"rockie_data.{key_for_update} = :{key_for_update}, "
-                expression_attribute_values[f":{key_for_update}"] = value
-            else:
-                update_expression += f"{key} = :{key}, "
-                expression_attribute_values[f":{key}"] = value
-
-        # Eliminar la última coma y espacio
-        update_expression = update_expression.rstrip(", ")
-
-        if not expression_attribute_values:
+        # Construir la expresión de actualización a partir del patch
+        try:
+            update_args = update_builder.build(body)
+        except InvalidPatch as e:
             return {
                 'statusCode': 400,
-                'body': 'No se encontraron valores válidos para actualizar'
+                'body': str(e)
             }
 
-        # Realizar la actualización
-        t_rockies.update_item(
-            Key={'tenant_id': tenant_id, 'student_id': student_id},
-            UpdateExpression=update_expression,
-            ExpressionAttributeValues=expression_attribute_values
-        )
-
-        # Obtener los datos completos del rockie actualizado
-        updated_rockie_response = t_rockies.get_item(
-            Key={'tenant_id': tenant_id, 'student_id': student_id}
-        )
-
-        if 'Item' not in updated_rockie_response:
-            return {
-                'statusCode': 500,
-                'body': 'Error al obtener los datos actualizados del rockie'
-            }
-
-        # Convertir los Decimals a tipos serializables
-        rockie_data = convert_decimal(updated_rockie_response['Item'])
-
-        # Devolver los datos actualizados
-        return {
-            'statusCode': 200,
-            'body': rockie_data
-        }
+        # Realizar la actualización y obtener el rockie actualizado en la misma llamada
+        try:
+            updated_rockie_response = t_rockies.update_item(
+                Key={'tenant_id': tenant_id, 'student_id': student_id},
+                ConditionExpression="attribute_exists(student_id)",
+                ReturnValues="ALL_NEW",
+                **update_args
+            )
+        except ClientError as e:
+            if e.response['Error']['Code'] == 'ConditionalCheckFailedException':
+                return {
+                    'statusCode': 404,
+                    'body': 'Rockie no encontrado'
+                }
+            raise
+
+        # Devolver los datos actualizados (Decimals incluidos) en una sola pasada
+        return json_response(200, updated_rockie_response['Attributes'])
 
     except Exception as e:
         logger.error(f"Error al actualizar los datos del rockie: {str(e)}")
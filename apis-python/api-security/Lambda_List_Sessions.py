@@ -0,0 +1,56 @@
+import logging
+import time
+
+from common import metrics, profiling, runtime
+from common.auth import AuthError, authenticate, token_expiry
+from common.sessions import list_sessions, session_id
+
+# Configurar el logger
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+# Inicializar los clientes de AWS (fase Init del contenedor)
+runtime.warm()
+
+@metrics.instrumented('List_Sessions')
+@profiling.profiled
+def lambda_handler(event, context):
+    # Validar el token y obtener `tenant_id` y `student_id`
+    try:
+        identity = authenticate(event)
+    except AuthError as e:
+        return e.response()
+
+    current = (event.get('headers') or {}).get('Authorization')
+    try:
+        # Una query sobre student_tokens_index
+        items = list_sessions(identity['tenant_id'], identity['student_id'])
+    except Exception as e:
+        logger.error(f"Error al listar las sesiones: {e}")
+        return {
+            'statusCode': 500,
+            'body': 'Error interno del servidor'
+        }
+
+    # Solo las sesiones vigentes (el TTL puede tardar en borrar las vencidas)
+    now = int(time.time())
+    sessions = []
+    for item in items:
+        expires_at = token_expiry(item)
+        if expires_at is None or now > expires_at:
+            continue
+        sessions.append({
+            'session_id': session_id(item['token']),
+            'device_id': item.get('device_id'),
+            'expires_at': expires_at,
+            'current': item['token'] == current
+        })
+    sessions.sort(key=lambda session: session['expires_at'], reverse=True)
+
+    return {
+        'statusCode': 200,
+        'body': {
+            'sessions': sessions,
+            'count': len(sessions)
+        }
+    }
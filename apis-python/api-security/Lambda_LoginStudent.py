@@ -1,18 +1,26 @@
-import boto3
 import hashlib
 import json
-import uuid
 import os
-from datetime import datetime, timedelta
 from boto3.dynamodb.conditions import Key
 
+from common import metrics, profiling, runtime, signed_token
+from common.sessions import open_session
+
 # Obtener el stage desde las variables de entorno
 stage = os.environ.get("STAGE", "dev")  # Default a "dev" si no se define
 
+# Inicializar los clientes de AWS (fase Init del contenedor)
+runtime.warm()
+
+# Duración de la sesión
+TOKEN_TTL_SECONDS = 3600
+
 # Function to hash the password
 def hash_password(password):
     return hashlib.sha256(password.encode()).hexdigest()
 
+@metrics.instrumented('LoginStudent')
+@profiling.profiled
 def lambda_handler(event, context):
     try:
         # Check if 'body' is a JSON string and parse it if necessary
@@ -34,8 +42,7 @@ def lambda_handler(event, context):
 
         # Hash the password to compare with stored hash
         hashed_password = hash_password(password)
-        dynamodb = boto3.resource('dynamodb')
-        t_students = dynamodb.Table(f"{stage}_t_students")
+        t_students = runtime.table(f"{stage}_t_students")
 
         # Query the GSI to find the student by email
         response = t_students.query(
@@ -58,19 +65,13 @@ def lambda_handler(event, context):
                 'body': 'Incorrect password'
             }
 
-        # Generate a session token
-        token = str(uuid.uuid4())
-        expiration_time = datetime.now() + timedelta(hours=1)
-        token_data = {
-            'token': token,
-            'student_id': student_data['student_id'],
-            'tenant_id': tenant_id,  # Add tenant_id to the token data
-            'expires': expiration_time.strftime('%Y-%m-%d %H:%M:%S')
-        }
-
-        # Store the token in the t_access_tokens table
-        t_tokens = dynamodb.Table(f"{stage}_t_access_tokens")
-        t_tokens.put_item(Item=token_data)
+        # Signed mode: the token carries the identity and needs no write
+        if signed_token.TOKEN_MODE == 'signed':
+            token, _ = signed_token.issue_token(tenant_id, student_data['student_id'], ttl_seconds=TOKEN_TTL_SECONDS)
+        else:
+            # Reuse the device's live session or store a new token
+            token, _ = open_session(tenant_id, student_data['student_id'], device_id=body.get('device_id'),
+                                    ttl_seconds=TOKEN_TTL_SECONDS)
 
         # Return a success message with the token
         return {
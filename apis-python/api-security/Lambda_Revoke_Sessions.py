@@ -0,0 +1,58 @@
+import json
+import logging
+
+from common import metrics, profiling, runtime
+from common.auth import AuthError, authenticate
+from common.sessions import revoke_sessions
+
+# Configurar el logger
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+# Inicializar los clientes de AWS (fase Init del contenedor)
+runtime.warm()
+
+@metrics.instrumented('Revoke_Sessions')
+@profiling.profiled
+def lambda_handler(event, context):
+    # Cierra todas las sesiones del estudiante. Con {"keep_current": true}
+    # se conserva la sesión del request (p.ej. al cambiar el password)
+    try:
+        identity = authenticate(event)
+    except AuthError as e:
+        return e.response()
+
+    body = event.get('body') or {}
+    try:
+        body = json.loads(body) if isinstance(body, str) else body
+    except json.JSONDecodeError:
+        return {
+            'statusCode': 400,
+            'body': 'El cuerpo de la solicitud no es un JSON válido'
+        }
+
+    keep = (event.get('headers') or {}).get('Authorization') if body.get('keep_current') else None
+    try:
+        revoked, failed = revoke_sessions(identity['tenant_id'], identity['student_id'], keep=keep)
+    except Exception as e:
+        logger.error(f"Error al revocar las sesiones: {e}")
+        return {
+            'statusCode': 500,
+            'body': 'Error interno del servidor'
+        }
+
+    if failed:
+        logger.error(f"No se pudieron revocar {len(failed)} sesiones del estudiante {identity['student_id']}")
+        return {
+            'statusCode': 500,
+            'body': {'message': 'No se pudieron revocar todas las sesiones', 'revoked': revoked,
+                     'failed': len(failed)}
+        }
+
+    return {
+        'statusCode': 200,
+        'body': {
+            'message': 'Sesiones revocadas',
+            'revoked': revoked
+        }
+    }
@@ -0,0 +1,202 @@
+import argparse
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from botocore.exceptions import ClientError
+
+from common import metrics, profiling, runtime
+from common.auth import EXPIRES_AT, token_expiry
+from common.batch import BATCH_SIZE, AdaptiveThrottle, write_chunk
+from common.revocations import STAMP_TOKEN
+
+# Configurar el logger
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+# Inicializar los clientes de AWS (fase Init del contenedor)
+runtime.warm()
+
+# Obtener el stage desde las variables de entorno
+stage = os.environ.get("STAGE", "dev")  # Default a "dev" si no se define
+
+# Margen antes del timeout de la Lambda para cortar el barrido
+DEADLINE_MARGIN_SECONDS = 30
+
+
+class TokenSweeper:
+    # Barrido de t_access_tokens con scans segmentados en paralelo: borra en
+    # lotes de 25 los tokens vencidos (el TTL de DynamoDB puede tardar días) y
+    # migra los tokens vigentes con `expires` en texto al atributo EXPIRES_AT
+
+    def __init__(self, dynamodb, segments=8, page_size=1000, dry_run=False, deadline=None, throttle=None):
+        # El cliente de boto3 es thread-safe; el resource no
+        self.client = dynamodb.meta.client
+        self.table_name = f"{stage}_t_access_tokens"
+        self.segments = segments
+        self.page_size = page_size
+        self.dry_run = dry_run
+        # time.monotonic() a partir del cual no se piden más páginas
+        self.deadline = deadline
+        self.throttle = throttle or AdaptiveThrottle()
+
+        self.scanned = 0
+        self.deleted = 0
+        self.converted = 0
+        self.invalid = 0
+        self.failed = 0
+        self.complete = True
+        self._lock = threading.Lock()
+
+    def _count(self, **counts):
+        with self._lock:
+            for name, value in counts.items():
+                setattr(self, name, getattr(self, name) + value)
+
+    def _delete(self, tokens):
+        if self.dry_run:
+            return 0
+        failed = 0
+        for start in range(0, len(tokens), BATCH_SIZE):
+            chunk = [{'DeleteRequest': {'Key': {'token': token}}} for token in tokens[start:start + BATCH_SIZE]]
+            try:
+                failed += len(write_chunk(self.client, self.table_name, chunk, throttle=self.throttle))
+            except ClientError as e:
+                logger.error(f"Error al borrar tokens: {e}")
+                failed += len(chunk)
+        return failed
+
+    def _convert(self, token, expires_at):
+        if self.dry_run:
+            return True
+        try:
+            # Condicional: no se recrea un token borrado entre el scan y el update
+            self.client.update_item(
+                TableName=self.table_name,
+                Key={'token': token},
+                UpdateExpression='SET #e = :e REMOVE #x',
+                ConditionExpression='attribute_exists(#t)',
+                ExpressionAttributeNames={'#t': 'token', '#e': EXPIRES_AT, '#x': 'expires'},
+                ExpressionAttributeValues={':e': expires_at}
+            )
+        except ClientError as e:
+            if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+                logger.error(f"Error al migrar el token: {e}")
+                return False
+        return True
+
+    def _sweep_segment(self, segment):
+        # Solo se traen los tokens vencidos o sin EXPIRES_AT; el filtro no
+        # reduce las RCU del scan pero sí el tamaño de cada página
+        kwargs = {
+            'TableName': self.table_name,
+            'Segment': segment,
+            'TotalSegments': self.segments,
+            'Limit': self.page_size,
+            'ProjectionExpression': '#t, #e, #x',
+            'FilterExpression': 'attribute_not_exists(#e) OR #e < :now',
+            'ExpressionAttributeNames': {'#t': 'token', '#e': EXPIRES_AT, '#x': 'expires'},
+            'ExpressionAttributeValues': {':now': int(time.time())}
+        }
+        while True:
+            if self.deadline and time.monotonic() > self.deadline:
+                self.complete = False
+                return
+            response = self.client.scan(**kwargs)
+            now = int(time.time())
+            expired, invalid, converted, failed = [], 0, 0, 0
+            for item in response.get('Items', []):
+                if item['token'] == STAMP_TOKEN:
+                    continue
+                expires_at = token_expiry(item)
+                if expires_at is None:
+                    invalid += 1
+                    expired.append(item['token'])
+                elif now > expires_at:
+                    expired.append(item['token'])
+                elif EXPIRES_AT not in item:
+                    if self._convert(item['token'], expires_at):
+                        converted += 1
+                    else:
+                        failed += 1
+            failed_deletes = self._delete(expired)
+            self._count(scanned=response.get('ScannedCount', 0), deleted=len(expired) - failed_deletes,
+                        converted=converted, invalid=invalid, failed=failed + failed_deletes)
+            if 'LastEvaluatedKey' not in response:
+                return
+            kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+    def run(self):
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.segments) as executor:
+            # list() propaga las excepciones de los hilos
+            list(executor.map(self._sweep_segment, range(self.segments)))
+        elapsed = time.perf_counter() - start
+        return {
+            'segments': self.segments,
+            'scanned': self.scanned,
+            'deleted': self.deleted,
+            'converted': self.converted,
+            'invalid': self.invalid,
+            'failed': self.failed,
+            'complete': self.complete,
+            'dry_run': self.dry_run,
+            'elapsed_seconds': round(elapsed, 3),
+            'rows_per_second': round(self.scanned / elapsed, 1) if elapsed else None,
+            'throttled': self.throttle.throttled
+        }
+
+
+@metrics.instrumented('SweepAccessTokens')
+@profiling.profiled
+def lambda_handler(event, context):
+    # Entrada (evento programado o invocación manual):
+    # {"segments": 8, "page_size": 1000, "dry_run": false}
+    event = event if isinstance(event, dict) else {}
+    deadline = None
+    if context is not None and hasattr(context, 'get_remaining_time_in_millis'):
+        deadline = time.monotonic() + context.get_remaining_time_in_millis() / 1000 - DEADLINE_MARGIN_SECONDS
+    sweeper = TokenSweeper(
+        runtime.dynamodb(),
+        segments=int(event.get('segments', 8)),
+        page_size=int(event.get('page_size', 1000)),
+        dry_run=bool(event.get('dry_run')),
+        deadline=deadline
+    )
+    try:
+        report = sweeper.run()
+    except Exception as e:
+        logger.error(f"Error al barrer los tokens: {e}")
+        return {
+            'statusCode': 500,
+            'body': {'error': str(e)}
+        }
+
+    logger.info("Barrido de tokens: %s revisados, %s borrados, %s migrados, %.0f filas/s",
+                report['scanned'], report['deleted'], report['converted'], report['rows_per_second'] or 0)
+    return {
+        'statusCode': 200,
+        'body': report
+    }
+
+
+def main(argv=None):
+    # Uso local: python Lambda_SweepAccessTokens.py --segments 16 --dry-run
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--segments', type=int, default=8)
+    parser.add_argument('--page-size', type=int, default=1000)
+    parser.add_argument('--dry-run', action='store_true')
+    args = parser.parse_args(argv)
+
+    sweeper = TokenSweeper(runtime.dynamodb(), segments=args.segments, page_size=args.page_size,
+                           dry_run=args.dry_run)
+    json.dump(sweeper.run(), sys.stdout, indent=2)
+    print()
+
+
+if __name__ == '__main__':
+    main()
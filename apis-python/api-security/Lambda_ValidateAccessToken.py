@@ -1,38 +1,74 @@
 
-import boto3
-import os
-from datetime import datetime
+from common import metrics, profiling, runtime
+from common.auth import AuthError, validate_token
 
-# Obtener el stage desde las variables de entorno
-stage = os.environ.get("STAGE", "dev")  # Default a "dev" si no se define
+# Inicializar los clientes de AWS (fase Init del contenedor)
+runtime.warm()
 
+def build_policy(effect, method_arn, principal_id='anonymous', context=None):
+    # Se autoriza todo el stage del API para que el cache del authorizer
+    # sirva para cualquier método con el mismo token
+    arn_parts = method_arn.split(':')
+    api_id, api_stage = arn_parts[5].split('/')[:2]
+    resource = ':'.join(arn_parts[:5] + [f"{api_id}/{api_stage}/*/*"])
+
+    policy = {
+        'principalId': principal_id,
+        'policyDocument': {
+            'Version': '2012-10-17',
+            'Statement': [{
+                'Action': 'execute-api:Invoke',
+                'Effect': effect,
+                'Resource': resource
+            }]
+        }
+    }
+    if context:
+        policy['context'] = context
+    return policy
+
+def authorizer_handler(event, context):
+    # Authorizer de API Gateway (TOKEN o REQUEST)
+    if event.get('type') == 'REQUEST':
+        token = (event.get('headers') or {}).get('Authorization')
+    else:
+        token = event.get('authorizationToken')
+    if not token:
+        # API Gateway responde 401
+        raise Exception('Unauthorized')
+
+    try:
+        identity = validate_token(token)
+    except AuthError:
+        return build_policy('Deny', event['methodArn'])
+
+    return build_policy(
+        'Allow',
+        event['methodArn'],
+        principal_id=f"{identity['tenant_id']}/{identity['student_id']}",
+        context=identity
+    )
+
+@metrics.instrumented('ValidateAccessToken')
+@profiling.profiled
 def lambda_handler(event, context):
+    if 'methodArn' in event:
+        return authorizer_handler(event, context)
+
+    # Invocación directa (servicios que aún llaman a la función con {"token": ...})
     # Entrada (json)
     token = event['token']
     # Proceso
-    dynamodb = boto3.resource('dynamodb')
-    table = dynamodb.Table(f"{stage}_t_access_tokens")
-    response = table.get_item(
-        Key={
-            'token': token
-        }
-    )
-    if 'Item' not in response:
+    try:
+        validate_token(token)
+    except AuthError as e:
         return {
             'statusCode': 403,
-            'body': 'Token no existe'
+            'body': e.message
         }
-    else:
-        expires = response['Item']['expires']
-        now = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-        if now > expires:
-            return {
-                'statusCode': 403,
-                'body': 'Token expirado'
-            }
 
     # Salida (json)
     return {
         'statusCode': 200,
         'body': 'Token válido'
-    }
\ No newline at end of file
+    }
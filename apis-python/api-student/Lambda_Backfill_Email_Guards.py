@@ -0,0 +1,203 @@
+import argparse
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from botocore.exceptions import ClientError
+
+from common import metrics, profiling, runtime
+from common.batch import THROTTLING_ERRORS, AdaptiveThrottle, backoff_delay
+from common.serializer import plain_item
+
+# Configurar el logger
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+# Inicializar los clientes de AWS (fase Init del contenedor)
+runtime.warm()
+
+# Obtener el stage desde las variables de entorno
+stage = os.environ.get("STAGE", "dev")  # Default a "dev" si no se define
+
+# Margen antes del timeout de la Lambda para cortar el backfill
+DEADLINE_MARGIN_SECONDS = 30
+# Conflictos que se devuelven en el reporte (el resto solo se cuenta)
+MAX_REPORTED_CONFLICTS = 100
+
+
+class EmailGuardBackfill:
+    # Crea en t_student_emails el guard de los estudiantes anteriores a él,
+    # con scans segmentados en paralelo de t_students. Cada guard es un
+    # PutItem condicional (BatchWriteItem no admite condiciones): si el email
+    # ya tiene guard de otro estudiante (emails repetidos en los datos
+    # anteriores) se reporta como conflicto para resolverlo a mano. Es
+    # idempotente: se puede cortar y volver a correr. Con complete=true y sin
+    # conflictos se puede desactivar EMAIL_GUARD_FALLBACK
+
+    def __init__(self, dynamodb, segments=8, page_size=1000, dry_run=False, deadline=None, throttle=None,
+                 max_retries=8):
+        # El cliente de boto3 es thread-safe; el resource no
+        self.client = dynamodb.meta.client
+        self.t_students = f"{stage}_t_students"
+        self.t_student_emails = f"{stage}_t_student_emails"
+        self.segments = segments
+        self.page_size = page_size
+        self.dry_run = dry_run
+        # time.monotonic() a partir del cual no se piden más páginas
+        self.deadline = deadline
+        self.throttle = throttle or AdaptiveThrottle()
+        self.max_retries = max_retries
+
+        self.scanned = 0
+        self.created = 0
+        self.existing = 0
+        self.failed = 0
+        self.conflicts = []
+        self.conflict_count = 0
+        self.complete = True
+        self._lock = threading.Lock()
+
+    def _count(self, **counts):
+        with self._lock:
+            for name, value in counts.items():
+                setattr(self, name, getattr(self, name) + value)
+
+    def _conflict(self, item, owner):
+        with self._lock:
+            self.conflict_count += 1
+            if len(self.conflicts) < MAX_REPORTED_CONFLICTS:
+                self.conflicts.append({
+                    'tenant_id': item['tenant_id'],
+                    'student_email': item['student_email'],
+                    'student_id': item['student_id'],
+                    'guard_student_id': owner
+                })
+
+    def _guard(self, item):
+        # 'created', 'existing' (ya tenía su guard), 'conflict' o 'failed'
+        if self.dry_run:
+            return 'created'
+        for attempt in range(self.max_retries + 1):
+            self.throttle.wait()
+            try:
+                self.client.put_item(
+                    TableName=self.t_student_emails,
+                    Item={'tenant_id': item['tenant_id'], 'student_email': item['student_email'],
+                          'student_id': item['student_id']},
+                    ConditionExpression='attribute_not_exists(student_email)',
+                    ReturnValuesOnConditionCheckFailure='ALL_OLD'
+                )
+                self.throttle.on_success()
+                return 'created'
+            except ClientError as e:
+                code = e.response['Error']['Code']
+                if code == 'ConditionalCheckFailedException':
+                    owner = (plain_item(e.response.get('Item')) or {}).get('student_id')
+                    if owner == item['student_id']:
+                        return 'existing'
+                    self._conflict(item, owner)
+                    return 'conflict'
+                if code not in THROTTLING_ERRORS or attempt == self.max_retries:
+                    logger.error(f"Error al crear el guard de {item['student_id']}: {e}")
+                    return 'failed'
+                self.throttle.on_throttle()
+                time.sleep(backoff_delay(attempt))
+        return 'failed'
+
+    def _backfill_segment(self, segment):
+        kwargs = {
+            'TableName': self.t_students,
+            'Segment': segment,
+            'TotalSegments': self.segments,
+            'Limit': self.page_size,
+            'ProjectionExpression': 'tenant_id, student_id, student_email',
+            'FilterExpression': 'attribute_exists(student_email)'
+        }
+        while True:
+            if self.deadline and time.monotonic() > self.deadline:
+                self.complete = False
+                return
+            response = self.client.scan(**kwargs)
+            outcomes = [self._guard(item) for item in response.get('Items', [])]
+            self._count(scanned=response.get('ScannedCount', 0), created=outcomes.count('created'),
+                        existing=outcomes.count('existing'), failed=outcomes.count('failed'))
+            if 'LastEvaluatedKey' not in response:
+                return
+            kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+    def run(self):
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.segments) as executor:
+            # list() propaga las excepciones de los hilos
+            list(executor.map(self._backfill_segment, range(self.segments)))
+        elapsed = time.perf_counter() - start
+        return {
+            'segments': self.segments,
+            'scanned': self.scanned,
+            'created': self.created,
+            'existing': self.existing,
+            'failed': self.failed,
+            'conflicts': self.conflict_count,
+            'conflict_samples': self.conflicts,
+            'complete': self.complete and not self.failed,
+            'dry_run': self.dry_run,
+            'elapsed_seconds': round(elapsed, 3),
+            'rows_per_second': round(self.scanned / elapsed, 1) if elapsed else None,
+            'throttled': self.throttle.throttled
+        }
+
+
+@metrics.instrumented('BackfillEmailGuards')
+@profiling.profiled
+def lambda_handler(event, context):
+    # Invocación manual (se puede repetir hasta que complete sea true):
+    # {"segments": 8, "page_size": 1000, "dry_run": false}
+    event = event if isinstance(event, dict) else {}
+    deadline = None
+    if context is not None and hasattr(context, 'get_remaining_time_in_millis'):
+        deadline = time.monotonic() + context.get_remaining_time_in_millis() / 1000 - DEADLINE_MARGIN_SECONDS
+    backfill = EmailGuardBackfill(
+        runtime.dynamodb(),
+        segments=int(event.get('segments', 8)),
+        page_size=int(event.get('page_size', 1000)),
+        dry_run=bool(event.get('dry_run')),
+        deadline=deadline
+    )
+    try:
+        report = backfill.run()
+    except Exception as e:
+        logger.error(f"Error al crear los guards de email: {e}")
+        return {
+            'statusCode': 500,
+            'body': {'error': str(e)}
+        }
+
+    logger.info("Backfill de guards de email: %s revisados, %s creados, %s existentes, %s conflictos, "
+                "%s con error", report['scanned'], report['created'], report['existing'], report['conflicts'],
+                report['failed'])
+    return {
+        'statusCode': 200,
+        'body': report
+    }
+
+
+def main(argv=None):
+    # Uso local: python Lambda_Backfill_Email_Guards.py --segments 16 --dry-run
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--segments', type=int, default=8)
+    parser.add_argument('--page-size', type=int, default=1000)
+    parser.add_argument('--dry-run', action='store_true')
+    args = parser.parse_args(argv)
+
+    backfill = EmailGuardBackfill(runtime.dynamodb(), segments=args.segments, page_size=args.page_size,
+                                  dry_run=args.dry_run)
+    json.dump(backfill.run(), sys.stdout, indent=2, ensure_ascii=False)
+    print()
+
+
+if __name__ == '__main__':
+    main()
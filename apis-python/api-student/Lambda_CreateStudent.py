@@ -1,12 +1,69 @@
-import boto3
 import hashlib
+import json
 import os
 from datetime import datetime
+from botocore.exceptions import ClientError
+
+from common import metrics, profiling, runtime
+
+# Inicializar los clientes de AWS (fase Init del contenedor)
+runtime.warm()
+
+# Los estudiantes creados antes de t_student_emails no tienen guard hasta que
+# corre BackfillEmailGuards; mientras tanto se consulta también el GSI
+EMAIL_GUARD_FALLBACK = os.environ.get("EMAIL_GUARD_FALLBACK", "true").lower() != "false"
 
 # Function to hash the password
 def hash_password(password):
     return hashlib.sha256(password.encode()).hexdigest()
 
+def build_student_item(body):
+    # Hash the password
+    hashed_password = hash_password(body['password'])
+
+    # Creation date
+    creation_date = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+
+    # Main structure of the student data with `student_email` and `creation_date` at the top level
+    item = {
+        'tenant_id': body['tenant_id'],
+        'student_id': body['student_id'],
+        'student_email': body['student_email'],  # Moved to top level
+        'creation_date': creation_date,   # Moved to top level
+        'student_data': {
+            'student_name': body.get('student_name', 'Unknown'),
+            'password': hashed_password,
+            'rockie_coins': body.get('rockie_coins', 0),
+            'rockie_gems': body.get('rockie_gems', 0)
+        }
+    }
+
+    # Add optional fields to student_data if they are present in the body
+    optional_fields = ['birthday', 'gender', 'telephone']
+    for field in optional_fields:
+        if body.get(field):
+            item['student_data'][field] = body.get(field)
+
+    return item
+
+def legacy_email_taken(tenant_id, student_email):
+    # True si el email ya lo usa un estudiante según student_email_index.
+    # Usa el cliente (thread-safe) porque también lo llama ImportStudents
+    if not EMAIL_GUARD_FALLBACK:
+        return False
+    stage = os.environ.get("STAGE", "dev")
+    response = runtime.dynamodb().meta.client.query(
+        TableName=f"{stage}_t_students",
+        IndexName='student_email_index',
+        KeyConditionExpression='student_email = :email AND tenant_id = :tenant_id',
+        ExpressionAttributeValues={':email': student_email, ':tenant_id': tenant_id},
+        ProjectionExpression='student_id',
+        Limit=1
+    )
+    return bool(response.get('Items'))
+
+@metrics.instrumented('CreateStudent')
+@profiling.profiled
 def lambda_handler(event, context):
     try:
         # Check if `event['body']` is a JSON string and parse it if necessary
@@ -22,69 +79,63 @@ def lambda_handler(event, context):
 
         # Check for required fields
         if tenant_id and student_id and student_email and password:
-            # Connect to DynamoDB
-            dynamodb = boto3.resource('dynamodb')
             # Obtener el stage desde las variables de entorno
             stage = os.environ.get("STAGE", "dev")  # Default a "dev" si no se define
-            t_students = dynamodb.Table(f"{stage}_t_students")
+            t_students = f"{stage}_t_students"
+            t_student_emails = f"{stage}_t_student_emails"
 
-            # Check if the student already exists by student_id
-            existing_student = t_students.get_item(
-                Key={
-                    'tenant_id': tenant_id,
-                    'student_id': student_id
-                }
-            )
-
-            if 'Item' in existing_student:
-                # If the student already exists by student_id, return an error
-                return {
-                    'statusCode': 400,
-                    'body': {'error': 'Student with this student_id already exists'}
-                }
+            item = build_student_item(body)
 
-            # Check if the student already exists by student_email using GSI
-            response = t_students.query(
-                IndexName='student_email_index',
-                KeyConditionExpression=boto3.dynamodb.conditions.Key('student_email').eq(student_email) &
-                                      boto3.dynamodb.conditions.Key('tenant_id').eq(tenant_id)
-            )
-
-            if response['Items']:
-                # If a student with the same email already exists, return an error
+            # Estudiantes anteriores al guard (hasta que corra el backfill)
+            if legacy_email_taken(tenant_id, student_email):
                 return {
                     'statusCode': 400,
                     'body': {'error': 'Student with this student_email already exists'}
                 }
 
-            # Hash the password
-            hashed_password = hash_password(password)
-
-            # Creation date
-            creation_date = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-
-            # Main structure of the student data with `student_email` and `creation_date` at the top level
-            item = {
-                'tenant_id': tenant_id,
-                'student_id': student_id,
-                'student_email': student_email,  # Moved to top level
-                'creation_date': creation_date,   # Moved to top level
-                'student_data': {
-                    'student_name': body.get('student_name', 'Unknown'),
-                    'password': hashed_password,
-                    'rockie_coins': body.get('rockie_coins', 0),
-                    'rockie_gems': body.get('rockie_gems', 0)
-                }
-            }
-
-            # Add optional fields to student_data if they are present in the body
-            optional_fields = ['birthday', 'gender', 'telephone']
-            for field in optional_fields:
-                if body.get(field):
-                    item['student_data'][field] = body.get(field)
-
-            # Insert the record into the table
-            t_students.put_item(Item=item)
+            # Insert the student and the email guard in a single transaction:
+            # the conditions enforce both student_id and email uniqueness,
+            # even under concurrent signups
+            try:
+                runtime.dynamodb().meta.client.transact_write_items(
+                    TransactItems=[
+                        {
+                            'Put': {
+                                'TableName': t_students,
+                                'Item': item,
+                                'ConditionExpression': 'attribute_not_exists(student_id)'
+                            }
+                        },
+                        {
+                            'Put': {
+                                'TableName': t_student_emails,
+                                'Item': {
+                                    'tenant_id': tenant_id,
+                                    'student_email': student_email,
+                                    'student_id': student_id
+                                },
+                                'ConditionExpression': 'attribute_not_exists(student_email)'
+                            }
+                        }
+                    ]
+                )
+            except ClientError as e:
+                if e.response['Error']['Code'] != 'TransactionCanceledException':
+                    raise
+                reasons = [r.get('Code') for r in e.response.get('CancellationReasons', [])]
+                if reasons and reasons[0] == 'ConditionalCheckFailed':
+                    # If the student already exists by student_id, return an error
+                    return {
+                        'statusCode': 400,
+                        'body': {'error': 'Student with this student_id already exists'}
+                    }
+                if len(reasons) > 1 and reasons[1] == 'ConditionalCheckFailed':
+                    # If a student with the same email already exists, return an error
+                    return {
+                        'statusCode': 400,
+                        'body': {'error': 'Student with this student_email already exists'}
+                    }
+                raise
 
             # Success response
             return {
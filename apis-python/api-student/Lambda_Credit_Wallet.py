@@ -0,0 +1,79 @@
+import logging
+import os
+
+from common import metrics, profiling, runtime
+from common.wallet import IdempotencyConflict, StudentNotFound, credit, credit_many, validate
+
+# Configurar el logger
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+# Inicializar los clientes de AWS (fase Init del contenedor)
+runtime.warm()
+
+# Obtener el stage desde las variables de entorno
+stage = os.environ.get("STAGE", "dev")  # Default a "dev" si no se define
+
+
+@metrics.instrumented('Credit_Wallet')
+@profiling.profiled
+def lambda_handler(event, context):
+    # Invocación directa desde otros servicios (no se expone por API Gateway):
+    #   {"tenant_id", "student_id", "currency", "amount", "idempotency_key"}
+    #   {"tenant_id", "bulk": true, "currency", "amount", "idempotency_key", "student_ids": [...]}
+    # En modo bulk sin student_ids se acredita a todo el tenant
+    tenant_id = event.get('tenant_id')
+    currency, amount, key = event.get('currency'), event.get('amount'), event.get('idempotency_key')
+    error = 'Falta tenant_id' if not tenant_id else validate(currency, amount, key)
+    if error:
+        return {
+            'statusCode': 400,
+            'body': error
+        }
+    metrics.set_tenant(tenant_id)
+    t_students = runtime.table(f"{stage}_t_students")
+
+    if event.get('bulk'):
+        student_ids = event.get('student_ids')
+        if student_ids is not None and not isinstance(student_ids, list):
+            return {
+                'statusCode': 400,
+                'body': 'student_ids debe ser una lista'
+            }
+        report = credit_many(t_students, tenant_id, currency, amount, student_ids=student_ids,
+                             idempotency_key=key, workers=int(event.get('workers', 8)))
+        logger.info("Saldo acreditado: %s estudiantes, %s repetidos, %s con error, %.0f créditos/s",
+                    report['credited'], report['replayed'], report['failed'], report['credits_per_second'] or 0)
+        return {
+            'statusCode': 500 if report['failed'] else 200,
+            'body': report
+        }
+
+    student_id = event.get('student_id')
+    if not student_id:
+        return {
+            'statusCode': 400,
+            'body': 'Falta student_id'
+        }
+    try:
+        result = credit(t_students, tenant_id, student_id, currency, amount, key)
+    except IdempotencyConflict:
+        return {
+            'statusCode': 409,
+            'body': 'La clave de idempotencia ya se usó con otra operación'
+        }
+    except StudentNotFound:
+        return {
+            'statusCode': 404,
+            'body': 'Estudiante no encontrado'
+        }
+    except Exception as e:
+        logger.error(f"Error al acreditar el saldo: {e}")
+        return {
+            'statusCode': 500,
+            'body': 'Error interno del servidor'
+        }
+    return {
+        'statusCode': 200,
+        'body': result
+    }
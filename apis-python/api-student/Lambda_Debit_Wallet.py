@@ -0,0 +1,78 @@
+import json
+import logging
+import os
+
+from common import metrics, profiling, runtime
+from common.auth import AuthError, authenticate
+from common.wallet import IdempotencyConflict, InsufficientFunds, StudentNotFound, debit, validate
+
+# Configurar el logger
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+# Inicializar los clientes de AWS (fase Init del contenedor)
+runtime.warm()
+
+# Obtener el stage desde las variables de entorno
+stage = os.environ.get("STAGE", "dev")  # Default a "dev" si no se define
+
+@metrics.instrumented('Debit_Wallet')
+@profiling.profiled
+def lambda_handler(event, context):
+    # Gasto del estudiante: {"currency": "rockie_coins", "amount": 50, "idempotency_key": "..."}
+    try:
+        identity = authenticate(event)
+    except AuthError as e:
+        return e.response()
+
+    body = event.get('body')
+    if not body:
+        return {
+            'statusCode': 400,
+            'body': 'Falta el cuerpo de la solicitud'
+        }
+    try:
+        body = json.loads(body) if isinstance(body, str) else body
+    except json.JSONDecodeError:
+        return {
+            'statusCode': 400,
+            'body': 'El cuerpo de la solicitud no es un JSON válido'
+        }
+
+    currency, amount, key = body.get('currency'), body.get('amount'), body.get('idempotency_key')
+    error = validate(currency, amount, key)
+    if error:
+        return {
+            'statusCode': 400,
+            'body': error
+        }
+
+    try:
+        result = debit(runtime.table(f"{stage}_t_students"), identity['tenant_id'], identity['student_id'],
+                       currency, amount, key)
+    except InsufficientFunds as e:
+        return {
+            'statusCode': 409,
+            'body': {'message': 'Saldo insuficiente', 'currency': currency, 'balance': e.balance}
+        }
+    except IdempotencyConflict:
+        return {
+            'statusCode': 409,
+            'body': 'La clave de idempotencia ya se usó con otra operación'
+        }
+    except StudentNotFound:
+        return {
+            'statusCode': 404,
+            'body': 'Estudiante no encontrado'
+        }
+    except Exception as e:
+        logger.error(f"Error al debitar el saldo: {e}")
+        return {
+            'statusCode': 500,
+            'body': 'Error interno del servidor'
+        }
+
+    return {
+        'statusCode': 200,
+        'body': result
+    }
@@ -1,97 +1,99 @@
-import boto3
-import json
 import logging
 import os
+from botocore.exceptions import ClientError
+
+from common import metrics, profiling, runtime
+from common.auth import AuthError, authenticate
+from common.sessions import revoke_sessions
 
 # Configurar el logger
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
+# Inicializar los clientes de AWS (fase Init del contenedor)
+runtime.warm()
+
 # Obtener el stage desde las variables de entorno
 stage = os.environ.get("STAGE", "dev")  # Default a "dev" si no se define
 
+def purge_student(tenant_id, student_id):
+    # Elimina al estudiante y todo lo que depende de él.
+    # Devuelve el item eliminado o None si el estudiante no existía.
+    key = {'tenant_id': tenant_id, 'student_id': student_id}
+
+    # 1. Lectura del estudiante: trae el email necesario para liberar su guard
+    #    (DynamoDB no permite ReturnValues dentro de una transacción)
+    deleted = runtime.table(f"{stage}_t_students").get_item(Key=key, ConsistentRead=True).get('Item')
+    if deleted is None:
+        return None
+
+    # 2. Estudiante, rockie y guard del email en una sola transacción: o se
+    #    borra todo o nada, así un reintento nunca deja huérfanos. La
+    #    condición sobre el email evita liberar un guard que ya no es suyo
+    email = deleted.get('student_email')
+    student_delete = {
+        'TableName': f"{stage}_t_students",
+        'Key': key,
+        'ConditionExpression': 'attribute_exists(student_id) AND ' + (
+            'student_email = :email' if email else 'attribute_not_exists(student_email)')
+    }
+    if email:
+        student_delete['ExpressionAttributeValues'] = {':email': email}
+    transact_items = [
+        {'Delete': student_delete},
+        {'Delete': {'TableName': f"{stage}_t_rockies", 'Key': key}}
+    ]
+    if email:
+        transact_items.append({
+            'Delete': {
+                'TableName': f"{stage}_t_student_emails",
+                'Key': {'tenant_id': tenant_id, 'student_email': email},
+                'ConditionExpression': 'attribute_not_exists(student_id) OR student_id = :student_id',
+                'ExpressionAttributeValues': {':student_id': student_id}
+            }
+        })
+    client = runtime.dynamodb().meta.client
+    try:
+        client.transact_write_items(TransactItems=transact_items)
+    except ClientError as e:
+        if e.response['Error']['Code'] != 'TransactionCanceledException':
+            raise
+        reasons = [reason.get('Code') for reason in e.response.get('CancellationReasons') or []]
+        if reasons and reasons[0] == 'ConditionalCheckFailed':
+            # Otro request lo borró entre la lectura y la transacción
+            return None
+        if len(reasons) < 3 or reasons[2] != 'ConditionalCheckFailed':
+            raise
+        # El guard pertenece a otro estudiante (datos legacy): se borra el resto
+        client.transact_write_items(TransactItems=transact_items[:2])
+
+    # 3. Sesiones del estudiante: query sobre el índice, borrado en lotes y
+    #    revocación en los caches de todos los contenedores
+    _, failed = revoke_sessions(tenant_id, student_id)
+    if failed:
+        logger.error(f"No se pudieron eliminar {len(failed)} tokens del estudiante {student_id}")
+    return deleted
+
+@metrics.instrumented('Delete_Student')
+@profiling.profiled
 def lambda_handler(event, context):
-    # Obtener el token de autorización desde los headers
-    token = event['headers'].get('Authorization')
-    if not token:
-        return {
-            'statusCode': 400,
-            'body': 'Falta el token de autorización'
-        }
-
-    # Obtener el nombre de la función de validación desde la variable de entorno
-    validate_function_name = os.environ.get('VALIDATE_FUNCTION_NAME')
-    if not validate_function_name:
-        return {
-            'statusCode': 500,
-            'body': 'Error interno del servidor: falta configuración de la función de validación'
-        }
-
-    # Invocar la función Lambda ValidateAccessToken para validar el token
-    lambda_client = boto3.client('lambda')
-    payload_string = {"token": token}
-    invoke_response = lambda_client.invoke(
-        FunctionName=validate_function_name,
-        InvocationType='RequestResponse',
-        Payload=json.dumps(payload_string)
-    )
-
-    # Leer y cargar la respuesta de la invocación
-    response_payload = json.loads(invoke_response['Payload'].read())
-    logger.info("Response from ValidateAccessToken: %s", response_payload)
-
-    # Verificar si el token es válido
-    if response_payload.get('statusCode') == 403:
-        return {
-            'statusCode': 403,
-            'body': response_payload.get('body', 'Acceso No Autorizado')
-        }
-
-    # Extraer tenant_id y student_id desde la tabla de tokens
-    dynamodb = boto3.resource('dynamodb')
-    tokens_table = dynamodb.Table(f"{stage}_t_access_tokens")
-    token_response = tokens_table.get_item(
-        Key={
-            'token': token
-        }
-    )
-
-    if 'Item' not in token_response:
-        return {
-            'statusCode': 500,
-            'body': 'Error al obtener el tenant_id y student_id del token'
-        }
-
-    tenant_id = token_response['Item'].get('tenant_id')
-    student_id = token_response['Item'].get('student_id')
-
-    if not tenant_id or not student_id:
-        return {
-            'statusCode': 500,
-            'body': 'Error: Falta tenant_id o student_id en el token almacenado'
-        }
+    # Validar el token y obtener `tenant_id` y `student_id` con una sola lectura
+    try:
+        identity = authenticate(event)
+    except AuthError as e:
+        return e.response()
 
-    # Conectar con DynamoDB y verificar si el estudiante existe
-    t_students = dynamodb.Table(f"{stage}_t_students")
+    tenant_id = identity['tenant_id']
+    student_id = identity['student_id']
 
     try:
-        # Verificar si el estudiante existe antes de eliminarlo
-        response = t_students.get_item(
-            Key={'tenant_id': tenant_id, 'student_id': student_id}
-        )
-
         # Si no existe, devolver un mensaje indicando que no se encontró el estudiante
-        if 'Item' not in response:
+        if purge_student(tenant_id, student_id) is None:
             return {
                 'statusCode': 404,
                 'body': {'message': 'El estudiante no existe'}
             }
 
-        # Si existe, eliminar el estudiante de la tabla
-        t_students.delete_item(
-            Key={'tenant_id': tenant_id, 'student_id': student_id}
-        )
-
         # Devolver una respuesta de éxito
         return {
             'statusCode': 200,
@@ -0,0 +1,73 @@
+import logging
+import os
+
+from common import metrics, profiling, runtime
+from common.auth import AuthError, authenticate
+from common.batch import batch_get
+from common.serializer import json_response
+
+# Configurar el logger
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+# Inicializar los clientes de AWS (fase Init del contenedor)
+runtime.warm()
+
+# Obtener el stage desde las variables de entorno
+stage = os.environ.get("STAGE", "dev")  # Default a "dev" si no se define
+
+# Proyecciones: mismos campos que GetStudent y GetRockie, sin el password
+STUDENT_PROJECTION = (
+    "tenant_id, student_id, student_email, creation_date, "
+    "student_data.student_name, student_data.rockie_coins, student_data.rockie_gems, "
+    "student_data.birthday, student_data.gender, student_data.telephone"
+)
+ROCKIE_PROJECTION = "tenant_id, student_id, #level, experience, rockie_data, creation_date"
+
+@metrics.instrumented('Get_Profile')
+@profiling.profiled
+def lambda_handler(event, context):
+    # Validar el token una sola vez para ambos recursos
+    try:
+        identity = authenticate(event)
+    except AuthError as e:
+        return e.response()
+
+    key = {'tenant_id': identity['tenant_id'], 'student_id': identity['student_id']}
+    t_students = f"{stage}_t_students"
+    t_rockies = f"{stage}_t_rockies"
+
+    try:
+        # Estudiante y rockie en un solo BatchGetItem
+        responses = batch_get(runtime.dynamodb().meta.client, {
+            t_students: {
+                'Keys': [key],
+                'ProjectionExpression': STUDENT_PROJECTION
+            },
+            t_rockies: {
+                'Keys': [key],
+                'ProjectionExpression': ROCKIE_PROJECTION,
+                'ExpressionAttributeNames': {'#level': 'level'}
+            }
+        })
+
+        students = responses.get(t_students, [])
+        if not students:
+            return {
+                'statusCode': 404,
+                'body': 'Estudiante no encontrado'
+            }
+        rockies = responses.get(t_rockies, [])
+
+        return json_response(200, {
+            'student': students[0],
+            'rockie': rockies[0] if rockies else None
+        })
+
+    except Exception as e:
+        # Log de error detallado
+        logger.error(f"Error al obtener el perfil desde DynamoDB: {e}")
+        return {
+            'statusCode': 500,
+            'body': 'Error interno del servidor al obtener el perfil'
+        }
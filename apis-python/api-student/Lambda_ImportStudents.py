@@ -0,0 +1,316 @@
+import argparse
+import csv
+import io
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from botocore.exceptions import ClientError
+
+from common import metrics, profiling, runtime
+from common.batch import BATCH_SIZE, AdaptiveThrottle, batch_get, write_request_items
+from common.rockie import build_rockie_item
+from Lambda_CreateStudent import build_student_item, legacy_email_taken
+
+# Configurar el logger
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+# Inicializar los clientes de AWS (fase Init del contenedor)
+runtime.warm('s3')
+
+# Obtener el stage desde las variables de entorno
+stage = os.environ.get("STAGE", "dev")  # Default a "dev" si no se define
+
+REQUIRED_FIELDS = ('tenant_id', 'student_id', 'student_email', 'password')
+NUMERIC_FIELDS = ('rockie_coins', 'rockie_gems')
+
+
+def iter_rows(lines, file_format):
+    # Lee el archivo línea por línea: nunca se carga completo en memoria.
+    # Devuelve (número de fila, fila) o (número de fila, excepción)
+    if file_format == 'csv':
+        reader = csv.DictReader(lines)
+        for row in reader:
+            yield reader.line_num, {k: v for k, v in row.items() if k and v not in (None, '')}
+    else:
+        for number, line in enumerate(lines, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield number, json.loads(line)
+            except json.JSONDecodeError as e:
+                yield number, ValueError(f"JSON inválido: {e.msg}")
+
+
+def iter_s3_lines(bucket, key):
+    body = runtime.client('s3').get_object(Bucket=bucket, Key=key)['Body']
+    for line in body.iter_lines():
+        yield line.decode('utf-8')
+
+
+class StudentImporter:
+    # Escribe con BatchWriteItem en lotes de 25 requests (estudiante, guard
+    # del email y, opcional, rockie de cada fila). BatchWriteItem no admite
+    # condiciones: antes de escribir un lote, una BatchGetItem consistente
+    # descarta las filas cuyo estudiante, email o rockie ya existen y las
+    # reporta como errores de esa fila, así que un reimport no pisa datos
+
+    def __init__(self, dynamodb, create_rockie=False, workers=8, default_tenant_id=None, throttle=None):
+        # El cliente de boto3 es thread-safe; el resource no
+        self.client = dynamodb.meta.client
+        self.create_rockie = create_rockie
+        self.workers = workers
+        self.default_tenant_id = default_tenant_id
+        self.throttle = throttle or AdaptiveThrottle()
+        self.t_students = f"{stage}_t_students"
+        self.t_student_emails = f"{stage}_t_student_emails"
+        self.t_rockies = f"{stage}_t_rockies"
+
+        self.seen_ids = set()
+        self.seen_emails = set()
+        self.errors = []
+        self.imported = 0
+        self.rows = 0
+        self._lock = threading.Lock()
+
+    def _error(self, number, row, message):
+        with self._lock:
+            self.errors.append({
+                'row': number,
+                'student_id': row.get('student_id') if isinstance(row, dict) else None,
+                'error': message
+            })
+
+    def prepare(self, number, row):
+        # Valida, deduplica y arma los requests de una fila (None si es inválida)
+        if isinstance(row, Exception):
+            self._error(number, {}, str(row))
+            return None
+        if not isinstance(row, dict):
+            self._error(number, {}, 'La fila debe ser un objeto')
+            return None
+        if self.default_tenant_id and not row.get('tenant_id'):
+            row['tenant_id'] = self.default_tenant_id
+
+        missing = [field for field in REQUIRED_FIELDS if not row.get(field)]
+        if missing:
+            self._error(number, row, f"Faltan campos: {', '.join(missing)}")
+            return None
+        for field in NUMERIC_FIELDS:
+            if field in row:
+                try:
+                    row[field] = int(row[field])
+                except (TypeError, ValueError):
+                    self._error(number, row, f"{field} debe ser un entero")
+                    return None
+
+        student_key = (row['tenant_id'], row['student_id'])
+        email_key = (row['tenant_id'], row['student_email'])
+        if student_key in self.seen_ids:
+            self._error(number, row, 'student_id duplicado en el archivo')
+            return None
+        if email_key in self.seen_emails:
+            self._error(number, row, 'student_email duplicado en el archivo')
+            return None
+        self.seen_ids.add(student_key)
+        self.seen_emails.add(email_key)
+
+        requests = [
+            (self.t_students, {'PutRequest': {'Item': build_student_item(row)}}),
+            (self.t_student_emails, {'PutRequest': {'Item': {
+                'tenant_id': row['tenant_id'],
+                'student_email': row['student_email'],
+                'student_id': row['student_id']
+            }}})
+        ]
+        if self.create_rockie:
+            rockie = build_rockie_item(row['tenant_id'], row['student_id'], row.get('rockie_name') or 'Rockie')
+            requests.append((self.t_rockies, {'PutRequest': {'Item': rockie}}))
+        return requests
+
+    def _conflicts(self, batch):
+        # {número de fila: error} de las filas que pisarían datos existentes,
+        # con una sola BatchGetItem por lote (el archivo ya viene deduplicado)
+        students = [{'tenant_id': row['tenant_id'], 'student_id': row['student_id']} for _, row, _ in batch]
+        request_items = {
+            self.t_students: {'Keys': students, 'ProjectionExpression': 'tenant_id, student_id',
+                              'ConsistentRead': True},
+            self.t_student_emails: {
+                'Keys': [{'tenant_id': row['tenant_id'], 'student_email': row['student_email']} for _, row, _ in batch],
+                'ProjectionExpression': 'tenant_id, student_email', 'ConsistentRead': True
+            }
+        }
+        if self.create_rockie:
+            request_items[self.t_rockies] = {'Keys': students, 'ProjectionExpression': 'tenant_id, student_id',
+                                             'ConsistentRead': True}
+        found = batch_get(self.client, request_items)
+        existing_students = {(item['tenant_id'], item['student_id']) for item in found.get(self.t_students, [])}
+        existing_emails = {(item['tenant_id'], item['student_email'])
+                           for item in found.get(self.t_student_emails, [])}
+        existing_rockies = {(item['tenant_id'], item['student_id']) for item in found.get(self.t_rockies, [])}
+
+        conflicts = {}
+        for number, row, _ in batch:
+            if (row['tenant_id'], row['student_id']) in existing_students:
+                conflicts[number] = 'student_id ya existe'
+            elif (row['tenant_id'], row['student_email']) in existing_emails:
+                conflicts[number] = 'student_email ya registrado'
+            elif (row['tenant_id'], row['student_id']) in existing_rockies:
+                conflicts[number] = 'El rockie ya existe'
+            elif legacy_email_taken(row['tenant_id'], row['student_email']):
+                # Solo consulta el índice mientras EMAIL_GUARD_FALLBACK esté
+                # activo (emails anteriores al backfill de guards)
+                conflicts[number] = 'student_email ya registrado'
+        return conflicts
+
+    def _write(self, batch):
+        # batch: [(número de fila, fila, requests)], con <= 25 requests en
+        # total. Cualquier error queda como error de sus filas: ninguna fila
+        # se pierde sin aparecer en el reporte
+        try:
+            conflicts = self._conflicts(batch)
+            for number, row, _ in batch:
+                if number in conflicts:
+                    self._error(number, row, conflicts[number])
+            batch = [entry for entry in batch if entry[0] not in conflicts]
+            request_items = {}
+            for _, _, requests in batch:
+                for table, request in requests:
+                    request_items.setdefault(table, []).append(request)
+            unprocessed = write_request_items(self.client, request_items, throttle=self.throttle) if batch else {}
+        except Exception as e:
+            logger.error(f"Error al importar un lote de {len(batch)} filas: {e}")
+            message = f"{type(e).__name__}: {e}"
+            if isinstance(e, ClientError):
+                message = e.response['Error'].get('Message', message)
+            for number, row, _ in batch:
+                self._error(number, row, message)
+            return
+
+        failed = {
+            (request['PutRequest']['Item']['tenant_id'], request['PutRequest']['Item']['student_id'])
+            for requests in unprocessed.values() for request in requests
+        }
+        ok = 0
+        for number, row, _ in batch:
+            if (row['tenant_id'], row['student_id']) in failed:
+                self._error(number, row, 'No procesado por DynamoDB tras los reintentos')
+            else:
+                ok += 1
+        with self._lock:
+            self.imported += ok
+
+    def run(self, rows):
+        start = time.perf_counter()
+        # Como máximo 2 lotes en espera por hilo: el archivo se consume a la
+        # velocidad a la que se escribe
+        in_flight = threading.BoundedSemaphore(self.workers * 2)
+
+        pending = []
+
+        def submit(executor, batch):
+            in_flight.acquire()
+            future = executor.submit(self._write, batch)
+            future.add_done_callback(lambda _: in_flight.release())
+            pending.append((future, batch))
+
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            batch, size = [], 0
+            for number, row in rows:
+                self.rows += 1
+                requests = self.prepare(number, row)
+                if requests is None:
+                    continue
+                # Los requests de una fila nunca se separan en lotes distintos
+                if size + len(requests) > BATCH_SIZE:
+                    submit(executor, batch)
+                    batch, size = [], 0
+                batch.append((number, row, requests))
+                size += len(requests)
+            if batch:
+                submit(executor, batch)
+
+        # _write ya registra los errores de cada fila; esto cubre un fallo
+        # del propio lote para que ninguna fila desaparezca del reporte
+        for future, batch in pending:
+            error = future.exception()
+            if error is not None:
+                for number, row, _ in batch:
+                    self._error(number, row, f"{type(error).__name__}: {error}")
+
+        elapsed = time.perf_counter() - start
+        return {
+            'rows': self.rows,
+            'imported': self.imported,
+            'failed': len(self.errors),
+            'elapsed_seconds': round(elapsed, 3),
+            'rows_per_second': round(self.rows / elapsed, 1) if elapsed else None,
+            'throttled': self.throttle.throttled,
+            'errors': sorted(self.errors, key=lambda e: e['row'])
+        }
+
+
+@metrics.instrumented('ImportStudents')
+@profiling.profiled
+def lambda_handler(event, context):
+    # Entrada: {"bucket": ..., "key": ..., "format": "csv"|"jsonl",
+    #           "tenant_id": ..., "create_rockie": true, "workers": 8}
+    bucket = event.get('bucket')
+    key = event.get('key')
+    if not bucket or not key:
+        return {
+            'statusCode': 400,
+            'body': {'error': 'Missing bucket or key'}
+        }
+
+    file_format = event.get('format') or ('jsonl' if key.endswith(('.jsonl', '.json')) else 'csv')
+    importer = StudentImporter(
+        runtime.dynamodb(),
+        create_rockie=bool(event.get('create_rockie')),
+        workers=int(event.get('workers', 8)),
+        default_tenant_id=event.get('tenant_id')
+    )
+    try:
+        report = importer.run(iter_rows(iter_s3_lines(bucket, key), file_format))
+    except Exception as e:
+        logger.error(f"Error al importar estudiantes: {e}")
+        return {
+            'statusCode': 500,
+            'body': {'error': str(e)}
+        }
+
+    logger.info("Importación terminada: %s filas, %s importadas, %s con error",
+                report['rows'], report['imported'], report['failed'])
+    return {
+        'statusCode': 200,
+        'body': report
+    }
+
+
+def main(argv=None):
+    # Uso local: python Lambda_ImportStudents.py alumnos.csv --tenant-id colegio1 --create-rockie
+    parser = argparse.ArgumentParser()
+    parser.add_argument('path')
+    parser.add_argument('--format', choices=('csv', 'jsonl'))
+    parser.add_argument('--tenant-id')
+    parser.add_argument('--create-rockie', action='store_true')
+    parser.add_argument('--workers', type=int, default=8)
+    args = parser.parse_args(argv)
+
+    file_format = args.format or ('jsonl' if args.path.endswith(('.jsonl', '.json')) else 'csv')
+    importer = StudentImporter(runtime.dynamodb(), create_rockie=args.create_rockie,
+                               workers=args.workers, default_tenant_id=args.tenant_id)
+    with io.open(args.path, newline='', encoding='utf-8') as lines:
+        report = importer.run(iter_rows(lines, file_format))
+    json.dump(report, sys.stdout, indent=2, ensure_ascii=False)
+    print()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,114 @@
+import logging
+import os
+from boto3.dynamodb.conditions import Key
+
+from common import metrics, profiling, runtime
+from common.auth import AuthError, authenticate
+from common.pagination import InvalidCursor, decode_cursor, encode_cursor
+from common.serializer import json_response
+
+# Configurar el logger
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+# Inicializar los clientes de AWS (fase Init del contenedor)
+runtime.warm()
+
+# Obtener el stage desde las variables de entorno
+stage = os.environ.get("STAGE", "dev")  # Default a "dev" si no se define
+
+DEFAULT_PAGE_SIZE = int(os.environ.get("ROSTER_PAGE_SIZE", "50"))
+MAX_PAGE_SIZE = int(os.environ.get("ROSTER_MAX_PAGE_SIZE", "200"))
+
+# Campos que se pueden pedir en `fields` (el password nunca se devuelve)
+ALLOWED_FIELDS = (
+    'student_id',
+    'student_email',
+    'creation_date',
+    'student_data.student_name',
+    'student_data.rockie_coins',
+    'student_data.rockie_gems',
+    'student_data.birthday',
+    'student_data.gender',
+    'student_data.telephone'
+)
+DEFAULT_FIELDS = ('student_id', 'student_email', 'student_data.student_name')
+
+def build_projection(fields):
+    # ProjectionExpression con placeholders para cada segmento del path
+    names = {}
+    paths = []
+    for field in fields:
+        aliases = []
+        for segment in field.split('.'):
+            alias = names.setdefault(segment, f"#p{len(names)}")
+            aliases.append(alias)
+        paths.append('.'.join(aliases))
+    return ', '.join(paths), {alias: name for name, alias in names.items()}
+
+@metrics.instrumented('List_Students')
+@profiling.profiled
+def lambda_handler(event, context):
+    # Validar el token y obtener `tenant_id` con una sola lectura
+    try:
+        identity = authenticate(event)
+    except AuthError as e:
+        return e.response()
+
+    tenant_id = identity['tenant_id']
+    query = event.get('query') or {}
+
+    # Tamaño de página
+    try:
+        limit = int(query.get('limit') or DEFAULT_PAGE_SIZE)
+    except ValueError:
+        return {
+            'statusCode': 400,
+            'body': 'limit debe ser un entero'
+        }
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+
+    # Campos a devolver
+    fields = tuple(f.strip() for f in (query.get('fields') or '').split(',') if f.strip()) or DEFAULT_FIELDS
+    invalid = [f for f in fields if f not in ALLOWED_FIELDS]
+    if invalid:
+        return {
+            'statusCode': 400,
+            'body': f"Campos no permitidos: {', '.join(invalid)}"
+        }
+    projection, names = build_projection(fields)
+
+    # El cursor solo puede apuntar al tenant del que consulta
+    try:
+        start_key = decode_cursor(query.get('cursor'), expected={'tenant_id': tenant_id})
+    except InvalidCursor as e:
+        return {
+            'statusCode': 400,
+            'body': str(e)
+        }
+
+    t_students = runtime.table(f"{stage}_t_students")
+
+    try:
+        # Query por partición: nunca se hace scan
+        kwargs = {
+            'KeyConditionExpression': Key('tenant_id').eq(tenant_id),
+            'ProjectionExpression': projection,
+            'ExpressionAttributeNames': names,
+            'Limit': limit
+        }
+        if start_key:
+            kwargs['ExclusiveStartKey'] = start_key
+        response = t_students.query(**kwargs)
+
+        return json_response(200, {
+            'items': response['Items'],
+            'cursor': encode_cursor(response.get('LastEvaluatedKey'))
+        })
+
+    except Exception as e:
+        logger.error(f"Error al listar los estudiantes desde DynamoDB: {e}")
+        return {
+            'statusCode': 500,
+            'body': 'Error interno del servidor al listar los estudiantes'
+        }
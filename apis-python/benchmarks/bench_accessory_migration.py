@@ -0,0 +1,73 @@
+# Benchmark de la migración del inventario de accesorios
+# (Lambda_Migrate_Accessories): siembra t_rockies en memoria con rockies que
+# tienen la lista anterior (algunos vacía) y otros ya con el set, y mide la
+# conversión con 1 y con N segmentos en paralelo. Con --latency-ms se simula
+# el tiempo de red de cada llamada a DynamoDB.
+#
+#   python apis-python/benchmarks/bench_accessory_migration.py [--rows 5000] [--segments 8] [--latency-ms 5]
+import argparse
+import os
+import sys
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path[:0] = [os.path.dirname(os.path.abspath(__file__)),
+                os.path.join(ROOT, 'api-common', 'layer', 'python'),
+                os.path.join(ROOT, 'api-rockie')]
+os.environ.setdefault("STAGE", "dev")
+os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+os.environ.setdefault("METRICS_ENABLED", "false")
+
+from common import runtime  # noqa: E402
+from common.inventory import ACCESSORIES  # noqa: E402
+from common.rockie import DEFAULT_ADORNED, build_rockie_item  # noqa: E402
+from local_dynamodb import InMemoryDynamoDB, create_default_tables  # noqa: E402
+
+STAGE = os.environ["STAGE"]
+
+
+def seed(db, rows):
+    # Un cuarto ya migrado; del resto, uno de cada diez con la lista vacía
+    table = db.Table(f"{STAGE}_t_rockies")
+    legacy = 0
+    for i in range(rows):
+        item = build_rockie_item('tenant-001', f"student-{i:06d}", 'Rocky')
+        if i % 4:
+            item['rockie_data'][ACCESSORIES] = [] if i % 10 == 1 else [f"acc-{j:04d}" for j in range(i % 40)]
+            legacy += 1
+        table.put_item(Item=item)
+    return legacy
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=5000)
+    parser.add_argument('--segments', type=int, default=8)
+    parser.add_argument('--page-size', type=int, default=500)
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--latency-ms', type=float, default=5.0, help='Latencia simulada por llamada')
+    args = parser.parse_args()
+
+    import Lambda_Migrate_Accessories
+
+    print(f"{'segmentos':<10} {'revisados':>10} {'convertidos':>12} {'filas/s':>10} {'segundos':>9} {'llamadas':>9}")
+    for segments in sorted({1, args.segments}):
+        db = create_default_tables(InMemoryDynamoDB(), STAGE)
+        legacy = seed(db, args.rows)
+        if args.latency_ms:
+            db.meta.client.meta.events.register(
+                'before-parameter-build.dynamodb', lambda **kwargs: time.sleep(args.latency_ms / 1000))
+        runtime.override(dynamodb=db)
+
+        report = Lambda_Migrate_Accessories.AccessoryMigrator(
+            db, segments=segments, page_size=args.page_size, workers=args.workers).run()
+        assert report['converted'] == legacy and not report['failed'], report
+        for item in db.data[f"{STAGE}_t_rockies"].values():
+            owned = item['rockie_data'].get(ACCESSORIES)
+            assert isinstance(owned, set) and set(DEFAULT_ADORNED.values()) <= owned, item['student_id']
+        print(f"{segments:<10} {report['scanned']:>10,} {report['converted']:>12,} "
+              f"{report['rows_per_second']:>10,.0f} {report['elapsed_seconds']:>9.2f} {db.total_calls():>9,}")
+
+
+if __name__ == '__main__':
+    main()
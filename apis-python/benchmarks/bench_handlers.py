@@ -0,0 +1,323 @@
+# Benchmark offline de los handlers: cada lambda_handler se ejecuta con
+# eventos sintéticos de API Gateway contra un DynamoDB en memoria
+# (local_dynamodb.py) y un cliente de Lambda simulado, sin desplegar nada.
+#
+#   python apis-python/benchmarks/bench_handlers.py [--n 500] [--only Student]
+#   python apis-python/benchmarks/bench_handlers.py --save baseline.json
+#   python apis-python/benchmarks/bench_handlers.py --baseline baseline.json --threshold 0.25
+#   python apis-python/benchmarks/bench_handlers.py --only Get_Student --profile /tmp/profiles
+#
+# Por endpoint reporta throughput, latencia p50/p95/p99 y llamadas a
+# DynamoDB/Lambda por request. Con --baseline termina con código 1 si algún
+# endpoint empeora más que el umbral (latencia, throughput o llamadas).
+import argparse
+import contextlib
+import io
+import json
+import os
+import sys
+import time
+from types import SimpleNamespace
+
+from botocore.hooks import HierarchicalEmitter
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path[:0] = [os.path.dirname(os.path.abspath(__file__)),
+                os.path.join(ROOT, 'api-common', 'layer', 'python'),
+                os.path.join(ROOT, 'api-security'),
+                os.path.join(ROOT, 'api-student'),
+                os.path.join(ROOT, 'api-rockie')]
+os.environ.setdefault("STAGE", "dev")
+os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+
+from common import profiling, runtime  # noqa: E402
+from common.rockie import build_rockie_item  # noqa: E402
+from local_dynamodb import InMemoryDynamoDB, OperationModel, call_with_events, create_default_tables  # noqa: E402
+
+STAGE = os.environ["STAGE"]
+TENANT = 'tenant-001'
+PASSWORD = 'secret'
+METHOD_ARN = 'arn:aws:execute-api:us-east-1:123456789012:api123/dev/GET/student'
+
+
+class LambdaStub:
+    # Cliente de Lambda: `invoke` ejecuta el handler en el mismo proceso
+    def __init__(self, functions):
+        self.functions = functions
+        self.calls = 0
+        self.meta = SimpleNamespace(events=HierarchicalEmitter())
+        self._model = OperationModel('Invoke')
+
+    def invoke(self, **params):
+        return call_with_events(self.meta.events, 'lambda', self._model, self._invoke, params)
+
+    def _invoke(self, FunctionName, Payload=b'{}', InvocationType='RequestResponse', **kwargs):
+        self.calls += 1
+        result = self.functions[FunctionName](json.loads(Payload), None)
+        if not isinstance(result, bytes):
+            result = json.dumps(result, default=str).encode()
+        return {'StatusCode': 200, 'Payload': io.BytesIO(result)}
+
+
+def status_of(response):
+    # Respuesta dict, bytes (json_response) o policy del authorizer
+    if isinstance(response, bytes):
+        response = json.loads(response)
+    if 'policyDocument' in response:
+        return response['policyDocument']['Statement'][0]['Effect']
+    return response.get('statusCode')
+
+
+def seed(db, students, pools):
+    from Lambda_CreateStudent import build_student_item
+
+    t_students = db.Table(f"{STAGE}_t_students")
+    t_emails = db.Table(f"{STAGE}_t_student_emails")
+    t_rockies = db.Table(f"{STAGE}_t_rockies")
+    t_tokens = db.Table(f"{STAGE}_t_access_tokens")
+
+    def add(student_id, rockie=True):
+        email = f"{student_id}@bench.edu"
+        t_students.put_item(Item=build_student_item({
+            'tenant_id': TENANT, 'student_id': student_id, 'student_email': email,
+            'password': PASSWORD, 'student_name': f"Alumno {student_id}", 'rockie_coins': 100,
+            'rockie_gems': 100000
+        }))
+        t_emails.put_item(Item={'tenant_id': TENANT, 'student_email': email, 'student_id': student_id})
+        if rockie:
+            t_rockies.put_item(Item=build_rockie_item(TENANT, student_id, 'Rocky'))
+        t_tokens.put_item(Item={'token': f"token-{student_id}", 'tenant_id': TENANT,
+                                'student_id': student_id, 'expires_at': int(time.time()) + 86400})
+
+    for i in range(students):
+        add(f"student-{i:05d}")
+    # Catálogo: cada alumno compra un producto distinto en cada pasada (los pares sí tienen stock)
+    t_purchasables = db.Table(f"{STAGE}_t_purchasable")
+    for i in range(pools // students + 1):
+        product = {'tenant_id': TENANT, 'product_id': f"acc-{i:05d}", 'store_type': 'accessories', 'price': 10,
+                   'product_info': {'name': f"Accesorio {i}"}}
+        if i % 2 == 0:
+            product['stock'] = students * 2
+        t_purchasables.put_item(Item=product)
+    # Pools de un solo uso para los endpoints que crean o borran
+    for i in range(pools):
+        add(f"del-{i:05d}")
+        add(f"rdel-{i:05d}")
+        add(f"crk-{i:05d}", rockie=False)
+        add(f"rev-{i:05d}", rockie=False)
+
+
+def endpoints(students, lambda_stub):
+    import Lambda_Award_Experience
+    import Lambda_CreateRockie
+    import Lambda_CreateStudent
+    import Lambda_Credit_Wallet
+    import Lambda_Debit_Wallet
+    import Lambda_Delete_Rockie
+    import Lambda_Delete_Student
+    import Lambda_Equip_Accessory
+    import Lambda_Get_Profile
+    import Lambda_Get_Rockie
+    import Lambda_Get_Student
+    import Lambda_Ingest_Activity_Events
+    import Lambda_List_Sessions
+    import Lambda_List_Students
+    import Lambda_Purchase_Accessory
+    import Lambda_LoginStudent
+    import Lambda_Revoke_Sessions
+    import Lambda_Update_Rockie
+    import Lambda_Update_Student
+    import Lambda_ValidateAccessToken
+
+    def student(i):
+        return f"student-{i % students:05d}"
+
+    def auth(student_id, **event):
+        event['headers'] = {'Authorization': f"token-{student_id}"}
+        return event
+
+    def invoke_validate(i):
+        response = lambda_stub.invoke(FunctionName=f"api-security-{STAGE}-ValidateAccessToken",
+                                      Payload=json.dumps({'token': f"token-{student(i)}"}).encode())
+        return json.loads(response['Payload'].read())
+
+    def ingest(i):
+        # Lote de SQS: 30 alumnos terminan 10 actividades
+        records = [{'messageId': f"msg-{i}-{j}", 'body': json.dumps({
+            'event_id': f"evt-{i}-{j}", 'tenant_id': TENANT, 'student_id': student(i * 30 + j % 30),
+            'experience': 25, 'coins': 2})} for j in range(300)]
+        response = Lambda_Ingest_Activity_Events.lambda_handler({'Records': records}, None)
+        return {'statusCode': 500 if response['batchItemFailures'] else 200}
+
+    # (nombre, función i -> respuesta, estados esperados)
+    return [
+        # Mismo dispositivo: reutiliza la sesión; dispositivo nuevo: token nuevo y tope de sesiones
+        ('LoginStudent', lambda i: Lambda_LoginStudent.lambda_handler({'body': {
+            'tenant_id': TENANT, 'student_email': f"{student(i)}@bench.edu", 'password': PASSWORD,
+            'device_id': 'bench-device'}}, None), {200}),
+        ('LoginStudent (nuevo dispositivo)', lambda i: Lambda_LoginStudent.lambda_handler({'body': {
+            'tenant_id': TENANT, 'student_email': f"{student(i)}@bench.edu", 'password': PASSWORD,
+            'device_id': f"device-{i}"}}, None), {200}),
+        ('ValidateAccessToken (authorizer)', lambda i: Lambda_ValidateAccessToken.lambda_handler({
+            'type': 'TOKEN', 'authorizationToken': f"token-{student(i)}", 'methodArn': METHOD_ARN}, None),
+         {'Allow'}),
+        ('ValidateAccessToken (invoke)', invoke_validate, {200}),
+        ('List_Sessions', lambda i: Lambda_List_Sessions.lambda_handler(auth(student(i)), None), {200}),
+        ('Revoke_Sessions', lambda i: Lambda_Revoke_Sessions.lambda_handler(auth(f"rev-{i:05d}"), None), {200}),
+        ('CreateStudent', lambda i: Lambda_CreateStudent.lambda_handler({'body': {
+            'tenant_id': TENANT, 'student_id': f"new-{i:06d}", 'student_email': f"new-{i:06d}@bench.edu",
+            'password': PASSWORD}}, None), {200}),
+        ('Get_Student', lambda i: Lambda_Get_Student.lambda_handler(auth(student(i)), None), {200}),
+        ('Update_Student', lambda i: Lambda_Update_Student.lambda_handler(auth(student(i), body={
+            'student_data': {'student_name': f"Alumno {i}"}}), None), {200}),
+        ('List_Students', lambda i: Lambda_List_Students.lambda_handler(auth(student(i), query={
+            'limit': '50'}), None), {200}),
+        ('Get_Profile', lambda i: Lambda_Get_Profile.lambda_handler(auth(student(i)), None), {200}),
+        ('Credit_Wallet', lambda i: Lambda_Credit_Wallet.lambda_handler({
+            'tenant_id': TENANT, 'student_id': student(i), 'currency': 'rockie_coins', 'amount': 10,
+            'idempotency_key': f"credit-{i}"}, None), {200}),
+        ('Debit_Wallet', lambda i: Lambda_Debit_Wallet.lambda_handler(auth(student(i), body={
+            'currency': 'rockie_coins', 'amount': 5, 'idempotency_key': f"debit-{i}"}), None), {200}),
+        ('Credit_Wallet (bulk de 30)', lambda i: Lambda_Credit_Wallet.lambda_handler({
+            'tenant_id': TENANT, 'bulk': True, 'currency': 'rockie_gems', 'amount': 1,
+            'student_ids': [student(i * 30 + j) for j in range(30)], 'idempotency_key': f"bulk-{i}"}, None),
+         {200}),
+        ('Delete_Student', lambda i: Lambda_Delete_Student.lambda_handler(auth(f"del-{i:05d}"), None), {200}),
+        ('CreateRockie', lambda i: Lambda_CreateRockie.lambda_handler(auth(f"crk-{i:05d}", body={
+            'rockie_name': 'Rocky'}), None), {200}),
+        ('Get_Rockie', lambda i: Lambda_Get_Rockie.lambda_handler(auth(student(i)), None), {200}),
+        ('Update_Rockie', lambda i: Lambda_Update_Rockie.lambda_handler(auth(student(i), body={
+            'rockie_data': {'rockie_name': f"Rocky {i}"}}), None), {200}),
+        ('Purchase_Accessory', lambda i: Lambda_Purchase_Accessory.lambda_handler(auth(student(i), body={
+            'product_id': f"acc-{i // students:05d}"}), None), {200}),
+        ('Equip_Accessory', lambda i: Lambda_Equip_Accessory.lambda_handler(auth(student(i), body={
+            'slot': 'head_accessory', 'accessory_id': f"acc-{i // students:05d}"}), None), {200}),
+        ('Award_Experience', lambda i: Lambda_Award_Experience.lambda_handler({
+            'tenant_id': TENANT, 'student_id': student(i), 'experience': 40}, None), {200}),
+        ('Award_Experience (clase de 30)', lambda i: Lambda_Award_Experience.lambda_handler({
+            'tenant_id': TENANT, 'awards': [{'student_id': student(i * 30 + j), 'experience': 40} for j in range(30)]},
+            None), {200}),
+        ('Ingest_Activity_Events (300 eventos)', ingest, {200}),
+        ('Delete_Rockie', lambda i: Lambda_Delete_Rockie.lambda_handler(auth(f"rdel-{i:05d}"), None), {200}),
+    ]
+
+
+def percentile(samples, p):
+    return samples[min(len(samples) - 1, int(len(samples) * p))]
+
+
+def measure(name, call, expected, db, lambda_stub, n, warmup):
+    for i in range(warmup):
+        call(i)
+    db.reset_calls()
+    lambda_calls = lambda_stub.calls
+    samples = []
+    errors = 0
+    start = time.perf_counter()
+    for i in range(warmup, warmup + n):
+        t0 = time.perf_counter()
+        response = call(i)
+        samples.append(time.perf_counter() - t0)
+        if status_of(response) not in expected:
+            errors += 1
+    elapsed = time.perf_counter() - start
+    samples.sort()
+    return {
+        'requests_per_second': n / elapsed,
+        'p50_ms': percentile(samples, 0.50) * 1000,
+        'p95_ms': percentile(samples, 0.95) * 1000,
+        'p99_ms': percentile(samples, 0.99) * 1000,
+        'dynamodb_calls': db.total_calls() / n,
+        'lambda_calls': (lambda_stub.calls - lambda_calls) / n,
+        'operations': {op: count / n for op, count in sorted(db.calls.items()) if count},
+        'errors': errors
+    }
+
+
+def regressions(results, baseline, threshold):
+    found = []
+    for name, result in results.items():
+        base = baseline.get(name)
+        if not base:
+            continue
+        if result['p95_ms'] > base['p95_ms'] * (1 + threshold):
+            found.append(f"{name}: p95 {base['p95_ms']:.3f}ms -> {result['p95_ms']:.3f}ms")
+        if result['requests_per_second'] < base['requests_per_second'] * (1 - threshold):
+            found.append(f"{name}: throughput {base['requests_per_second']:,.0f} -> "
+                         f"{result['requests_per_second']:,.0f} req/s")
+        for key in ('dynamodb_calls', 'lambda_calls'):
+            # Las llamadas por request son deterministas: cualquier aumento cuenta
+            if result[key] > base[key] + 1e-9:
+                found.append(f"{name}: {key} {base[key]:.2f} -> {result[key]:.2f} por request")
+    return found
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--n', type=int, default=500, help='Requests medidos por endpoint')
+    parser.add_argument('--warmup', type=int, default=20)
+    parser.add_argument('--students', type=int, default=200, help='Estudiantes precargados')
+    parser.add_argument('--only', help='Solo endpoints cuyo nombre contenga este texto')
+    parser.add_argument('--no-token-cache', action='store_true', help='Validar cada token contra la tabla')
+    parser.add_argument('--save', help='Guardar los resultados en este JSON (baseline)')
+    parser.add_argument('--baseline', help='Comparar contra este JSON y fallar si hay regresiones')
+    parser.add_argument('--threshold', type=float, default=0.2, help='Empeoramiento tolerado (0.2 = 20%%)')
+    parser.add_argument('--json', action='store_true', help='Imprimir los resultados como JSON')
+    parser.add_argument('--metrics-log', default=os.devnull,
+                        help='Archivo donde escribir las líneas EMF de common.metrics (ver metrics_report.py)')
+    parser.add_argument('--profile', metavar='DIR',
+                        help='Escribir en DIR los profiles (.collapsed/.pstats/.alloc.txt) de common.profiling')
+    parser.add_argument('--profile-rate', type=float, default=0.01,
+                        help='Fracción de requests perfilados con --profile')
+    args = parser.parse_args()
+
+    if args.profile:
+        profiling.PROFILE_DIR = args.profile
+        profiling.PROFILE_SAMPLE_RATE = args.profile_rate
+
+    db = create_default_tables(InMemoryDynamoDB(), STAGE)
+    runtime.override(dynamodb=db)
+    seed(db, args.students, args.warmup + args.n)
+
+    import Lambda_ValidateAccessToken
+    from common.token_cache import token_cache
+    if args.no_token_cache:
+        token_cache.max_size = 0
+    lambda_stub = LambdaStub({f"api-security-{STAGE}-ValidateAccessToken": Lambda_ValidateAccessToken.lambda_handler})
+    runtime.override(**{'lambda': lambda_stub})
+
+    results = {}
+    with open(args.metrics_log, 'w') as metrics_log, contextlib.redirect_stdout(metrics_log):
+        for name, call, expected in endpoints(args.students, lambda_stub):
+            if args.only and args.only.lower() not in name.lower():
+                continue
+            results[name] = measure(name, call, expected, db, lambda_stub, args.n, args.warmup)
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print(f"{'endpoint':<34} {'req/s':>9} {'p50':>8} {'p95':>8} {'p99':>8} {'ddb/req':>8} {'λ/req':>6}"
+              f" {'errores':>8}  operaciones")
+        for name, r in results.items():
+            ops = ' '.join(f"{op}={count:g}" for op, count in r['operations'].items())
+            print(f"{name:<34} {r['requests_per_second']:>9,.0f} {r['p50_ms']:>6.3f}ms {r['p95_ms']:>6.3f}ms "
+                  f"{r['p99_ms']:>6.3f}ms {r['dynamodb_calls']:>8.2f} {r['lambda_calls']:>6.2f} {r['errors']:>8}  {ops}")
+
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump(results, f, indent=2)
+
+    failures = [f"{name}: {r['errors']} respuestas con estado inesperado"
+                for name, r in results.items() if r['errors']]
+    if args.baseline:
+        with open(args.baseline) as f:
+            failures.extend(regressions(results, json.load(f), args.threshold))
+    if failures:
+        print('\nREGRESIONES:', file=sys.stderr)
+        for failure in failures:
+            print(f"  {failure}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
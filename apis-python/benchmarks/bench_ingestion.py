@@ -0,0 +1,175 @@
+# Benchmark de la ingesta de eventos de actividades (common.ingestion):
+# simula varias clases que terminan actividades a la vez (un evento de
+# experiencia y monedas por alumno y actividad, con un porcentaje de
+# mensajes repetidos como en SQS) y compara aplicar cada evento por
+# separado contra agruparlos por estudiante en una cola local (local_sqs.py)
+# antes de escribir. Reporta escrituras, factor de reducción y eventos/s, y
+# verifica que los totales finales sean los mismos.
+#
+#   python apis-python/benchmarks/bench_ingestion.py [--classes 4] [--class-size 30] [--activities 10]
+#                                                    [--duplicates 0.05] [--window 1000] [--latency-ms 2]
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path[:0] = [os.path.dirname(os.path.abspath(__file__)),
+                os.path.join(ROOT, 'api-common', 'layer', 'python'),
+                os.path.join(ROOT, 'api-student')]
+os.environ.setdefault("STAGE", "dev")
+os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+os.environ.setdefault("METRICS_ENABLED", "false")
+
+from common.ingestion import EventBuffer, RecentEvents, consume, send_events  # noqa: E402
+from common.progression import award_experience, level_curve  # noqa: E402
+from common.rockie import build_rockie_item  # noqa: E402
+from local_dynamodb import InMemoryDynamoDB, create_default_tables  # noqa: E402
+from local_sqs import InMemorySQS  # noqa: E402
+
+STAGE = os.environ["STAGE"]
+TENANT = 'tenant-001'
+WRITES = ('UpdateItem', 'PutItem', 'DeleteItem', 'TransactWriteItems', 'BatchWriteItem')
+
+
+def seed(db, students):
+    from Lambda_CreateStudent import build_student_item
+
+    t_students = db.Table(f"{STAGE}_t_students")
+    t_rockies = db.Table(f"{STAGE}_t_rockies")
+    for student_id in students:
+        t_students.put_item(Item=build_student_item({
+            'tenant_id': TENANT, 'student_id': student_id, 'student_email': f"{student_id}@bench.edu",
+            'password': 'secret', 'student_name': f"Alumno {student_id}"
+        }))
+        t_rockies.put_item(Item=build_rockie_item(TENANT, student_id, 'Rocky'))
+    return t_rockies, t_students
+
+
+def generate(args, rng):
+    # Las clases terminan cada actividad a la vez: los eventos llegan intercalados
+    students = [f"student-{c:02d}-{s:03d}" for c in range(args.classes) for s in range(args.class_size)]
+    events = []
+    for activity in range(args.activities):
+        batch = [{'event_id': f"{student_id}-act{activity:03d}", 'tenant_id': TENANT, 'student_id': student_id,
+                  'experience': rng.randrange(10, 60), 'coins': rng.choice((0, 1, 2, 5))}
+                 for student_id in students]
+        rng.shuffle(batch)
+        events.extend(batch)
+    # Reentregas: copias de eventos ya enviados más adelante en el flujo
+    deliveries = list(events)
+    for _ in range(int(len(events) * args.duplicates)):
+        deliveries.insert(rng.randrange(len(deliveries) + 1), rng.choice(events))
+    return students, events, deliveries
+
+
+def expected_totals(events):
+    totals = {}
+    for event in events:
+        experience, coins = totals.get(event['student_id'], (0, 0))
+        totals[event['student_id']] = (experience + event['experience'], coins + event['coins'])
+    return totals
+
+
+def verify(db, totals):
+    rockies = {item['student_id']: item for item in db.data[f"{STAGE}_t_rockies"].values()}
+    students = {item['student_id']: item for item in db.data[f"{STAGE}_t_students"].values()}
+    for student_id, (experience, coins) in totals.items():
+        rockie = rockies[student_id]
+        assert rockie['experience'] == experience, (student_id, rockie['experience'], experience)
+        assert rockie['level'] == level_curve.level(experience), (student_id, rockie['level'])
+        assert students[student_id]['student_data']['rockie_coins'] == coins, student_id
+
+
+def new_db(args, students):
+    db = create_default_tables(InMemoryDynamoDB(), STAGE)
+    tables = seed(db, students)
+    db.reset_calls()
+    if args.latency_ms:
+        db.meta.client.meta.events.register(
+            'before-parameter-build.dynamodb', lambda **kwargs: time.sleep(args.latency_ms / 1000))
+    return db, tables
+
+
+def run_direct(args, students, events):
+    # Cada evento es su propia actualización (ya sin repetidos)
+    db, (t_rockies, t_students) = new_db(args, students)
+    start = time.perf_counter()
+    for event in events:
+        award_experience(t_rockies, event['tenant_id'], event['student_id'], event['experience'])
+        if event['coins']:
+            t_students.update_item(
+                Key={'tenant_id': event['tenant_id'], 'student_id': event['student_id']},
+                UpdateExpression='ADD student_data.rockie_coins :coins',
+                ExpressionAttributeValues={':coins': event['coins']}
+            )
+    return db, time.perf_counter() - start, None
+
+
+def run_buffered(args, students, deliveries):
+    db, (t_rockies, t_students) = new_db(args, students)
+    sqs = InMemorySQS()
+    queue_url = sqs.create_queue(QueueName=f"{STAGE}-activity-events")['QueueUrl']
+    send_events(sqs, queue_url, deliveries)
+    start = time.perf_counter()
+    report = consume(sqs, queue_url, t_rockies, t_students, db.Table(f"{STAGE}_t_activity_events"),
+                     workers=args.workers,
+                     buffer=EventBuffer(max_events=args.window, window_seconds=args.window_seconds,
+                                        recent=RecentEvents()))
+    assert not sqs.approximate_size(queue_url), 'Quedaron mensajes sin confirmar'
+    return db, time.perf_counter() - start, report
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--classes', type=int, default=4)
+    parser.add_argument('--class-size', type=int, default=30)
+    parser.add_argument('--activities', type=int, default=10)
+    parser.add_argument('--duplicates', type=float, default=0.05, help='Fracción de mensajes reentregados')
+    parser.add_argument('--window', type=int, default=1000, help='Eventos por ventana')
+    parser.add_argument('--window-seconds', type=float, default=5.0)
+    parser.add_argument('--workers', type=int, default=8)
+    parser.add_argument('--latency-ms', type=float, default=2.0, help='Latencia simulada por llamada')
+    parser.add_argument('--seed', type=int, default=7)
+    parser.add_argument('--json', action='store_true')
+    args = parser.parse_args()
+
+    students, events, deliveries = generate(args, random.Random(args.seed))
+    totals = expected_totals(events)
+
+    results = {}
+    for mode, run in (('directo', lambda: run_direct(args, students, events)),
+                      ('agrupado', lambda: run_buffered(args, students, deliveries))):
+        db, elapsed, report = run()
+        verify(db, totals)
+        results[mode] = {
+            'events': len(events),
+            'write_requests': sum(db.calls[op] for op in WRITES),
+            'read_requests': db.calls['GetItem'] + db.calls['BatchGetItem'],
+            'seconds': round(elapsed, 3),
+            'events_per_second': round(len(events) / elapsed, 1),
+            'calls': dict(db.calls),
+            'report': report
+        }
+
+    reduction = results['directo']['write_requests'] / max(1, results['agrupado']['write_requests'])
+    if args.json:
+        print(json.dumps({'results': results, 'write_reduction': round(reduction, 1)}, indent=2))
+        return
+
+    print(f"{len(students)} estudiantes, {len(events):,} eventos, {len(deliveries) - len(events):,} reentregas, "
+          f"latencia {args.latency_ms} ms")
+    print(f"{'modo':<10} {'escrituras':>11} {'lecturas':>9} {'segundos':>9} {'eventos/s':>10}  operaciones")
+    for mode, result in results.items():
+        calls = ' '.join(f"{op}={count}" for op, count in sorted(result['calls'].items()) if count)
+        print(f"{mode:<10} {result['write_requests']:>11,} {result['read_requests']:>9,} {result['seconds']:>9.2f} "
+              f"{result['events_per_second']:>10,.0f}  {calls}")
+    report = results['agrupado']['report']
+    print(f"reducción de escrituras: {reduction:.1f}x ({report['flushes']} ventanas, "
+          f"{report['duplicates']} repetidos descartados)")
+
+
+if __name__ == '__main__':
+    main()
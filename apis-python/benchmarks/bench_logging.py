@@ -0,0 +1,101 @@
+# Benchmark: costo por request del logging de Get_Student.
+#   - anterior: logger.info("DynamoDB response for student: %s", db_response)
+#     con el formato por defecto del runtime de Lambda
+#   - common.logs.payload sin muestreo, con LOG_PAYLOAD_SAMPLE_RATE=0.01 y
+#     con el header de debug (payload JSON redactado en cada request)
+#
+#   python apis-python/benchmarks/bench_logging.py [--n 20000] [--size 50]
+import argparse
+import logging
+import os
+import sys
+import time
+from decimal import Decimal
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'api-common', 'layer', 'python'))
+
+from common import logs  # noqa: E402
+
+
+class Context:
+    aws_request_id = '8f5c7a2e-0000-4000-8000-000000000000'
+
+
+def db_response(size):
+    # Respuesta de get_item tal como la devuelve boto3 (con el hash del password)
+    return {
+        'Item': {
+            'tenant_id': 'tenant-001',
+            'student_id': 'student-0001',
+            'student_email': 'alumno@colegio.edu',
+            'creation_date': '2024-10-01 10:00:00',
+            'student_data': {
+                'student_name': 'Alumno',
+                'password': 'e3b0c44298fc1c149afbf4c8996fb92427ae41e4649b934ca495991b7852b855',
+                'rockie_coins': Decimal(1500),
+                'rockie_gems': Decimal(37),
+                'scores': {f"activity_{i}": Decimal(i) for i in range(size)}
+            }
+        },
+        'ResponseMetadata': {
+            'RequestId': 'ABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789', 'HTTPStatusCode': 200,
+            'HTTPHeaders': {'server': 'Server', 'content-type': 'application/x-amz-json-1.0',
+                            'content-length': '1234', 'connection': 'keep-alive'},
+            'RetryAttempts': 0
+        }
+    }
+
+
+def bench(label, fn, n):
+    fn(0)
+    start = time.perf_counter()
+    for i in range(n):
+        fn(i)
+    elapsed = time.perf_counter() - start
+    print(f"  {label:<44} {elapsed * 1e6 / n:>9.2f} us/request")
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--n', type=int, default=20000)
+    parser.add_argument('--size', type=int, default=50, help='Campos extra en student_data')
+    args = parser.parse_args()
+
+    response = db_response(args.size)
+    logger = logging.getLogger()
+    with open(os.devnull, 'w') as devnull:
+        handler = logging.StreamHandler(devnull)
+        logger.addHandler(handler)
+        logger.setLevel(logging.INFO)
+
+        # Formato por defecto del runtime de Lambda (python3.12, texto)
+        handler.setFormatter(logging.Formatter(
+            '[%(levelname)s]\t%(asctime)s.%(msecs)03dZ\t%(aws_request_id)s\t%(message)s\n',
+            '%Y-%m-%dT%H:%M:%S'))
+        handler.addFilter(lambda record: setattr(record, 'aws_request_id', Context.aws_request_id) or True)
+        baseline = bench('anterior: logger.info(%s, db_response)',
+                         lambda i: logger.info("DynamoDB response for student: %s", response), args.n)
+
+        handler.setFormatter(logs.JsonFormatter())
+        logs._configured = True
+        plain = {'headers': {'Authorization': 'token'}}
+        debug = {'headers': {'Authorization': 'token', logs.LOG_DEBUG_HEADER: '1'}}
+
+        def run(event, rate):
+            logs.LOG_PAYLOAD_SAMPLE_RATE = rate
+
+            def request(i):
+                logs.start_invocation('Get_Student', event, Context)
+                logs.payload(logger, "Respuesta de DynamoDB para el estudiante", response['Item'])
+            return request
+
+        for label, event, rate in (('logs.payload sin muestreo', plain, 0),
+                                   ('logs.payload muestreo 1%', plain, 0.01),
+                                   ('logs.payload con header de debug', debug, 0)):
+            elapsed = bench(label, run(event, rate), args.n)
+            print(f"  {'':<44} {baseline / elapsed:>9.1f}x vs anterior")
+
+
+if __name__ == '__main__':
+    main()
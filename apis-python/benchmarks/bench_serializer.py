@@ -0,0 +1,100 @@
+# Benchmark: convert_decimal + json.dumps (implementación anterior) vs
+# common.serializer con backend json y orjson (si está instalado).
+#
+#   python apis-python/benchmarks/bench_serializer.py [--n 2000] [--size 500]
+import argparse
+import json
+import os
+import sys
+import time
+from decimal import Decimal
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'api-common', 'layer', 'python'))
+
+from common import serializer  # noqa: E402
+
+
+# Implementación que tenían Lambda_Update_Student y Lambda_Update_Rockie
+def convert_decimal(obj):
+    if isinstance(obj, list):
+        return [convert_decimal(i) for i in obj]
+    elif isinstance(obj, dict):
+        return {k: convert_decimal(v) for k, v in obj.items()}
+    elif isinstance(obj, Decimal):
+        return int(obj) if obj % 1 == 0 else float(obj)
+    else:
+        return obj
+
+
+def large_rockie(size):
+    return {
+        'tenant_id': 'tenant-001',
+        'student_id': 'student-0001',
+        'level': Decimal(42),
+        'experience': Decimal('12345'),
+        'creation_date': '2024-10-01 10:00:00',
+        'rockie_data': {
+            'rockie_name': 'Rocky',
+            'evolution': 'Stage 3',
+            'rockie_adorned': {f"slot_{i}": f"acc_{i:04d}" for i in range(8)},
+            'rockie_all_accessories_ids': [f"acc_{i:04d}" for i in range(size)],
+            'history': [
+                {'event': 'xp', 'amount': Decimal(i % 50), 'ratio': Decimal('0.25'), 'at': Decimal(1700000000 + i)}
+                for i in range(size)
+            ]
+        }
+    }
+
+
+def large_student(size):
+    return {
+        'tenant_id': 'tenant-001',
+        'student_id': 'student-0001',
+        'student_email': 'alumno@colegio.edu',
+        'creation_date': '2024-10-01 10:00:00',
+        'student_data': {
+            'student_name': 'Alumno Ñandú',
+            'rockie_coins': Decimal(1500),
+            'rockie_gems': Decimal(37),
+            'scores': {f"activity_{i}": Decimal(i) / 7 for i in range(size)},
+            'badges': [{'id': f"b{i}", 'level': Decimal(i % 5)} for i in range(size)]
+        }
+    }
+
+
+def bench(label, fn, doc, n):
+    fn(doc)
+    start = time.perf_counter()
+    for _ in range(n):
+        fn(doc)
+    elapsed = time.perf_counter() - start
+    print(f"  {label:<34} {elapsed * 1e6 / n:>10.1f} us/doc  {n / elapsed:>10,.0f} docs/s")
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--n', type=int, default=2000)
+    parser.add_argument('--size', type=int, default=500)
+    args = parser.parse_args()
+
+    candidates = [
+        ('convert_decimal + json.dumps', lambda d: json.dumps(convert_decimal(d)).encode()),
+        ('serializer (json)', lambda d: serializer._encoder.encode(d).encode()),
+    ]
+    if serializer.orjson:
+        candidates.append(('serializer (orjson)',
+                           lambda d: serializer.orjson.dumps(d, default=serializer._default)))
+
+    for name, doc in (('rockie_data', large_rockie(args.size)), ('student_data', large_student(args.size))):
+        print(f"{name} ({len(serializer.dumps(doc)):,} bytes)")
+        baseline = None
+        for label, fn in candidates:
+            elapsed = bench(label, fn, doc, args.n)
+            baseline = baseline or elapsed
+            if elapsed != baseline:
+                print(f"  {'':<34} {baseline / elapsed:>10.2f}x vs anterior")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,165 @@
+# Benchmark de arranque: tiempo de import (fase Init), primera invocación y
+# latencia en caliente de cada handler, con clientes compartidos (common.runtime)
+# y recreándolos en cada invocación (como hacían antes los handlers).
+#
+#   python apis-python/benchmarks/bench_startup.py [--n 200] [--handler Lambda_Get_Student]
+#
+# Cada handler corre en un proceso nuevo (arranque en frío real). Las
+# llamadas a DynamoDB se responden desde un hook `before-call` de botocore,
+# así que se mide solo el costo de Python/boto3, sin red.
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+LAYER = os.path.join(ROOT, 'api-common', 'layer', 'python')
+
+HANDLERS = [
+    ('api-security', 'Lambda_ValidateAccessToken'),
+    ('api-security', 'Lambda_LoginStudent'),
+    ('api-student', 'Lambda_Get_Student'),
+    ('api-student', 'Lambda_Update_Student'),
+    ('api-student', 'Lambda_List_Students'),
+    ('api-student', 'Lambda_Get_Profile'),
+    ('api-rockie', 'Lambda_Get_Rockie'),
+    ('api-rockie', 'Lambda_Update_Rockie'),
+]
+
+TOKEN = 'bench-token'
+METHOD_ARN = 'arn:aws:execute-api:us-east-1:123456789012:api123/dev/GET/student'
+
+
+def build_event(module):
+    headers = {'Authorization': TOKEN}
+    if module == 'Lambda_ValidateAccessToken':
+        return {'type': 'TOKEN', 'authorizationToken': TOKEN, 'methodArn': METHOD_ARN}
+    if module == 'Lambda_LoginStudent':
+        return {'body': {'tenant_id': 'tenant', 'student_email': 'a@b.c', 'password': 'x'}}
+    if module == 'Lambda_Update_Student':
+        return {'headers': headers, 'body': {'student_data': {'student_name': 'Bench'}}}
+    if module == 'Lambda_Update_Rockie':
+        return {'headers': headers, 'body': {'rockie_data': {'rockie_name': 'Bench'}}}
+    if module == 'Lambda_List_Students':
+        return {'headers': headers, 'query': {}}
+    return {'headers': headers}
+
+
+def fake_dynamodb(params, model, **kwargs):
+    # Respuestas mínimas en formato de wire (tipado) para cada operación;
+    # `params` es el request ya serializado
+    operation = model.name
+    params = json.loads(params['body'])
+    if operation == 'GetItem':
+        if params['TableName'].endswith('_t_access_tokens'):
+            item = {'token': {'S': TOKEN}, 'tenant_id': {'S': 'tenant'}, 'student_id': {'S': 'student'},
+                    'expires_at': {'N': str(int(time.time()) + 86400)}}
+        else:
+            item = dict(params['Key'])
+        parsed = {'Item': item}
+    elif operation == 'UpdateItem':
+        parsed = {'Attributes': dict(params['Key'])}
+    elif operation == 'Query':
+        parsed = {'Items': [], 'Count': 0}
+    elif operation == 'BatchGetItem':
+        parsed = {'Responses': {table: [dict(k) for k in request['Keys']]
+                                for table, request in params['RequestItems'].items()},
+                  'UnprocessedKeys': {}}
+    else:
+        parsed = {}
+    return FakeHttpResponse(), parsed
+
+
+class FakeHttpResponse:
+    status_code = 200
+    headers = {}
+    content = b''
+
+
+def child(service, module, n, mode):
+    # Proceso hijo: se ejecuta en un intérprete nuevo
+    start = time.perf_counter()
+    import boto3
+    boto3.setup_default_session()
+    boto3.DEFAULT_SESSION.events.register('before-call.dynamodb', fake_dynamodb)
+    sys.path[:0] = [LAYER, os.path.join(ROOT, service)]
+    handler = __import__(module)
+    init = time.perf_counter() - start
+
+    from common import runtime
+    fn = getattr(handler, 'lambda_handler')
+    event = build_event(module)
+
+    start = time.perf_counter()
+    first_response = fn(event, None)
+    first = time.perf_counter() - start
+
+    samples = []
+    for _ in range(n):
+        if mode == 'per-call':
+            # Lo que hacían los handlers: boto3.resource('dynamodb') en cada invocación
+            runtime.reset()
+        start = time.perf_counter()
+        fn(event, None)
+        samples.append(time.perf_counter() - start)
+    samples.sort()
+
+    # Respuesta dict, bytes (json_response) o policy del authorizer
+    if isinstance(first_response, bytes):
+        first_response = json.loads(first_response)
+    if 'policyDocument' in first_response:
+        status = first_response['policyDocument']['Statement'][0]['Effect']
+    else:
+        status = first_response.get('statusCode')
+    print(json.dumps({
+        'init_ms': init * 1000,
+        'first_ms': first * 1000,
+        'p50_ms': samples[len(samples) // 2] * 1000,
+        'p95_ms': samples[int(len(samples) * 0.95) - 1] * 1000,
+        'status': status
+    }))
+
+
+def run_child(service, module, n, mode):
+    env = dict(os.environ)
+    env.update({
+        'AWS_ACCESS_KEY_ID': 'bench', 'AWS_SECRET_ACCESS_KEY': 'bench',
+        'AWS_DEFAULT_REGION': 'us-east-1', 'STAGE': 'dev',
+        # Sin cache de tokens: cada invocación hace su GetItem
+        'TOKEN_CACHE_SIZE': '0'
+    })
+    output = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), '--child', service, module, '--n', str(n), '--mode', mode],
+        env=env, check=True, capture_output=True, text=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--n', type=int, default=200)
+    parser.add_argument('--handler', help='Solo este handler (p.ej. Lambda_Get_Student)')
+    parser.add_argument('--mode', choices=('shared', 'per-call'), default='shared')
+    parser.add_argument('--child', nargs=2, metavar=('SERVICE', 'MODULE'))
+    args = parser.parse_args()
+
+    if args.child:
+        child(args.child[0], args.child[1], args.n, args.mode)
+        return
+
+    print(f"{'handler':<28} {'init':>8} {'1a llamada':>11} {'p50 antes':>10} {'p50 ahora':>10} "
+          f"{'p95 antes':>10} {'p95 ahora':>10}  status")
+    for service, module in HANDLERS:
+        if args.handler and module != args.handler:
+            continue
+        before = run_child(service, module, args.n, 'per-call')
+        after = run_child(service, module, args.n, 'shared')
+        print(f"{module:<28} {after['init_ms']:>6.0f}ms {after['first_ms']:>9.1f}ms "
+              f"{before['p50_ms']:>8.2f}ms {after['p50_ms']:>8.2f}ms "
+              f"{before['p95_ms']:>8.2f}ms {after['p95_ms']:>8.2f}ms  {after['status']}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,76 @@
+# Benchmark del barrido de t_access_tokens (Lambda_SweepAccessTokens):
+# siembra una tabla en memoria con tokens en formato anterior (`expires` en
+# texto) y con EXPIRES_AT, vencidos y vigentes, y mide el barrido con 1 y
+# con N segmentos en paralelo. Con --latency-ms se simula el tiempo de red
+# de cada llamada a DynamoDB.
+#
+#   python apis-python/benchmarks/bench_token_sweeper.py [--rows 20000] [--segments 8] [--latency-ms 5]
+import argparse
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path[:0] = [os.path.dirname(os.path.abspath(__file__)),
+                os.path.join(ROOT, 'api-common', 'layer', 'python'),
+                os.path.join(ROOT, 'api-security')]
+os.environ.setdefault("STAGE", "dev")
+os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+os.environ.setdefault("METRICS_ENABLED", "false")
+
+from common import runtime  # noqa: E402
+from common.auth import EXPIRES_AT, LEGACY_EXPIRES_FORMAT  # noqa: E402
+from local_dynamodb import InMemoryDynamoDB, create_default_tables  # noqa: E402
+
+STAGE = os.environ["STAGE"]
+
+
+def seed(db, rows):
+    # Un cuarto de cada tipo: anterior vencido, anterior vigente, epoch vencido, epoch vigente
+    table = db.Table(f"{STAGE}_t_access_tokens")
+    now = datetime.now()
+    for i in range(rows):
+        item = {'token': f"token-{i:07d}", 'tenant_id': 'tenant-001', 'student_id': f"student-{i % 500:05d}"}
+        kind = i % 4
+        if kind == 0:
+            item['expires'] = (now - timedelta(days=1)).strftime(LEGACY_EXPIRES_FORMAT)
+        elif kind == 1:
+            item['expires'] = (now + timedelta(hours=1)).strftime(LEGACY_EXPIRES_FORMAT)
+        elif kind == 2:
+            item[EXPIRES_AT] = int(time.time()) - 86400
+        else:
+            item[EXPIRES_AT] = int(time.time()) + 3600
+        table.put_item(Item=item)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=20000)
+    parser.add_argument('--segments', type=int, default=8)
+    parser.add_argument('--page-size', type=int, default=500)
+    parser.add_argument('--latency-ms', type=float, default=5.0, help='Latencia simulada por llamada')
+    args = parser.parse_args()
+
+    import Lambda_SweepAccessTokens
+
+    print(f"{'segmentos':<10} {'revisados':>10} {'borrados':>9} {'migrados':>9} {'filas/s':>10} "
+          f"{'segundos':>9} {'llamadas':>9}")
+    for segments in sorted({1, args.segments}):
+        db = create_default_tables(InMemoryDynamoDB(), STAGE)
+        seed(db, args.rows)
+        if args.latency_ms:
+            db.meta.client.meta.events.register(
+                'before-parameter-build.dynamodb', lambda **kwargs: time.sleep(args.latency_ms / 1000))
+        runtime.override(dynamodb=db)
+
+        report = Lambda_SweepAccessTokens.TokenSweeper(db, segments=segments, page_size=args.page_size).run()
+        remaining = db.data[f"{STAGE}_t_access_tokens"].values()
+        assert report['deleted'] == args.rows // 2, report
+        assert all(EXPIRES_AT in item and 'expires' not in item for item in remaining)
+        print(f"{segments:<10} {report['scanned']:>10,} {report['deleted']:>9,} {report['converted']:>9,} "
+              f"{report['rows_per_second']:>10,.0f} {report['elapsed_seconds']:>9.2f} {db.total_calls():>9,}")
+
+
+if __name__ == '__main__':
+    main()
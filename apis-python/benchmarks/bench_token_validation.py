@@ -0,0 +1,79 @@
+# Microbenchmark: validaciones por segundo de tokens almacenados vs firmados.
+#
+#   python apis-python/benchmarks/bench_token_validation.py [--n 50000] [--latency-ms 0]
+#
+# El modo "stored" usa una tabla en memoria en lugar de DynamoDB; con
+# --latency-ms se simula el tiempo de red de cada GetItem.
+import argparse
+import os
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'api-common', 'layer', 'python'))
+os.environ.setdefault("TOKEN_SIGNING_KEYS", "k1:bench-secret-1,k2:bench-secret-2")
+os.environ.setdefault("TOKEN_SIGNING_KID", "k2")
+
+from common import auth, runtime, signed_token  # noqa: E402
+from common.token_cache import token_cache  # noqa: E402
+
+
+class InMemoryTokensTable:
+    def __init__(self, latency):
+        self.items = {}
+        self.latency = latency
+
+    def get_item(self, Key):
+        if self.latency:
+            time.sleep(self.latency)
+        item = self.items.get(Key['token'])
+        return {'Item': item} if item else {}
+
+
+def run(label, fn, tokens, n):
+    start = time.perf_counter()
+    for i in range(n):
+        fn(tokens[i % len(tokens)])
+    elapsed = time.perf_counter() - start
+    print(f"{label:<36} {n / elapsed:>12,.0f} validaciones/s  ({elapsed * 1e6 / n:.2f} us/op)")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--n', type=int, default=50000)
+    parser.add_argument('--tokens', type=int, default=100)
+    parser.add_argument('--latency-ms', type=float, default=0)
+    args = parser.parse_args()
+
+    table = InMemoryTokensTable(args.latency_ms / 1000)
+    runtime._tables[f"{auth.stage}_t_access_tokens"] = table
+    expires_at = int(time.time()) + 3600
+    expires = (datetime.now() + timedelta(hours=1)).strftime(auth.LEGACY_EXPIRES_FORMAT)
+    stored, legacy = [], []
+    for i in range(args.tokens):
+        token = str(uuid.uuid4())
+        table.items[token] = {'token': token, 'tenant_id': 'tenant', 'student_id': f"s{i}",
+                              auth.EXPIRES_AT: expires_at}
+        stored.append(token)
+        # Tokens emitidos antes de EXPIRES_AT (`expires` en texto)
+        token = str(uuid.uuid4())
+        table.items[token] = {'token': token, 'tenant_id': 'tenant', 'student_id': f"s{i}", 'expires': expires}
+        legacy.append(token)
+    signed = [signed_token.issue_token('tenant', f"s{i}")[0] for i in range(args.tokens)]
+
+    def stored_uncached(token):
+        token_cache.invalidate(token)
+        return auth.validate_token(token)
+
+    run("stored (sin cache)", stored_uncached, stored, args.n)
+    run("stored formato anterior (sin cache)", stored_uncached, legacy, args.n)
+    token_cache.clear()
+    run("stored (cache caliente)", auth.validate_token, stored, args.n)
+    run("signed", auth.validate_token, signed, args.n)
+    signed_token.denylist.add('nonce-inexistente')
+    run("signed (denylist no vacia)", auth.validate_token, signed, args.n)
+
+
+if __name__ == '__main__':
+    main()
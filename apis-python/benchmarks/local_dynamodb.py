@@ -0,0 +1,986 @@
+# DynamoDB en memoria para correr los handlers sin AWS (benchmarks locales).
+#
+# Implementa lo que usan los handlers: get/put/update/delete/query/scan sobre
+# Table, batch_writer, y en el cliente (Table.meta.client) batch_get_item,
+# batch_write_item, transact_write_items y transact_get_items. Soporta
+# ConditionExpression, UpdateExpression (SET/REMOVE/ADD/DELETE),
+# ProjectionExpression, índices secundarios y ReturnValues. Los valores pasan
+# por TypeSerializer/TypeDeserializer, igual que en boto3 (Decimal, sets...).
+# El cliente emite los eventos de botocore, así que los hooks de
+# common.metrics cuentan llamadas y capacidad igual que en AWS.
+import copy
+import json
+import re
+import threading
+import zlib
+from collections import defaultdict
+from decimal import Decimal
+from types import SimpleNamespace
+
+from boto3.dynamodb.conditions import ConditionBase, ConditionExpressionBuilder
+from boto3.dynamodb.types import Binary, TypeDeserializer, TypeSerializer
+from botocore.exceptions import ClientError
+from botocore.hooks import HierarchicalEmitter
+
+_serializer = TypeSerializer()
+_deserializer = TypeDeserializer()
+
+
+def _error(code, message, operation, extra=None):
+    response = {'Error': {'Code': code, 'Message': message}}
+    if extra:
+        response.update(extra)
+    return ClientError(response, operation)
+
+
+def _normalize(value):
+    # Misma conversión que hace boto3 al enviar y recibir un valor
+    return _deserializer.deserialize(_serializer.serialize(value))
+
+
+def _item_size(item):
+    return len(json.dumps(_serializer.serialize(item)['M'], default=str))
+
+
+# --------------------------------------------------------------------------
+# Expresiones
+
+_TOKEN_RE = re.compile(r"\s*(?:(<>|<=|>=|=|<|>|\+|-|\(|\)|,|\[\d+\]|\.)|([#:]?[A-Za-z0-9_\-]+))")
+_KEYWORDS = {'AND', 'OR', 'NOT', 'BETWEEN', 'IN', 'SET', 'REMOVE', 'ADD', 'DELETE'}
+
+
+def _tokenize(expression):
+    tokens = []
+    pos = 0
+    expression = expression.strip()
+    while pos < len(expression):
+        match = _TOKEN_RE.match(expression, pos)
+        if not match or match.end() == pos:
+            raise _error('ValidationException', f"Invalid expression near: {expression[pos:]}", 'Expression')
+        tokens.append(match.group(1) or match.group(2))
+        pos = match.end()
+    return tokens
+
+
+class _Parser:
+    def __init__(self, expression, names, values):
+        self.tokens = _tokenize(expression)
+        self.pos = 0
+        self.names = names or {}
+        self.values = values or {}
+
+    def peek(self, offset=0):
+        i = self.pos + offset
+        return self.tokens[i] if i < len(self.tokens) else None
+
+    def next(self):
+        token = self.peek()
+        self.pos += 1
+        return token
+
+    def expect(self, token):
+        got = self.next()
+        if got is None or got.upper() != token.upper():
+            raise _error('ValidationException', f"Expected {token}, got {got}", 'Expression')
+
+    def at_keyword(self, *keywords):
+        token = self.peek()
+        return token is not None and token.upper() in keywords
+
+    # -- operandos
+    def path(self):
+        segments = []
+        token = self.next()
+        segments.append(self._name(token))
+        while self.peek() is not None and (self.peek() == '.' or self.peek().startswith('[')):
+            token = self.next()
+            if token == '.':
+                segments.append(self._name(self.next()))
+            else:
+                segments.append(int(token[1:-1]))
+        return ('path', segments)
+
+    def _name(self, token):
+        if token.startswith('#'):
+            if token not in self.names:
+                raise _error('ValidationException', f"Undefined attribute name {token}", 'Expression')
+            return self.names[token]
+        return token
+
+    def operand(self):
+        token = self.peek()
+        if token.startswith(':'):
+            self.next()
+            if token not in self.values:
+                raise _error('ValidationException', f"Undefined attribute value {token}", 'Expression')
+            return ('value', _normalize(self.values[token]))
+        if self.peek(1) == '(' and token in ('size', 'if_not_exists', 'list_append'):
+            self.next()
+            self.expect('(')
+            if token == 'size':
+                node = ('size', self.path())
+            else:
+                first = self.operand()
+                self.expect(',')
+                node = (token, first, self.operand())
+            self.expect(')')
+            return node
+        return self.path()
+
+    # -- condiciones
+    def condition(self):
+        node = self.conjunction()
+        while self.at_keyword('OR'):
+            self.next()
+            node = ('or', node, self.conjunction())
+        return node
+
+    def conjunction(self):
+        node = self.negation()
+        while self.at_keyword('AND'):
+            self.next()
+            node = ('and', node, self.negation())
+        return node
+
+    def negation(self):
+        if self.at_keyword('NOT'):
+            self.next()
+            return ('not', self.negation())
+        return self.primary()
+
+    def primary(self):
+        token = self.peek()
+        if token == '(':
+            self.next()
+            node = self.condition()
+            self.expect(')')
+            return node
+        if self.peek(1) == '(' and token in ('attribute_exists', 'attribute_not_exists', 'attribute_type',
+                                             'begins_with', 'contains'):
+            self.next()
+            self.expect('(')
+            args = [self.operand()]
+            while self.peek() == ',':
+                self.next()
+                args.append(self.operand())
+            self.expect(')')
+            return ('func', token, args)
+        left = self.operand()
+        if self.at_keyword('BETWEEN'):
+            self.next()
+            low = self.operand()
+            self.expect('AND')
+            return ('between', left, low, self.operand())
+        if self.at_keyword('IN'):
+            self.next()
+            self.expect('(')
+            options = [self.operand()]
+            while self.peek() == ',':
+                self.next()
+                options.append(self.operand())
+            self.expect(')')
+            return ('in', left, options)
+        op = self.next()
+        if op not in ('=', '<>', '<', '<=', '>', '>='):
+            raise _error('ValidationException', f"Invalid operator {op}", 'Expression')
+        return ('cmp', op, left, self.operand())
+
+    # -- update
+    def update(self):
+        actions = []
+        while self.peek() is not None:
+            clause = self.next().upper()
+            if clause not in ('SET', 'REMOVE', 'ADD', 'DELETE'):
+                raise _error('ValidationException', f"Invalid update clause {clause}", 'UpdateItem')
+            while True:
+                if clause == 'SET':
+                    target = self.path()
+                    self.expect('=')
+                    value = self.operand()
+                    if self.peek() in ('+', '-'):
+                        op = self.next()
+                        value = (op, value, self.operand())
+                    actions.append(('SET', target, value))
+                elif clause == 'REMOVE':
+                    actions.append(('REMOVE', self.path(), None))
+                else:
+                    target = self.path()
+                    actions.append((clause, target, self.operand()))
+                if self.peek() == ',':
+                    self.next()
+                    continue
+                break
+        return actions
+
+    def projection(self):
+        paths = [self.path()]
+        while self.peek() == ',':
+            self.next()
+            paths.append(self.path())
+        return paths
+
+
+_MISSING = object()
+
+
+def _resolve(item, segments):
+    current = item
+    for segment in segments:
+        if isinstance(segment, int):
+            if not isinstance(current, list) or segment >= len(current):
+                return _MISSING
+            current = current[segment]
+        else:
+            if not isinstance(current, dict) or segment not in current:
+                return _MISSING
+            current = current[segment]
+    return current
+
+
+def _evaluate(node, item):
+    kind = node[0]
+    if kind == 'value':
+        return node[1]
+    if kind == 'path':
+        return _resolve(item, node[1])
+    if kind == 'size':
+        value = _evaluate(node[1], item)
+        if value is _MISSING:
+            return _MISSING
+        if isinstance(value, (str, bytes, Binary, list, dict, set)):
+            return Decimal(len(value.value if isinstance(value, Binary) else value))
+        return _MISSING
+    if kind == 'if_not_exists':
+        value = _evaluate(node[1], item)
+        return _evaluate(node[2], item) if value is _MISSING else value
+    if kind == 'list_append':
+        left, right = _evaluate(node[1], item), _evaluate(node[2], item)
+        if not isinstance(left, list) or not isinstance(right, list):
+            raise _error('ValidationException', 'list_append requires lists', 'UpdateItem')
+        return left + right
+    if kind in ('+', '-'):
+        left, right = _evaluate(node[1], item), _evaluate(node[2], item)
+        if not isinstance(left, Decimal) or not isinstance(right, Decimal):
+            raise _error('ValidationException', 'An operand in the update expression has an incorrect data type',
+                         'UpdateItem')
+        return left + right if kind == '+' else left - right
+    raise _error('ValidationException', f"Invalid operand {kind}", 'Expression')
+
+
+def _compare(op, left, right):
+    if left is _MISSING or right is _MISSING:
+        return False
+    if op == '=':
+        return left == right
+    if op == '<>':
+        return left != right
+    if type(left) is not type(right):
+        return False
+    try:
+        return {'<': left < right, '<=': left <= right, '>': left > right, '>=': left >= right}[op]
+    except TypeError:
+        return False
+
+
+_TYPE_CODES = {'S': str, 'N': Decimal, 'B': Binary, 'BOOL': bool, 'M': dict, 'L': list}
+
+
+def _check(node, item):
+    kind = node[0]
+    if kind == 'and':
+        return _check(node[1], item) and _check(node[2], item)
+    if kind == 'or':
+        return _check(node[1], item) or _check(node[2], item)
+    if kind == 'not':
+        return not _check(node[1], item)
+    if kind == 'cmp':
+        return _compare(node[1], _evaluate(node[2], item), _evaluate(node[3], item))
+    if kind == 'between':
+        value = _evaluate(node[1], item)
+        return _compare('>=', value, _evaluate(node[2], item)) and _compare('<=', value, _evaluate(node[3], item))
+    if kind == 'in':
+        value = _evaluate(node[1], item)
+        return value is not _MISSING and any(value == _evaluate(o, item) for o in node[2])
+    if kind == 'func':
+        name, args = node[1], node[2]
+        value = _evaluate(args[0], item)
+        if name == 'attribute_exists':
+            return value is not _MISSING
+        if name == 'attribute_not_exists':
+            return value is _MISSING
+        if value is _MISSING:
+            return False
+        operand = _evaluate(args[1], item)
+        if name == 'begins_with':
+            return isinstance(value, str) and isinstance(operand, str) and value.startswith(operand)
+        if name == 'contains':
+            if isinstance(value, str):
+                return isinstance(operand, str) and operand in value
+            if isinstance(value, (set, list)):
+                return operand in value
+            return False
+        if name == 'attribute_type':
+            if operand in ('SS', 'NS', 'BS'):
+                return isinstance(value, set)
+            if operand == 'NULL':
+                return value is None
+            return isinstance(value, _TYPE_CODES.get(operand, type(None))) and not (
+                operand == 'N' and isinstance(value, bool))
+    raise _error('ValidationException', f"Invalid condition {kind}", 'Expression')
+
+
+def _set_path(item, segments, value, operation):
+    parent = item
+    for segment in segments[:-1]:
+        child = parent[segment] if isinstance(segment, int) and isinstance(parent, list) and segment < len(parent) \
+            else (parent.get(segment, _MISSING) if isinstance(parent, dict) else _MISSING)
+        if child is _MISSING or not isinstance(child, (dict, list)):
+            raise _error('ValidationException',
+                         'The document path provided in the update expression is invalid for update', operation)
+        parent = child
+    last = segments[-1]
+    if isinstance(last, int):
+        if not isinstance(parent, list):
+            raise _error('ValidationException',
+                         'The document path provided in the update expression is invalid for update', operation)
+        if last >= len(parent):
+            parent.append(value)
+        else:
+            parent[last] = value
+    else:
+        if not isinstance(parent, dict):
+            raise _error('ValidationException',
+                         'The document path provided in the update expression is invalid for update', operation)
+        parent[last] = value
+
+
+def _remove_path(item, segments):
+    parent = _resolve(item, segments[:-1]) if len(segments) > 1 else item
+    last = segments[-1]
+    if isinstance(last, int):
+        if isinstance(parent, list) and last < len(parent):
+            del parent[last]
+    elif isinstance(parent, dict):
+        parent.pop(last, None)
+
+
+def _apply_update(item, actions, operation='UpdateItem'):
+    for action, target, operand in actions:
+        segments = target[1]
+        if action == 'SET':
+            _set_path(item, segments, copy.deepcopy(_evaluate(operand, item)), operation)
+        elif action == 'REMOVE':
+            _remove_path(item, segments)
+        elif action == 'ADD':
+            delta = _evaluate(operand, item)
+            current = _resolve(item, segments)
+            if isinstance(delta, Decimal):
+                if current is _MISSING:
+                    current = Decimal(0)
+                if not isinstance(current, Decimal):
+                    raise _error('ValidationException', 'An operand in the update expression has an incorrect '
+                                                        'data type', operation)
+                _set_path(item, segments, current + delta, operation)
+            elif isinstance(delta, set):
+                if current is _MISSING:
+                    current = set()
+                if not isinstance(current, set):
+                    raise _error('ValidationException', 'An operand in the update expression has an incorrect '
+                                                        'data type', operation)
+                _set_path(item, segments, current | delta, operation)
+            else:
+                raise _error('ValidationException', 'ADD only supports numbers and sets', operation)
+        elif action == 'DELETE':
+            delta = _evaluate(operand, item)
+            current = _resolve(item, segments)
+            if not isinstance(delta, set):
+                raise _error('ValidationException', 'DELETE only supports sets', operation)
+            if current is _MISSING:
+                continue
+            if not isinstance(current, set):
+                raise _error('ValidationException', 'An operand in the update expression has an incorrect '
+                                                    'data type', operation)
+            remaining = current - delta
+            if remaining:
+                _set_path(item, segments, remaining, operation)
+            else:
+                _remove_path(item, segments)
+
+
+def _project(item, paths):
+    result = {}
+    for _, segments in paths:
+        value = _resolve(item, segments)
+        if value is _MISSING:
+            continue
+        target = result
+        source = item
+        for segment in segments[:-1]:
+            source = source[segment]
+            if isinstance(segment, int):
+                # Proyección de índices de lista: se aplana al elemento
+                target = target.setdefault('__list__', {})
+            else:
+                target = target.setdefault(segment, {} if isinstance(source, dict) else [])
+        if isinstance(target, dict):
+            target[segments[-1]] = copy.deepcopy(value)
+    return result
+
+
+def _key_equalities(node, found=None):
+    # {atributo: valor} de las igualdades `clave = :v` de una
+    # KeyConditionExpression (partición y, si la hay, clave de orden)
+    found = {} if found is None else found
+    if node[0] == 'and':
+        _key_equalities(node[1], found)
+        _key_equalities(node[2], found)
+    elif node[0] == 'cmp' and node[1] == '=' and node[2][0] == 'path' and node[3][0] == 'value':
+        found[node[2][1][0]] = node[3][1]
+    return found
+
+
+def _condition_args(kwargs, key):
+    # Acepta tanto expresiones en texto como objetos de boto3.dynamodb.conditions
+    expression = kwargs.get(key)
+    names = dict(kwargs.get('ExpressionAttributeNames') or {})
+    values = dict(kwargs.get('ExpressionAttributeValues') or {})
+    if isinstance(expression, ConditionBase):
+        built = ConditionExpressionBuilder().build_expression(expression, is_key_condition=(
+            key == 'KeyConditionExpression'))
+        names.update(built.attribute_name_placeholders)
+        values.update(built.attribute_value_placeholders)
+        expression = built.condition_expression
+    return expression, names, values
+
+
+# --------------------------------------------------------------------------
+# Tablas
+
+def _order_key(schema, hash_key, range_key):
+    # Orden de los items en una tabla o índice (y de las páginas de scan/query)
+    return lambda i: (str(i[hash_key]),
+                      i[range_key] if range_key else '',
+                      str(i[schema.hash_key]), str(i.get(schema.range_key, '') if schema.range_key else ''))
+
+
+class TableSchema:
+    def __init__(self, name, hash_key, range_key=None, indexes=None):
+        self.name = name
+        self.hash_key = hash_key
+        self.range_key = range_key
+        # indexes: {'nombre': (hash_key, range_key | None)}
+        self.indexes = indexes or {}
+
+    def key_of(self, item):
+        key = {self.hash_key: item[self.hash_key]}
+        if self.range_key:
+            key[self.range_key] = item[self.range_key]
+        return key
+
+    def key_tuple(self, key):
+        if self.hash_key not in key or (self.range_key and self.range_key not in key):
+            raise _error('ValidationException', 'The provided key element does not match the schema', 'GetItem')
+        return (key[self.hash_key], key[self.range_key] if self.range_key else None)
+
+
+class InMemoryDynamoDB:
+    def __init__(self):
+        self.schemas = {}
+        self.data = {}
+        self.lock = threading.RLock()
+        self.calls = defaultdict(int)
+        # Si se asigna una función (tabla, request) -> bool, esos requests de
+        # batch se devuelven como Unprocessed (para probar reintentos)
+        self.unprocessed_hook = None
+        self.meta = _Meta(self)
+
+    # -- configuración
+    def create_table(self, name, hash_key, range_key=None, indexes=None):
+        self.schemas[name] = TableSchema(name, hash_key, range_key, indexes)
+        self.data[name] = {}
+        return self.Table(name)
+
+    def Table(self, name):
+        return Table(self, name)
+
+    def reset_calls(self):
+        self.calls.clear()
+
+    def total_calls(self):
+        return sum(self.calls.values())
+
+    def _schema(self, name, operation):
+        if name not in self.schemas:
+            raise _error('ResourceNotFoundException', f"Requested resource not found: {name}", operation)
+        return self.schemas[name]
+
+    def _consumed(self, kwargs, table, units, write=False):
+        if kwargs.get('ReturnConsumedCapacity') in ('TOTAL', 'INDEXES'):
+            capacity = {'TableName': table, 'CapacityUnits': float(units)}
+            capacity['WriteCapacityUnits' if write else 'ReadCapacityUnits'] = float(units)
+            return {'ConsumedCapacity': capacity}
+        return {}
+
+    @staticmethod
+    def _read_units(size, consistent=False):
+        units = max(1, -(-size // 4096))
+        return units if consistent else units / 2
+
+    @staticmethod
+    def _write_units(size):
+        return max(1, -(-size // 1024))
+
+    # -- operaciones de item
+    def get_item(self, TableName, Key, **kwargs):
+        self.calls['GetItem'] += 1
+        schema = self._schema(TableName, 'GetItem')
+        with self.lock:
+            item = self.data[TableName].get(schema.key_tuple(Key))
+            item = copy.deepcopy(item) if item is not None else None
+        response = {}
+        if item is not None:
+            if kwargs.get('ProjectionExpression'):
+                paths = _Parser(kwargs['ProjectionExpression'], kwargs.get('ExpressionAttributeNames'), {}).projection()
+                item = _project(item, paths)
+            response['Item'] = item
+        size = _item_size(item) if item else 0
+        response.update(self._consumed(kwargs, TableName, self._read_units(size, kwargs.get('ConsistentRead'))))
+        return response
+
+    def _check_condition(self, kwargs, current, operation):
+        expression, names, values = _condition_args(kwargs, 'ConditionExpression')
+        if not expression:
+            return
+        node = _Parser(expression, names, values).condition()
+        if not _check(node, current or {}):
+            extra = {}
+            if kwargs.get('ReturnValuesOnConditionCheckFailure') == 'ALL_OLD' and current:
+                extra['Item'] = copy.deepcopy(current)
+            raise _error('ConditionalCheckFailedException', 'The conditional request failed', operation, extra)
+
+    def put_item(self, TableName, Item, **kwargs):
+        self.calls['PutItem'] += 1
+        schema = self._schema(TableName, 'PutItem')
+        item = _normalize(Item)
+        key = schema.key_tuple(item)
+        with self.lock:
+            current = self.data[TableName].get(key)
+            self._check_condition(kwargs, current, 'PutItem')
+            self.data[TableName][key] = item
+        response = {}
+        if kwargs.get('ReturnValues') == 'ALL_OLD' and current:
+            response['Attributes'] = copy.deepcopy(current)
+        response.update(self._consumed(kwargs, TableName, self._write_units(_item_size(item)), write=True))
+        return response
+
+    def delete_item(self, TableName, Key, **kwargs):
+        self.calls['DeleteItem'] += 1
+        schema = self._schema(TableName, 'DeleteItem')
+        key = schema.key_tuple(_normalize(Key))
+        with self.lock:
+            current = self.data[TableName].get(key)
+            self._check_condition(kwargs, current, 'DeleteItem')
+            self.data[TableName].pop(key, None)
+        response = {}
+        if kwargs.get('ReturnValues') == 'ALL_OLD' and current:
+            response['Attributes'] = copy.deepcopy(current)
+        size = _item_size(current) if current else 0
+        response.update(self._consumed(kwargs, TableName, self._write_units(size), write=True))
+        return response
+
+    def update_item(self, TableName, Key, **kwargs):
+        self.calls['UpdateItem'] += 1
+        schema = self._schema(TableName, 'UpdateItem')
+        key_values = _normalize(Key)
+        key = schema.key_tuple(key_values)
+        with self.lock:
+            current = self.data[TableName].get(key)
+            self._check_condition(kwargs, current, 'UpdateItem')
+            new = copy.deepcopy(current) if current is not None else dict(key_values)
+            expression, names, values = _condition_args(kwargs, 'UpdateExpression')
+            if expression:
+                actions = _Parser(expression, names, values).update()
+                for _, target, _ in actions:
+                    if target[1][0] in key_values:
+                        raise _error('ValidationException', 'Cannot update attribute ' + target[1][0] +
+                                     '. This attribute is part of the key', 'UpdateItem')
+                _apply_update(new, actions)
+            self.data[TableName][key] = new
+        response = {}
+        return_values = kwargs.get('ReturnValues', 'NONE')
+        if return_values == 'ALL_NEW':
+            response['Attributes'] = copy.deepcopy(new)
+        elif return_values == 'ALL_OLD' and current:
+            response['Attributes'] = copy.deepcopy(current)
+        elif return_values in ('UPDATED_NEW', 'UPDATED_OLD'):
+            source = new if return_values == 'UPDATED_NEW' else (current or {})
+            touched = {target[1][0] for _, target, _ in actions} if expression else set()
+            response['Attributes'] = {k: copy.deepcopy(v) for k, v in source.items() if k in touched}
+        response.update(self._consumed(kwargs, TableName, self._write_units(_item_size(new)), write=True))
+        return response
+
+    # -- lecturas múltiples
+    def _sorted_items(self, schema, index_name, equalities=None, predicate=None):
+        items = self.data[schema.name].values()
+        if equalities:
+            # Solo los items de la clave pedida (como en DynamoDB): no se
+            # evalúa ni ordena toda la tabla
+            keys = schema.indexes.get(index_name) or (schema.hash_key, schema.range_key)
+            for key in keys:
+                if key in equalities:
+                    value = equalities[key]
+                    items = [i for i in items if i.get(key) == value]
+        items = list(items)
+        if index_name:
+            if index_name not in schema.indexes:
+                raise _error('ValidationException', f"The table does not have the specified index: {index_name}",
+                             'Query')
+            hash_key, range_key = schema.indexes[index_name]
+            items = [i for i in items if hash_key in i and (not range_key or range_key in i)]
+        else:
+            hash_key, range_key = schema.hash_key, schema.range_key
+        if predicate:
+            # Condición de la query antes de ordenar
+            items = [i for i in items if predicate(i)]
+        items.sort(key=_order_key(schema, hash_key, range_key))
+        return items, hash_key, range_key
+
+    def _page(self, items, schema, index_keys, kwargs, operation):
+        hash_key, range_key = index_keys
+        start = kwargs.get('ExclusiveStartKey')
+        if start:
+            start = _normalize(start)
+            for position, item in enumerate(items):
+                if all(item.get(k) == v for k, v in start.items()):
+                    items = items[position + 1:]
+                    break
+            else:
+                # El último item evaluado ya no existe (p.ej. se borró): se
+                # sigue desde su posición en el orden, como DynamoDB
+                order = _order_key(schema, hash_key, range_key)
+                items = [i for i in items if order(i) > order(start)]
+        limit = kwargs.get('Limit')
+        evaluated = items[:limit] if limit else items
+        last_key = None
+        if limit and len(items) > limit:
+            last = evaluated[-1]
+            last_key = schema.key_of(last)
+            for k in (hash_key, range_key):
+                if k:
+                    last_key[k] = last[k]
+        filter_expression, names, values = _condition_args(kwargs, 'FilterExpression')
+        if filter_expression:
+            node = _Parser(filter_expression, names, values).condition()
+            matched = [i for i in evaluated if _check(node, i)]
+        else:
+            matched = evaluated
+        scanned_size = sum(_item_size(i) for i in evaluated)
+        if kwargs.get('ProjectionExpression'):
+            paths = _Parser(kwargs['ProjectionExpression'], kwargs.get('ExpressionAttributeNames'), {}).projection()
+            matched = [_project(i, paths) for i in matched]
+        response = {'Count': len(matched), 'ScannedCount': len(evaluated)}
+        if kwargs.get('Select') != 'COUNT':
+            response['Items'] = copy.deepcopy(matched)
+        if last_key:
+            response['LastEvaluatedKey'] = last_key
+        response.update(self._consumed(kwargs, schema.name, self._read_units(scanned_size,
+                                                                             kwargs.get('ConsistentRead'))))
+        return response
+
+    def query(self, TableName, **kwargs):
+        self.calls['Query'] += 1
+        schema = self._schema(TableName, 'Query')
+        expression, names, values = _condition_args(kwargs, 'KeyConditionExpression')
+        node = _Parser(expression, names, values).condition()
+        with self.lock:
+            items, hash_key, range_key = self._sorted_items(schema, kwargs.get('IndexName'), _key_equalities(node),
+                                                            lambda i: _check(node, i))
+        if kwargs.get('ScanIndexForward') is False:
+            items.reverse()
+        return self._page(items, schema, (hash_key, range_key), kwargs, 'Query')
+
+    def scan(self, TableName, **kwargs):
+        self.calls['Scan'] += 1
+        schema = self._schema(TableName, 'Scan')
+        with self.lock:
+            items, hash_key, range_key = self._sorted_items(schema, kwargs.get('IndexName'))
+        total = kwargs.get('TotalSegments')
+        if total:
+            segment = kwargs['Segment']
+            items = [i for i in items if zlib.crc32(str(i[schema.hash_key]).encode()) % total == segment]
+        return self._page(items, schema, (hash_key, range_key), kwargs, 'Scan')
+
+    # -- batch y transacciones
+    def batch_get_item(self, RequestItems, **kwargs):
+        self.calls['BatchGetItem'] += 1
+        responses = {}
+        unprocessed = {}
+        consumed = []
+        for table_name, request in RequestItems.items():
+            for key in request['Keys']:
+                if self.unprocessed_hook and self.unprocessed_hook(table_name, key):
+                    entry = unprocessed.setdefault(table_name, {k: v for k, v in request.items() if k != 'Keys'})
+                    entry.setdefault('Keys', []).append(key)
+                    continue
+                params = {k: v for k, v in request.items() if k in ('ProjectionExpression',
+                                                                    'ExpressionAttributeNames',
+                                                                    'ConsistentRead')}
+                self.calls['GetItem'] -= 1
+                result = self.get_item(table_name, key, ReturnConsumedCapacity=kwargs.get('ReturnConsumedCapacity'),
+                                       **params)
+                if 'Item' in result:
+                    responses.setdefault(table_name, []).append(result['Item'])
+                if 'ConsumedCapacity' in result:
+                    consumed.append(result['ConsumedCapacity'])
+        response = {'Responses': responses, 'UnprocessedKeys': unprocessed}
+        if consumed:
+            response['ConsumedCapacity'] = consumed
+        return response
+
+    def batch_write_item(self, RequestItems, **kwargs):
+        self.calls['BatchWriteItem'] += 1
+        if sum(len(v) for v in RequestItems.values()) > 25:
+            raise _error('ValidationException', 'Too many items requested for the BatchWriteItem call',
+                         'BatchWriteItem')
+        unprocessed = {}
+        consumed = []
+        for table_name, requests in RequestItems.items():
+            for request in requests:
+                if self.unprocessed_hook and self.unprocessed_hook(table_name, request):
+                    unprocessed.setdefault(table_name, []).append(request)
+                    continue
+                if 'PutRequest' in request:
+                    self.calls['PutItem'] -= 1
+                    result = self.put_item(table_name, request['PutRequest']['Item'],
+                                           ReturnConsumedCapacity=kwargs.get('ReturnConsumedCapacity'))
+                else:
+                    self.calls['DeleteItem'] -= 1
+                    result = self.delete_item(table_name, request['DeleteRequest']['Key'],
+                                              ReturnConsumedCapacity=kwargs.get('ReturnConsumedCapacity'))
+                if 'ConsumedCapacity' in result:
+                    consumed.append(result['ConsumedCapacity'])
+        response = {'UnprocessedItems': unprocessed}
+        if consumed:
+            response['ConsumedCapacity'] = consumed
+        return response
+
+    def transact_get_items(self, TransactItems, **kwargs):
+        self.calls['TransactGetItems'] += 1
+        responses = []
+        consumed = {}
+        for entry in TransactItems:
+            get = entry['Get']
+            params = {k: v for k, v in get.items() if k in ('ProjectionExpression', 'ExpressionAttributeNames')}
+            self.calls['GetItem'] -= 1
+            result = self.get_item(get['TableName'], get['Key'], ConsistentRead=True, ReturnConsumedCapacity='TOTAL',
+                                   **params)
+            responses.append({'Item': result['Item']} if 'Item' in result else {})
+            units = 2 * result['ConsumedCapacity']['CapacityUnits']
+            consumed[get['TableName']] = consumed.get(get['TableName'], 0) + units
+        response = {'Responses': responses}
+        if kwargs.get('ReturnConsumedCapacity') in ('TOTAL', 'INDEXES'):
+            response['ConsumedCapacity'] = [
+                {'TableName': name, 'CapacityUnits': units, 'ReadCapacityUnits': units}
+                for name, units in consumed.items()
+            ]
+        return response
+
+    def transact_write_items(self, TransactItems, **kwargs):
+        self.calls['TransactWriteItems'] += 1
+        if len(TransactItems) > 100:
+            raise _error('ValidationException', 'Member must have length less than or equal to 100',
+                         'TransactWriteItems')
+        with self.lock:
+            snapshot = {name: dict(items) for name, items in self.data.items()}
+            reasons = []
+            failed = False
+            for entry in TransactItems:
+                (operation, params), = entry.items()
+                schema = self._schema(params['TableName'], 'TransactWriteItems')
+                key = params['Item'] if operation == 'Put' else params['Key']
+                current = self.data[params['TableName']].get(schema.key_tuple(_normalize(key)))
+                try:
+                    self._check_condition(params, current, 'TransactWriteItems')
+                    reasons.append({'Code': 'None'})
+                except ClientError:
+                    failed = True
+                    reason = {'Code': 'ConditionalCheckFailed', 'Message': 'The conditional request failed'}
+                    if params.get('ReturnValuesOnConditionCheckFailure') == 'ALL_OLD' and current:
+                        reason['Item'] = copy.deepcopy(current)
+                    reasons.append(reason)
+            if failed:
+                raise _error('TransactionCanceledException',
+                             'Transaction cancelled, please refer cancellation reasons for specific reasons',
+                             'TransactWriteItems', {'CancellationReasons': reasons})
+            consumed = {}
+            try:
+                for index, entry in enumerate(TransactItems):
+                    (operation, params), = entry.items()
+                    params = {k: v for k, v in params.items() if k != 'ConditionExpression'}
+                    params['ReturnConsumedCapacity'] = 'TOTAL'
+                    table_name = params.pop('TableName')
+                    if operation == 'Put':
+                        self.calls['PutItem'] -= 1
+                        result = self.put_item(table_name, **params)
+                    elif operation == 'Delete':
+                        self.calls['DeleteItem'] -= 1
+                        result = self.delete_item(table_name, **params)
+                    elif operation == 'Update':
+                        self.calls['UpdateItem'] -= 1
+                        result = self.update_item(table_name, **params)
+                    else:
+                        result = {'ConsumedCapacity': {'CapacityUnits': 1.0}}
+                    # Las transacciones consumen el doble que una escritura simple
+                    units = 2 * result['ConsumedCapacity']['CapacityUnits']
+                    consumed[table_name] = consumed.get(table_name, 0) + units
+            except ClientError as e:
+                self.data.update(snapshot)
+                if e.response['Error']['Code'] != 'ValidationException':
+                    raise
+                # Como DynamoDB: un error de tipos en un item cancela la
+                # transacción con un ValidationError en su CancellationReason
+                reasons = [{'Code': 'None'} for _ in TransactItems]
+                reasons[index] = {'Code': 'ValidationError', 'Message': e.response['Error']['Message']}
+                raise _error('TransactionCanceledException',
+                             'Transaction cancelled, please refer cancellation reasons for specific reasons',
+                             'TransactWriteItems', {'CancellationReasons': reasons})
+        if kwargs.get('ReturnConsumedCapacity') in ('TOTAL', 'INDEXES'):
+            return {'ConsumedCapacity': [
+                {'TableName': name, 'CapacityUnits': units, 'WriteCapacityUnits': units}
+                for name, units in consumed.items()
+            ]}
+        return {}
+
+
+class _Meta:
+    def __init__(self, db):
+        self.client = _Client(db)
+
+
+# Operaciones que emiten los mismos eventos que un cliente de botocore
+# (provide-client-params, before-parameter-build, after-call), para que los hooks registrados en
+# meta.events (p.ej. common.metrics) funcionen también en local
+OPERATIONS = {
+    'get_item': 'GetItem', 'put_item': 'PutItem', 'update_item': 'UpdateItem', 'delete_item': 'DeleteItem',
+    'query': 'Query', 'scan': 'Scan', 'batch_get_item': 'BatchGetItem', 'batch_write_item': 'BatchWriteItem',
+    'transact_get_items': 'TransactGetItems', 'transact_write_items': 'TransactWriteItems'
+}
+
+
+class OperationModel:
+    def __init__(self, name):
+        self.name = name
+
+
+def call_with_events(events, service, model, method, params):
+    context = {}
+    events.emit(f"provide-client-params.{service}.{model.name}", params=params, model=model, context=context)
+    events.emit(f"before-parameter-build.{service}.{model.name}", params=params, model=model, context=context)
+    try:
+        response = method(**params)
+    except ClientError as e:
+        events.emit(f"after-call.{service}.{model.name}", http_response=None, parsed=e.response,
+                    model=model, context=context)
+        raise
+    events.emit(f"after-call.{service}.{model.name}", http_response=None, parsed=response,
+                model=model, context=context)
+    return response
+
+
+class _Client:
+    # Cliente de bajo nivel (lo que devuelve Table.meta.client en boto3)
+    def __init__(self, db):
+        self._db = db
+        self.exceptions = _Exceptions()
+        self.meta = SimpleNamespace(events=HierarchicalEmitter())
+
+    def __getattr__(self, name):
+        method = getattr(self._db, name)
+        operation = OPERATIONS.get(name)
+        if operation is None:
+            return method
+        events, model = self.meta.events, OperationModel(operation)
+
+        def call(**params):
+            return call_with_events(events, 'dynamodb', model, method, params)
+
+        setattr(self, name, call)
+        return call
+
+
+class _Exceptions:
+    ConditionalCheckFailedException = ClientError
+    TransactionCanceledException = ClientError
+
+
+class Table:
+    def __init__(self, db, name):
+        self.db = db
+        self.name = name
+        self.table_name = name
+        self.meta = db.meta
+
+    def get_item(self, **kwargs):
+        return self.meta.client.get_item(TableName=self.name, **kwargs)
+
+    def put_item(self, **kwargs):
+        return self.meta.client.put_item(TableName=self.name, **kwargs)
+
+    def update_item(self, **kwargs):
+        return self.meta.client.update_item(TableName=self.name, **kwargs)
+
+    def delete_item(self, **kwargs):
+        return self.meta.client.delete_item(TableName=self.name, **kwargs)
+
+    def query(self, **kwargs):
+        return self.meta.client.query(TableName=self.name, **kwargs)
+
+    def scan(self, **kwargs):
+        return self.meta.client.scan(TableName=self.name, **kwargs)
+
+    def batch_writer(self, overwrite_by_pkeys=None):
+        return _BatchWriter(self.db, self.name)
+
+
+class _BatchWriter:
+    def __init__(self, db, name):
+        self.db = db
+        self.name = name
+        self.buffer = []
+
+    def put_item(self, Item):
+        self.buffer.append({'PutRequest': {'Item': Item}})
+        self._flush_if_full()
+
+    def delete_item(self, Key):
+        self.buffer.append({'DeleteRequest': {'Key': Key}})
+        self._flush_if_full()
+
+    def _flush_if_full(self):
+        if len(self.buffer) >= 25:
+            self._flush()
+
+    def _flush(self):
+        while self.buffer:
+            chunk, self.buffer = self.buffer[:25], self.buffer[25:]
+            response = self.db.meta.client.batch_write_item(RequestItems={self.name: chunk})
+            self.buffer.extend(response['UnprocessedItems'].get(self.name, []))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self._flush()
+
+
+def create_default_tables(db, stage='dev'):
+    # Las tablas que usan los servicios python
+    db.create_table(f"{stage}_t_access_tokens", 'token',
+                    indexes={'student_tokens_index': ('tenant_id', 'student_id')})
+    db.create_table(f"{stage}_t_students", 'tenant_id', 'student_id',
+                    indexes={'student_email_index': ('student_email', 'tenant_id')})
+    db.create_table(f"{stage}_t_student_emails", 'tenant_id', 'student_email')
+    db.create_table(f"{stage}_t_rockies", 'tenant_id', 'student_id')
+    db.create_table(f"{stage}_t_purchasable", 'tenant_id', 'product_id')
+    db.create_table(f"{stage}_t_activity_events", 'tenant_id', 'event_id')
+    return db
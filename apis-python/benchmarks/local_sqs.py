@@ -0,0 +1,111 @@
+# Cola SQS en memoria para correr la ingesta de eventos sin AWS.
+#
+# Implementa lo que usa common.ingestion con la misma forma que el cliente
+# de SQS de boto3: create_queue, send_message, send_message_batch,
+# receive_message, delete_message y delete_message_batch. Los mensajes
+# recibidos quedan invisibles durante VisibilityTimeout y vuelven a
+# entregarse si no se borran (entrega "al menos una vez"), con un
+# ReceiptHandle nuevo en cada entrega.
+import threading
+import time
+import uuid
+from collections import OrderedDict, defaultdict
+
+from botocore.exceptions import ClientError
+
+
+def _error(code, message, operation):
+    return ClientError({'Error': {'Code': code, 'Message': message}}, operation)
+
+
+class InMemorySQS:
+    def __init__(self, visibility_timeout=30, clock=time.monotonic):
+        self.visibility_timeout = visibility_timeout
+        self.clock = clock
+        self.queues = {}
+        self.calls = defaultdict(int)
+        self.lock = threading.Lock()
+
+    def _queue(self, QueueUrl, operation):
+        queue = self.queues.get(QueueUrl)
+        if queue is None:
+            raise _error('AWS.SimpleQueueService.NonExistentQueue', 'The specified queue does not exist.', operation)
+        return queue
+
+    def create_queue(self, QueueName, **kwargs):
+        self.calls['CreateQueue'] += 1
+        url = f"https://sqs.us-east-1.amazonaws.com/123456789012/{QueueName}"
+        self.queues.setdefault(url, {'messages': OrderedDict(), 'receipts': {}})
+        return {'QueueUrl': url}
+
+    def send_message(self, QueueUrl, MessageBody, **kwargs):
+        self.calls['SendMessage'] += 1
+        with self.lock:
+            return {'MessageId': self._put(self._queue(QueueUrl, 'SendMessage'), MessageBody)}
+
+    def send_message_batch(self, QueueUrl, Entries, **kwargs):
+        self.calls['SendMessageBatch'] += 1
+        if len(Entries) > 10:
+            raise _error('AWS.SimpleQueueService.TooManyEntriesInBatchRequest',
+                         'Maximum number of entries per request are 10.', 'SendMessageBatch')
+        with self.lock:
+            queue = self._queue(QueueUrl, 'SendMessageBatch')
+            successful = [{'Id': entry['Id'], 'MessageId': self._put(queue, entry['MessageBody'])}
+                          for entry in Entries]
+        return {'Successful': successful, 'Failed': []}
+
+    def _put(self, queue, body):
+        message_id = str(uuid.uuid4())
+        queue['messages'][message_id] = {'MessageId': message_id, 'Body': body, 'visible_at': 0.0, 'receives': 0}
+        return message_id
+
+    def receive_message(self, QueueUrl, MaxNumberOfMessages=1, VisibilityTimeout=None, WaitTimeSeconds=0, **kwargs):
+        self.calls['ReceiveMessage'] += 1
+        if not 1 <= MaxNumberOfMessages <= 10:
+            raise _error('InvalidParameterValue', 'MaxNumberOfMessages must be between 1 and 10.', 'ReceiveMessage')
+        timeout = self.visibility_timeout if VisibilityTimeout is None else VisibilityTimeout
+        now = self.clock()
+        received = []
+        with self.lock:
+            queue = self._queue(QueueUrl, 'ReceiveMessage')
+            for message in queue['messages'].values():
+                if len(received) == MaxNumberOfMessages:
+                    break
+                if message['visible_at'] > now:
+                    continue
+                message['visible_at'] = now + timeout
+                message['receives'] += 1
+                receipt = str(uuid.uuid4())
+                queue['receipts'][receipt] = message['MessageId']
+                received.append({
+                    'MessageId': message['MessageId'],
+                    'ReceiptHandle': receipt,
+                    'Body': message['Body'],
+                    'Attributes': {'ApproximateReceiveCount': str(message['receives'])}
+                })
+        return {'Messages': received} if received else {}
+
+    def delete_message(self, QueueUrl, ReceiptHandle, **kwargs):
+        self.calls['DeleteMessage'] += 1
+        with self.lock:
+            self._delete(self._queue(QueueUrl, 'DeleteMessage'), ReceiptHandle)
+        return {}
+
+    def delete_message_batch(self, QueueUrl, Entries, **kwargs):
+        self.calls['DeleteMessageBatch'] += 1
+        if len(Entries) > 10:
+            raise _error('AWS.SimpleQueueService.TooManyEntriesInBatchRequest',
+                         'Maximum number of entries per request are 10.', 'DeleteMessageBatch')
+        with self.lock:
+            queue = self._queue(QueueUrl, 'DeleteMessageBatch')
+            for entry in Entries:
+                self._delete(queue, entry['ReceiptHandle'])
+        return {'Successful': [{'Id': entry['Id']} for entry in Entries], 'Failed': []}
+
+    def _delete(self, queue, receipt):
+        message_id = queue['receipts'].pop(receipt, None)
+        if message_id is not None:
+            queue['messages'].pop(message_id, None)
+
+    def approximate_size(self, QueueUrl):
+        return len(self._queue(QueueUrl, 'GetQueueAttributes')['messages'])
@@ -0,0 +1,103 @@
+# Agregador local de las líneas EMF que escribe common.metrics: convierte los
+# logs (export de CloudWatch Logs, salida de `sls logs` o el --metrics-log de
+# bench_handlers.py) en una tabla de costo por endpoint.
+#
+#   python apis-python/benchmarks/metrics_report.py logs.txt [--by tenant_id]
+#   sls logs -f GetStudent | python apis-python/benchmarks/metrics_report.py -
+#
+# El costo se estima con los precios on-demand por millón de unidades de
+# lectura/escritura (--read-price / --write-price, USD).
+import argparse
+import json
+import sys
+from collections import defaultdict
+
+
+def iter_records(lines):
+    for line in lines:
+        # CloudWatch antepone timestamp y request id: se busca el JSON
+        start = line.find('{"_aws"')
+        if start < 0:
+            continue
+        try:
+            yield json.loads(line[start:])
+        except json.JSONDecodeError:
+            continue
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p))] if values else 0.0
+
+
+def aggregate(records, by, read_price, write_price):
+    groups = defaultdict(list)
+    for record in records:
+        groups[tuple(record.get(key) for key in by)].append(record)
+
+    rows = []
+    for key, items in groups.items():
+        n = len(items)
+        rcu = sum(r.get('RCU', 0) for r in items)
+        wcu = sum(r.get('WCU', 0) for r in items)
+        cost = rcu * read_price / 1e6 + wcu * write_price / 1e6
+        operations = defaultdict(int)
+        for r in items:
+            for operation, count in (r.get('operations') or {}).items():
+                operations[operation] += count
+        rows.append({
+            **dict(zip(by, key)),
+            'invocations': n,
+            'errors': sum(1 for r in items if (r.get('status') or 0) >= 500 or r.get('errors')),
+            'cold_starts': sum(r.get('ColdStart', 0) for r in items),
+            'p50_ms': percentile([r.get('Latency', 0) for r in items], 0.50),
+            'p95_ms': percentile([r.get('Latency', 0) for r in items], 0.95),
+            'io_share': (sum(r.get('IOLatency', 0) for r in items) / sum(r.get('Latency', 0) for r in items)
+                         if sum(r.get('Latency', 0) for r in items) else 0.0),
+            'dynamodb_calls': sum(r.get('DynamoDBCalls', 0) for r in items) / n,
+            'lambda_calls': sum(r.get('LambdaCalls', 0) for r in items) / n,
+            'rcu': rcu / n,
+            'wcu': wcu / n,
+            'rcu_total': rcu,
+            'wcu_total': wcu,
+            'cost_usd': cost,
+            'cost_per_million_usd': cost / n * 1e6,
+            'operations': {op: count / n for op, count in sorted(operations.items())}
+        })
+    rows.sort(key=lambda row: row['cost_usd'], reverse=True)
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('paths', nargs='*', default=['-'], help="Archivos de log ('-' = stdin)")
+    parser.add_argument('--by', default='endpoint', help='Agrupar por estos campos (p.ej. endpoint,tenant_id)')
+    parser.add_argument('--read-price', type=float, default=0.125, help='USD por millón de RRU')
+    parser.add_argument('--write-price', type=float, default=0.625, help='USD por millón de WRU')
+    parser.add_argument('--json', action='store_true')
+    args = parser.parse_args()
+
+    by = [field.strip() for field in args.by.split(',') if field.strip()]
+    records = []
+    for path in args.paths:
+        with (sys.stdin if path == '-' else open(path, encoding='utf-8')) as lines:
+            records.extend(iter_records(lines))
+    rows = aggregate(records, by, args.read_price, args.write_price)
+
+    if args.json:
+        print(json.dumps(rows, indent=2))
+        return
+
+    label = '/'.join(by)
+    print(f"{label:<34} {'invoc.':>8} {'err':>5} {'cold':>5} {'p50':>8} {'p95':>8} {'io%':>5} "
+          f"{'ddb/inv':>8} {'RCU/inv':>8} {'WCU/inv':>8} {'USD/M inv':>10}")
+    for row in rows:
+        name = '/'.join(str(row[field]) for field in by)
+        print(f"{name:<34} {row['invocations']:>8} {row['errors']:>5} {row['cold_starts']:>5} "
+              f"{row['p50_ms']:>6.2f}ms {row['p95_ms']:>6.2f}ms {row['io_share'] * 100:>4.0f}% "
+              f"{row['dynamodb_calls']:>8.2f} {row['rcu']:>8.2f} {row['wcu']:>8.2f} "
+              f"{row['cost_per_million_usd']:>10.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,34 @@
+import os
+import sys
+
+import pytest
+
+# Los handlers se prueban contra el DynamoDB en memoria de los benchmarks
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path[:0] = [os.path.join(ROOT, 'benchmarks'),
+                os.path.join(ROOT, 'api-common', 'layer', 'python'),
+                os.path.join(ROOT, 'api-security'),
+                os.path.join(ROOT, 'api-student'),
+                os.path.join(ROOT, 'api-rockie')]
+os.environ.setdefault("STAGE", "dev")
+os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+os.environ.setdefault("METRICS_ENABLED", "false")
+
+from common import runtime  # noqa: E402
+from local_dynamodb import InMemoryDynamoDB, create_default_tables  # noqa: E402
+
+STAGE = os.environ["STAGE"]
+TENANT = 'tenant-001'
+
+
+@pytest.fixture
+def db():
+    db = create_default_tables(InMemoryDynamoDB(), STAGE)
+    runtime.override(dynamodb=db)
+    yield db
+    runtime.reset()
+
+
+def authorized(student_id, body=None):
+    # Evento de API Gateway con la identidad que resolvió el authorizer
+    return {'authorizer': {'tenant_id': TENANT, 'student_id': student_id}, 'body': body or {}}
@@ -0,0 +1,28 @@
+import Lambda_Purchase_Accessory
+from common.catalog import catalog
+from common.rockie import build_rockie_item
+from conftest import STAGE, TENANT, authorized
+
+
+def seed_product(db):
+    catalog.clear()
+    db.Table(f"{STAGE}_t_purchasable").put_item(Item={'tenant_id': TENANT, 'product_id': 'hat', 'price': 10})
+
+
+def test_purchase_by_missing_student_returns_student_not_found(db):
+    seed_product(db)
+    db.Table(f"{STAGE}_t_rockies").put_item(Item=build_rockie_item(TENANT, 'student-1', 'Rocky'))
+
+    response = Lambda_Purchase_Accessory.lambda_handler(authorized('student-1', {'product_id': 'hat'}), None)
+
+    assert response == {'statusCode': 404, 'body': 'Estudiante no encontrado'}
+
+
+def test_purchase_without_rockie_returns_rockie_not_found(db):
+    seed_product(db)
+    db.Table(f"{STAGE}_t_students").put_item(Item={'tenant_id': TENANT, 'student_id': 'student-1',
+                                                   'student_data': {'rockie_gems': 100}})
+
+    response = Lambda_Purchase_Accessory.lambda_handler(authorized('student-1', {'product_id': 'hat'}), None)
+
+    assert response == {'statusCode': 404, 'body': 'Rockie no encontrado'}
@@ -0,0 +1,16 @@
+import Lambda_CreateRockie
+from common.progression import level_curve
+from conftest import STAGE, TENANT, authorized
+
+
+def test_create_rockie_ignores_evolution_from_body(db):
+    response = Lambda_CreateRockie.lambda_handler(
+        authorized('student-1', {'rockie_name': 'Rocky', 'evolution': 'Stage 99', 'level': 50,
+                                 'experience': 9999, 'rockie_all_accessories_ids': ['crown']}), None)
+
+    assert response['statusCode'] == 200
+    item = db.Table(f"{STAGE}_t_rockies").get_item(Key={'tenant_id': TENANT, 'student_id': 'student-1'})['Item']
+    assert item['level'] == 1
+    assert item['experience'] == 0
+    assert item['rockie_data']['evolution'] == level_curve.evolution(1)
+    assert 'crown' not in item['rockie_data']['rockie_all_accessories_ids']